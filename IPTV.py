@@ -11,13 +11,25 @@ import re
 import sys
 import json
 import requests
+from charset_normalizer import from_bytes
 import logging
 import time
-import tempfile
+import threading
 import multiprocessing
+import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import OrderedDict, defaultdict
 from datetime import datetime, timezone, timedelta
+from async_fetcher import fetch_sources_async
+from cache_store import open_cache_store
+from channel_classifier import classify_channel
+from channel_matcher import ChannelMatcher, DEFAULT_FUZZY_THRESHOLD
+from channel_record import Channel, as_channel
+from channel_table import ChannelTable
+from parallel_parser import parse_file_parallel, FORMAT_M3U
+from playlist_parser import iter_m3u_entries
+from quality_scorer import score_text, meets_resolution, TIER_FHD, TIER_4K
+from stream_health import open_health_store, test_channels_with_health
 
 # 导入配置
 try:
@@ -26,6 +38,14 @@ except ImportError:
     print("错误: 找不到config.py配置文件")
     sys.exit(1)
 
+# 尝试导入快速URL检测器
+try:
+    from quick_url_checker import create_quick_checker
+    QUICK_CHECKER_AVAILABLE = True
+except ImportError:
+    QUICK_CHECKER_AVAILABLE = False
+    print("警告: 快速URL检测器不可用，将使用基础检测")
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -99,7 +119,7 @@ def fetch_channels(url):
                 elif line and not line.startswith("#"):
                     channel_url = line.strip()
                     if current_category and channel_name:
-                        channels[current_category].append((channel_name, channel_url))
+                        channels[current_category].append(Channel(channel_name, channel_url))
         else:
             # 解析TXT格式
             for line in lines:
@@ -112,9 +132,9 @@ def fetch_channels(url):
                     if match:
                         channel_name = match.group(1).strip()
                         channel_url = match.group(2).strip()
-                        channels[current_category].append((channel_name, channel_url))
+                        channels[current_category].append(Channel(channel_name, channel_url))
                     elif line:
-                        channels[current_category].append((line, ''))
+                        channels[current_category].append(Channel(line, ''))
 
         if channels:
             categories = ", ".join(channels.keys())
@@ -129,44 +149,60 @@ def fetch_channels(url):
 
     return channels
 
-def match_channels(template_channels, all_channels, channel_mapping=None):
-    """匹配频道 - 支持别名匹配"""
+def match_channels(template_channels, all_channels, channel_mapping=None, matching_config=None):
+    """匹配频道 - 支持别名匹配和模糊匹配
+
+    先从all_channels一次性构建频道名索引，精确匹配和别名匹配均为字典查找；
+    精确匹配和别名匹配都没有结果时，如果启用了模糊匹配（matching.enable_fuzzy_match），
+    按matching.fuzzy_threshold阈值查找最相似的频道名
+    """
     matched_channels = OrderedDict()
     channel_mapping = channel_mapping or {}
+    matching_config = matching_config or {}
+    enable_aliases = matching_config.get("enable_aliases", True)
+    enable_fuzzy_match = matching_config.get("enable_fuzzy_match", False)
+    fuzzy_threshold = matching_config.get("fuzzy_threshold", DEFAULT_FUZZY_THRESHOLD)
 
     logger.info(f"开始频道匹配: 模板{len(template_channels)}分类, 源{len(all_channels)}分类")
 
+    matcher = ChannelMatcher(all_channels, case_sensitive=matching_config.get("case_sensitive", True))
+    fuzzy_count = 0
+
     for category, channel_list in template_channels.items():
         matched_channels[category] = OrderedDict()
         logger.debug(f"处理分类: {category} ({len(channel_list)}频道)")
         
         for channel_name in channel_list:
             # 1. 精确匹配
-            exact_matches = []
-            for online_category, online_channel_list in all_channels.items():
-                for online_channel_name, online_channel_url in online_channel_list:
-                    if channel_name == online_channel_name:
-                        exact_matches.append(online_channel_url)
+            exact_matches = matcher.lookup(channel_name)
             
             if exact_matches:
                 matched_channels[category][channel_name] = exact_matches
                 logger.debug(f"精确匹配: {channel_name} -> {len(exact_matches)}个URL")
             
-            # 2. 别名匹配
-            if channel_name in channel_mapping:
-                alias_matches = []
-                for alias in channel_mapping[channel_name]:
-                    for online_category, online_channel_list in all_channels.items():
-                        for online_channel_name, online_channel_url in online_channel_list:
-                            if alias == online_channel_name:
-                                alias_matches.append(online_channel_url)
+            # 2. 别名匹配（追加到精确匹配结果之后，跳过已匹配的URL）
+            if enable_aliases and channel_name in channel_mapping:
+                alias_matches = matcher.lookup_aliases(channel_mapping[channel_name])
                 
                 if alias_matches:
-                    if channel_name in matched_channels:
-                        matched_channels[channel_name].extend(alias_matches)
-                    else:
-                        matched_channels[category][channel_name] = alias_matches
+                    existing_urls = matched_channels[category].setdefault(channel_name, [])
+                    seen_urls = set(existing_urls)
+                    for url in alias_matches:
+                        if url not in seen_urls:
+                            seen_urls.add(url)
+                            existing_urls.append(url)
                     logger.debug(f"别名匹配: {channel_name} -> {len(alias_matches)}个URL")
+            
+            # 3. 模糊匹配（仅在前两步都没有结果时）
+            if enable_fuzzy_match and channel_name not in matched_channels[category]:
+                fuzzy_matches, fuzzy_names, ratio = matcher.fuzzy_lookup(channel_name, fuzzy_threshold)
+                if fuzzy_matches:
+                    matched_channels[category][channel_name] = fuzzy_matches
+                    fuzzy_count += 1
+                    logger.debug(f"模糊匹配: {channel_name} -> {', '.join(fuzzy_names)} (相似度{ratio:.2f}, {len(fuzzy_matches)}个URL)")
+
+    if fuzzy_count:
+        logger.info(f"模糊匹配: {fuzzy_count}个频道")
 
     # 统计匹配结果
     total_matched = sum(len(channels) for channels in matched_channels.values() 
@@ -248,8 +284,9 @@ def main():
                 all_channels[category] = []
             all_channels[category].extend(channel_list)
     
-    # 获取频道别名映射
-    channel_mapping = getattr(config, 'channel_mapping', {})
+    # 获取频道别名映射和匹配设置
+    matching_config = config.get('matching', {})
+    channel_mapping = matching_config.get('channel_mapping', {})
     
     # 使用默认模板结构
     template_channels = OrderedDict()
@@ -268,7 +305,7 @@ def main():
                     seen_channels.add(channel_name)
     
     # 匹配频道
-    matched_channels = match_channels(template_channels, all_channels, channel_mapping)
+    matched_channels = match_channels(template_channels, all_channels, channel_mapping, matching_config)
     
     # 生成输出
     output_m3u = config.get('output', {}).get('m3u_file', 'jieguo.m3u')
@@ -301,14 +338,20 @@ DEFAULT_CONFIG = {
         "enable": False,   # 禁用URL有效性测试以避免超时 - 2026-01-01优化
         "timeout": 3,      # URL测试超时时间（秒）- 增加到3秒
         "retries": 0,      # URL测试重试次数
-        "workers": 8      # URL测试并发数 - 降低到8个线程避免网络压力
+        "workers": 8,     # URL测试并发数 - 降低到8个线程避免网络压力
+        "per_host_limit": 4,  # 快速检测时每个主机的最大并发数
+        "host_rate": 8.0,     # 快速检测时每个主机每秒最多发起的请求数，0表示不限速
+        "backend": "threads"  # 快速检测后端: threads（requests线程池）或 asyncio（事件循环探测）
     },
     "network": {
         "ip_version_priority": "ipv4",  # IP版本优先级: ipv4, ipv6, auto
         "url_blacklist": [],            # URL黑名单
         "enable_ipv6": True,           # 启用IPv6支持
         "timeout": 30,                 # 网络请求超时
-        "retries": 3                   # 网络请求重试次数
+        "retries": 3,                  # 网络请求重试次数
+        "fetch_mode": "threads",       # 直播源获取方式: threads（线程池）, asyncio（按主机限流并支持全局截止时间）
+        "fetch_deadline": 600,         # asyncio模式下获取所有直播源的全局截止时间（秒）
+        "per_host_limit": 2            # asyncio模式下每个主机的最大并发数
     },
     "matching": {
         "channel_mapping": {},         # 频道别名映射表
@@ -319,7 +362,27 @@ DEFAULT_CONFIG = {
     },
     "cache": {
         "expiry_time": 3600,  # 缓存有效期（秒）
-        "file": "source_cache.json"  # 缓存文件路径
+        "dir": "source_cache",  # 缓存目录（元数据与压缩内容分开存放）
+        "max_size_mb": 200,  # 缓存内容总大小上限（MB），0表示不限制
+        "write_behind": True,  # 延迟写入：更新先保存在内存中，运行结束时统一落盘
+        "flush_interval": 60,  # 延迟写入的自动落盘间隔（秒），0表示只在运行结束时落盘
+        "file": "source_cache.json"  # 旧版JSON缓存文件路径（首次运行时自动导入，导入后改名为 .imported）
+    },
+    "health": {
+        "enable": False,               # 启用流健康状态库，只重新检测复检时间已到的URL
+        "db_file": "stream_health.db", # 健康状态数据库文件
+        "healthy_ttl": 3600,           # 可用流的基础复检间隔（秒），连续可用时逐步延长
+        "max_healthy_ttl": 259200,     # 可用流的最长复检间隔（秒）
+        "failed_ttl": 1800,            # 失效流的基础复检间隔（秒），连续失效时指数退避
+        "max_failed_ttl": 604800       # 失效流的最长复检间隔（秒）
+    },
+    "parsing": {
+        "parallel_workers": 0,      # 本地大文件并行分块解析的进程数，0表示不启用，-1表示使用全部CPU核心
+        "parallel_min_size_mb": 32  # 本地文件达到该大小（MB）时才使用并行解析
+    },
+    "incremental": {
+        "enable": False,       # 增量模式：内容未变化的直播源复用上次的解析结果和URL测试结论
+        "verdict_ttl": 86400   # URL测试结论的有效期（秒）
     },
     "output": {
         "m3u_file": "jieguo.m3u",  # M3U输出文件
@@ -353,13 +416,24 @@ config = DEFAULT_CONFIG.copy()
 # 直播源内容缓存配置
 import hashlib
 
-# 缓存字典，格式：{url: (cached_time, content, etag, last_modified)}
-source_cache = {}
+# 缓存存储，按URL索引，条目格式：(cached_time, content, etag, last_modified)
+# 由load_cache()按最终配置打开；模块导入时（包括并行解析的子进程）不创建缓存目录
+source_cache = None
 
 # 使用配置文件中的缓存设置
 CACHE_FILE = config["cache"]["file"]
 cache_expiry_time = config["cache"]["expiry_time"]
 
+# 增量模式状态
+incremental_lock = threading.Lock()
+# 本次运行中各远程源的内容哈希及其包含的频道URL，格式：{source_url: (content_hash, [url, ...])}
+incremental_sources = {}
+# 频道URL的测试结论，格式：{url: (is_valid, tested_time)}
+cached_verdicts = {}
+
+# 流健康状态库（启用health时按需打开）
+health_store = None
+
 # 创建全局Session对象以提高请求性能
 session = requests.Session()
 session.headers.update(HEADERS)
@@ -368,62 +442,35 @@ test_workers = config["url_testing"]["workers"]
 session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=test_workers, max_retries=0))
 session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=test_workers, max_retries=0))
 
-# 保存缓存到文件
+# 保存缓存
 def save_cache():
-    """将缓存保存到文件"""
+    """将延迟写入的缓存条目统一落盘，并输出缓存统计"""
+    if source_cache is None:
+        return True
     try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            # 转换为可序列化的格式
-            serializable_cache = {}
-            for url, (cached_time, content, etag, last_modified) in source_cache.items():
-                serializable_cache[url] = {
-                    'cached_time': cached_time,
-                    'content': content,
-                    'etag': etag,
-                    'last_modified': last_modified
-                }
-            json.dump(serializable_cache, f, ensure_ascii=False, indent=2)
+        written = source_cache.flush()
+        print(f"💾 缓存已保存: 写入 {written} 个条目，{source_cache.stats_summary()}")
         return True
-    except (IOError, OSError) as e:
-        print(f"保存缓存失败: 文件操作错误 - {e}")
-        return False
-    except (ValueError, TypeError) as e:
-        print(f"保存缓存失败: 数据格式错误 - {e}")
-        return False
     except Exception as e:
-        print(f"保存缓存失败: 未知错误 - {e}")
+        print(f"保存缓存失败: {e}")
         return False
 
-# 从文件加载缓存
+# 加载缓存
 def load_cache():
-    """从文件加载缓存"""
+    """按当前配置打开缓存目录，并导入旧版JSON缓存文件中的条目"""
     global source_cache
     try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                serializable_cache = json.load(f)
-                # 转换回原始格式
-                source_cache = {}
-                for url, data in serializable_cache.items():
-                    source_cache[url] = (
-                        data['cached_time'],
-                        data['content'],
-                        data.get('etag'),
-                        data.get('last_modified')
-                    )
-            print(f"✅ 从缓存文件加载了 {len(source_cache)} 个缓存条目")
+        source_cache = open_cache_store(config["cache"])
+        imported = source_cache.import_legacy_json(CACHE_FILE)
+        if imported:
+            print(f"✅ 从旧版缓存文件导入了 {imported} 个缓存条目")
+        print(f"✅ 缓存目录: {source_cache.cache_dir}，共 {len(source_cache)} 个缓存条目")
         return True
     except (IOError, OSError) as e:
         print(f"加载缓存失败: 文件操作错误 - {e}")
-        source_cache = {}
-        return False
-    except (ValueError, TypeError) as e:
-        print(f"加载缓存失败: 数据格式错误 - {e}")
-        source_cache = {}
         return False
     except Exception as e:
         print(f"加载缓存失败: 未知错误 - {e}")
-        source_cache = {}
         return False
 
 # 计算内容的MD5哈希值
@@ -535,27 +582,6 @@ HD_REGEX = re.compile('|'.join(HD_PATTERNS), re.IGNORECASE)
 # 预编译常用正则表达式
 URL_REGEX = re.compile(r'(?:https?|udp|rtsp|rtmp|mms|rtp)://', re.IGNORECASE)
 
-# 预编译分辨率和质量相关的正则表达式
-HIGH_DEF_PATTERNS = re.compile(r'(1080[pdi]|1440[pdi]|2160[pdi]|fhd|uhd|超高清)', re.IGNORECASE)
-RES_PATTERNS = [
-    re.compile(r'(\d{3,4})[pdi]'),  # 如1080p, 2160i
-    re.compile(r'(\d+)x(\d+)'),     # 如1920x1080, 3840x2160
-    re.compile(r'(\d+)_(\d+)'),     # 如1920_1080
-    re.compile(r'res=([1-9]\d+)'),       # 如res=1080
-    re.compile(r'resolution=([1-9]\d+)x?([1-9]\d+)'),  # 如resolution=1920x1080
-    re.compile(r'width=([1-9]\d+).*?height=([1-9]\d+)'),  # 如width=1920 height=1080
-]
-
-# 预编译4K相关的正则表达式
-K4_PATTERNS = re.compile(r'(2160[pdi]|4k|8k|uhd|3840x2160|7680x4320|超高清)', re.IGNORECASE)
-K4_RES_PATTERNS = [
-    re.compile(r'(\d{3,4})[pdi]'),  # 如2160p
-    re.compile(r'(\d+)x(\d+)'),     # 如3840x2160
-]
-
-# 预编译M3U频道提取正则表达式
-M3U_CHANNEL_PATTERN = re.compile(r'#EXTINF:.*?tvg-name="([^"]*)".*?(?:group-title="([^"]*)")?,([^\n]+)\n(http[^\n]+)', re.DOTALL)
-
 # 预编译内容清理正则表达式
 CLEAN_CONTENT_PATTERN = re.compile(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f\u20ac\ue000-\uf8ff]')
 
@@ -592,6 +618,9 @@ def should_exclude_url(url):
 
 # 分辨率过滤
 
+# 低质量标识（频道名中带这些标识时不按高清标识判定为高清）
+LOW_QUALITY_KEYWORDS = ['360', '480', '576', '标清', 'sd', 'low']
+
 def is_high_quality(line):
     """判断线路是否为高清线路（1080P以上）"""
     # 从line中提取频道名称和URL
@@ -604,80 +633,30 @@ def is_high_quality(line):
         channel_name = line.strip()
         url_part = ''
     
-    # 检查频道名称中的高清标识
-    if HIGH_DEF_PATTERNS.search(channel_name):
+    # 检查频道名称中的1080P及以上标识
+    name_quality = score_text(channel_name)
+    if name_quality.tier >= TIER_FHD:
         return True
     
-    # 检查其他高清标识
-    channel_name_lower = channel_name.lower()
-    # 高清标识列表
-    hd_keywords = ['高清', '超清', 'hd', 'high definition', 'high def']
-    # 低质量标识列表
-    low_quality_keywords = ['360', '480', '576', '标清', 'sd', 'low']
-    
     # 检查是否包含高清标识且不包含低质量标识
-    if any(hd in channel_name_lower for hd in hd_keywords) and not any(low in channel_name_lower for low in low_quality_keywords):
+    channel_name_lower = channel_name.lower()
+    if name_quality.hd_marker and not any(low in channel_name_lower for low in LOW_QUALITY_KEYWORDS):
         return True
     
     # 分辨率过滤：如果开启了分辨率过滤，检查是否满足最小分辨率要求
     if config["filter"]["resolution"]:
-        # 增强的分辨率检测
-        combined_text = channel_name + ' ' + url_part
-        
-        for pattern in RES_PATTERNS:
-            res_match = pattern.search(combined_text)
-            if res_match:
-                try:
-                    if len(res_match.groups()) == 1:
-                        # 垂直分辨率（如1080p）
-                        res_value = int(res_match.group(1))
-                        if res_value >= config["filter"]["min_resolution"][1]:
-                            return True
-                    elif len(res_match.groups()) == 2:
-                        # 完整分辨率（如1920x1080）
-                        width = int(res_match.group(1))
-                        height = int(res_match.group(2))
-                        if width >= config["filter"]["min_resolution"][0] and height >= config["filter"]["min_resolution"][1]:
-                            return True
-                except ValueError:
-                    pass
+        return meets_resolution(score_text(f"{channel_name} {url_part}"), config["filter"]["min_resolution"])
     
     return False
 
 def is_4k(channel_name, url):
     """判断频道是否为4K频道"""
-    
-    # 检查频道名称和URL中的4K标识
-    combined_text = channel_name + ' ' + url
-    
-    # 检查是否包含4K标识
-    if K4_PATTERNS.search(combined_text):
+    # 检查频道名称和URL中的4K标识和分辨率
+    if score_text(f"{channel_name} {url}").tier == TIER_4K:
         return True
     
     # 检查频道分类
-    if get_simple_category(channel_name) == "4K频道":
-        return True
-    
-    # 检查分辨率
-    for pattern in K4_RES_PATTERNS:
-        res_match = pattern.search(combined_text)
-        if res_match:
-            try:
-                if len(res_match.groups()) == 1:
-                    # 垂直分辨率（如2160p）
-                    res_value = int(res_match.group(1))
-                    if res_value >= 2160:
-                        return True
-                elif len(res_match.groups()) == 2:
-                    # 完整分辨率（如3840x2160）
-                    width = int(res_match.group(1))
-                    height = int(res_match.group(2))
-                    if width >= 3840 and height >= 2160:
-                        return True
-            except ValueError:
-                pass
-    
-    return False
+    return get_simple_category(channel_name) == "4K频道"
 
 # 检查URL是否有效
 def check_url(url, timeout=2, retries=0):
@@ -743,88 +722,202 @@ def check_ipv6_support():
         logger.error(f"IPv6支持检查失败: {e}")
         return False
 
-# 从M3U文件中提取频道信息
-def extract_channels_from_m3u(content):
-    """从M3U内容中提取频道信息"""
-    channels = defaultdict(list)
-    matches = re.findall(M3U_CHANNEL_PATTERN, content)
+# 流式解析时允许的直播流协议
+STREAM_PROTOCOLS = ('http://', 'https://', 'udp://', 'rtsp://', 'rtmp://', 'mms://', 'rtp://')
+
+# 购物频道过滤关键词
+SHOPPING_KEYWORDS = ['购物', '导购', '电视购物']
+
+def _is_acceptable_channel_name(channel_name):
+    """检查频道名是否可用（非空、非纯数字、非购物频道）"""
+    # 检查频道名是否为空
+    if not channel_name:
+        return False
+    
+    # 检查频道名是否为纯数字
+    if channel_name.isdigit():
+        return False
+    
+    # 购物频道过滤
+    channel_name_lower = channel_name.lower()
+    if any(keyword in channel_name_lower for keyword in SHOPPING_KEYWORDS):
+        return False
     
-    for match in matches:
-        tvg_name = match[0].strip() if match[0] else match[2].strip()
-        channel_name = match[2].strip()
-        url = match[3].strip()
+    return True
+
+def _iter_text_lines(content):
+    """逐行遍历字符串内容，不额外生成整份行列表"""
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.find('\n', start)
+        if end == -1:
+            yield content[start:]
+            return
+        yield content[start:end]
+        start = end + 1
+
+def _iter_decoded_lines(lines):
+    """将可迭代的行统一为字符串（兼容response.iter_lines()返回的bytes）"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        yield line
+
+def _iter_m3u_channels(lines):
+    """流式解析M3U行，产出(分类, 频道名, URL)
+    
+    频道名取#EXTINF的显示名（没有显示名时取tvg-name），
+    条目下的每个流媒体协议URL（http、udp、rtsp等）各产出一个频道
+    """
+    for entry in iter_m3u_entries(lines):
+        channel_name = entry.name
+        if not _is_acceptable_channel_name(channel_name):
+            continue
+        category = get_simple_category(channel_name)
+        for url in entry.urls:
+            if url.startswith(STREAM_PROTOCOLS):
+                yield category, channel_name, url
+
+def _iter_txt_channels(lines):
+    """流式解析TXT行（格式：频道名称,URL），产出(分类, 频道名, URL)"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
         
-        # 检查频道名是否为空
-        if not channel_name:
+        # 分组标记行 - 分类由频道名决定，这里只需跳过
+        if line.endswith(',#genre#'):
             continue
         
-        # 检查频道名是否为纯数字
-        if channel_name.isdigit():
+        # 跳过注释行（以#开头的行）
+        if line.startswith('#'):
             continue
         
-        # 购物频道过滤
-        channel_name_lower = channel_name.lower()
-        shopping_keywords = ['购物', '导购', '电视购物']
-        if any(keyword in channel_name_lower for keyword in shopping_keywords):
+        # 解析频道信息（格式：频道名称,URL）
+        if ',' in line:
+            channel_name, url = line.split(',', 1)
+            channel_name = channel_name.strip()
+            url = url.strip()
+            
+            if not _is_acceptable_channel_name(channel_name):
+                continue
+            
+            # 跳过无效的URL（允许http, https, udp, rtsp, rtmp等常见流媒体协议）
+            if not url.startswith(STREAM_PROTOCOLS):
+                continue
+            
+            # 简化处理：直接使用频道名称，简单分类
+            yield get_simple_category(channel_name), channel_name, url
+
+def iter_channels(lines):
+    """流式解析直播源（M3U和TXT共用的统一入口）
+    
+    参数:
+        lines: 任意可迭代的行，例如文件对象、response.iter_lines()或_iter_text_lines(content)
+    
+    返回:
+        生成器，逐个产出(分类, 频道名, URL)，数据边到达边解析，不需要先保存完整内容
+    """
+    lines = _iter_decoded_lines(lines)
+    
+    # 根据第一个非空行判断格式
+    for first_line in lines:
+        stripped = first_line.strip().lstrip('\ufeff')
+        if not stripped:
             continue
         
-        # 简化处理：直接使用频道名称，简单分类
-        category = get_simple_category(channel_name)
-        channels[category].append((channel_name, url))
+        remaining = _prepend_line(first_line, lines)
+        if stripped.startswith('#EXTM3U'):
+            yield from _iter_m3u_channels(remaining)
+        else:
+            yield from _iter_txt_channels(remaining)
+        return
+
+def _parse_channel_chunk(lines, file_format, carry_category):
+    """并行解析时在子进程中解析一个块（分类由频道名决定，不需要块之前的分类）"""
+    if file_format == FORMAT_M3U:
+        return list(_iter_m3u_channels(lines))
+    return list(_iter_txt_channels(lines))
+
+def iter_channels_from_file(file_path, parallel_workers=0, min_parallel_size=0):
+    """解析本地直播源文件，产出(分类, 频道名, URL)
+    
+    参数:
+        file_path: 本地文件路径（UTF-8编码）
+        parallel_workers: 并行解析的进程数，0表示逐行串行解析，-1表示使用全部CPU核心
+        min_parallel_size: 文件达到该字节数时才并行解析
+    """
+    if parallel_workers < 0:
+        parallel_workers = multiprocessing.cpu_count()
+    if parallel_workers > 1 and os.path.getsize(file_path) >= min_parallel_size:
+        yield from parse_file_parallel(file_path, _parse_channel_chunk, parallel_workers)
+        return
     
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from iter_channels(f)
+
+def _prepend_line(first_line, lines):
+    """把已读取的第一行放回行迭代器前端"""
+    yield first_line
+    yield from lines
+
+def collect_channels(channel_iter):
+    """将流式解析结果按分类收集为defaultdict(list)"""
+    channels = defaultdict(list)
+    for category, channel_name, url in channel_iter:
+        channels[category].append(Channel(channel_name, url))
     return channels
 
+# 从M3U文件中提取频道信息
+def extract_channels_from_m3u(content):
+    """从M3U内容中提取频道信息"""
+    return collect_channels(_iter_m3u_channels(_iter_text_lines(content)))
+
 # 简化频道分类
 def get_simple_category(channel_name):
-    """简单的频道分类"""
-    name_lower = channel_name.lower()
-    
-    # 4K频道
-    if any(keyword in name_lower for keyword in ['4k', '2160p', '超高清', 'uhd']):
-        return "4K频道"
-    
-    # 央视频道
-    if any(keyword in name_lower for keyword in ['央视', 'cctv', 'cnn']):
-        return "央视频道"
-    
-    # 卫视频道
-    if any(keyword in name_lower for keyword in ['卫视', '东方卫视', '湖南卫视', '江苏卫视', '浙江卫视']):
-        return "卫视频道"
-    
-    # 港澳台
-    if any(keyword in name_lower for keyword in ['香港', '台湾', '澳门', 'hktv', 'cti', 'ctv']):
-        return "港澳频道"
-    
-    # 电影频道
-    if any(keyword in name_lower for keyword in ['电影', 'movie', 'cinema']):
-        return "电影频道"
-    
-    # 儿童频道
-    if any(keyword in name_lower for keyword in ['儿童', '少儿', '动画', '卡通', 'kids']):
-        return "儿童频道"
-    
-    # 体育频道
-    if any(keyword in name_lower for keyword in ['体育', 'sports', '足球', '篮球']):
-        return "体育频道"
-    
-    # 综艺频道
-    if any(keyword in name_lower for keyword in ['综艺', 'variety', '娱乐']):
-        return "综艺频道"
-    
-    # 新闻频道
-    if any(keyword in name_lower for keyword in ['新闻', 'news', '资讯']):
-        return "新闻频道"
-    
-    # 音乐频道
-    if any(keyword in name_lower for keyword in ['音乐', 'music', 'MTV']):
-        return "音乐频道"
-    
-    # 默认分类
-    return "综合频道"
+    """简单的频道分类（关键词表见channel_classifier.CATEGORY_TABLE）"""
+    return classify_channel(channel_name)
+
+# 读取响应正文（支持取消）
+def _read_response_text(response, cancel_event=None):
+    """读取响应正文，收到取消信号时中止读取并返回None"""
+    if cancel_event is None:
+        return response.text
+    
+    chunks = []
+    # chunk_size=None：数据到达即返回，避免慢速源长时间阻塞在单个数据块上
+    for chunk in response.iter_content(chunk_size=None):
+        if cancel_event.is_set():
+            response.close()
+            return None
+        chunks.append(chunk)
+    
+    data = b''.join(chunks)
+    # 与response.text保持一致：响应头未声明编码时自动检测
+    encoding = response.encoding
+    if encoding is None:
+        best = from_bytes(data).best()
+        encoding = best.encoding if best is not None else 'utf-8'
+    try:
+        return data.decode(encoding, errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')
+
+# 重试等待（支持取消）
+def _wait_before_retry(wait_time, cancel_event=None):
+    """重试前等待，返回True表示等待期间收到了取消信号"""
+    if cancel_event is None:
+        time.sleep(wait_time)
+        return False
+    return cancel_event.wait(wait_time)
 
 # 从URL获取M3U内容
-def fetch_m3u_content(url, max_retries=3, timeout=120):
-    """从URL或本地文件获取M3U内容，支持超时、重试机制和增量更新"""
+def fetch_m3u_content(url, max_retries=3, timeout=120, cancel_event=None):
+    """从URL或本地文件获取M3U内容，支持超时、重试机制和增量更新
+    
+    cancel_event为threading.Event时，读取正文和重试等待期间会检查取消信号（asyncio获取模式使用）
+    """
     # 处理本地文件路径
     if url.startswith('file://'):
         file_path = url[7:]  # 移除file://前缀
@@ -840,13 +933,16 @@ def fetch_m3u_content(url, max_retries=3, timeout=120):
     # 检查缓存
     etag = None
     last_modified = None
-    if url in source_cache:
-        cached_time, cached_content, cached_etag, cached_last_modified = source_cache[url]
-        if time.time() - cached_time < cache_expiry_time:
-            print(f"正在从缓存获取: {url}")
-            return cached_content
-        etag = cached_etag
-        last_modified = cached_last_modified
+    cached_meta = source_cache.get_meta(url)
+    if cached_meta is not None:
+        if time.time() - cached_meta['cached_time'] < cache_expiry_time:
+            cached_entry = source_cache.get(url)
+            if cached_entry is not None:
+                source_cache.record_hit()
+                print(f"正在从缓存获取: {url}")
+                return cached_entry.content
+        etag = cached_meta.get('etag')
+        last_modified = cached_meta.get('last_modified')
     
     # 缓存不存在或已过期，尝试增量更新
     headers = {}
@@ -857,40 +953,47 @@ def fetch_m3u_content(url, max_retries=3, timeout=120):
     
     # 处理远程URL
     for attempt in range(max_retries):
+        if cancel_event is not None and cancel_event.is_set():
+            print(f"已取消获取: {url}")
+            return None
         try:
             # 添加verify=False参数来跳过SSL证书验证，并使用自定义headers
-            response = session.get(url, timeout=timeout, verify=False, headers=headers)
+            response = session.get(url, timeout=timeout, verify=False, headers=headers,
+                                   stream=cancel_event is not None)
             
             if response.status_code == 304:
                 # 内容未修改，使用缓存内容
                 print(f"内容未修改，使用缓存: {url}")
-                if url in source_cache:
-                    cached_time, cached_content, cached_etag, cached_last_modified = source_cache[url]
-                    # 更新缓存时间
-                    source_cache[url] = (time.time(), cached_content, cached_etag, cached_last_modified)
-                    save_cache()
-                    return cached_content
+                cached_entry = source_cache.get(url)
+                if cached_entry is not None:
+                    # 只更新缓存时间，不重写内容
+                    source_cache.touch(url, time.time(), cached_entry.etag, cached_entry.last_modified)
+                    source_cache.record_revalidation()
+                    return cached_entry.content
             
             response.raise_for_status()
-            content = response.text
+            content = _read_response_text(response, cancel_event)
+            if content is None:
+                print(f"已取消获取: {url}")
+                return None
             
             # 获取新的ETag和Last-Modified
             new_etag = response.headers.get('ETag')
             new_last_modified = response.headers.get('Last-Modified')
             
             # 检查内容是否有变化（如果服务器不支持ETag/Last-Modified）
-            if url in source_cache:
-                _, old_content, _, _ = source_cache[url]
-                if calculate_md5(content) == calculate_md5(old_content):
-                    print(f"内容未变化，更新缓存时间: {url}")
-                    # 内容未变化，更新缓存时间
-                    source_cache[url] = (time.time(), old_content, new_etag, new_last_modified)
-                    save_cache()
-                    return old_content
+            # 比较元数据中保存的内容哈希，无需读取旧内容
+            cached_meta = source_cache.get_meta(url)
+            if cached_meta is not None and cached_meta.get('content_hash') == calculate_md5(content):
+                print(f"内容未变化，更新缓存时间: {url}")
+                # 内容未变化，更新缓存时间
+                source_cache.touch(url, time.time(), new_etag, new_last_modified)
+                source_cache.record_revalidation()
+                return content
             
             # 更新缓存
-            source_cache[url] = (time.time(), content, new_etag, new_last_modified)
-            save_cache()
+            source_cache.put(url, time.time(), content, new_etag, new_last_modified)
+            source_cache.record_miss()
             
             print(f"获取成功: {url}")
             return content
@@ -898,20 +1001,23 @@ def fetch_m3u_content(url, max_retries=3, timeout=120):
             # 连接错误，重试间隔增加
             wait_time = 2 ** attempt  # 指数退避
             print(f"连接错误，{wait_time}秒后重试...")
-            time.sleep(wait_time)
+            if _wait_before_retry(wait_time, cancel_event):
+                return None
         except requests.exceptions.Timeout:
             # 超时错误，增加超时时间后重试
             timeout = min(timeout * 1.5, 300)  # 最大超时5分钟
             wait_time = 2 ** attempt
             print(f"请求超时，{wait_time}秒后重试（新超时时间：{timeout}秒）...")
-            time.sleep(wait_time)
+            if _wait_before_retry(wait_time, cancel_event):
+                return None
         except Exception as e:
             # 其他错误
             print(f"获取 {url} 时出错: {e}")
             wait_time = 2 ** attempt if attempt < max_retries - 1 else 0
             if wait_time > 0:
                 print(f"{wait_time}秒后重试...")
-                time.sleep(wait_time)
+                if _wait_before_retry(wait_time, cancel_event):
+                    return None
     return None
 
 
@@ -1001,67 +1107,13 @@ def generate_txt_file(channels, output_path):
 
 # 从本地TXT文件提取频道信息
 def extract_channels_from_txt(file_path):
-    """从本地TXT文件提取频道信息"""
-    channels = defaultdict(list)
-    
+    """从本地TXT文件提取频道信息（逐行流式读取）"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # 处理分组标记行 - 只支持,#genre#格式
-                if line.endswith(',#genre#'):
-                    # 提取分组名：去掉 ",#genre#" 后缀
-                    group_name = line[:-8].strip()  # 去掉 ",#genre#" (8个字符)
-                    
-                    # 清理前后的#符号
-                    while group_name.startswith('#'):
-                        group_name = group_name[1:].strip()
-                    while group_name.endswith('#'):
-                        group_name = group_name[:-1].strip()
-                    
-                    # 清理BOM字符和其他不可见字符
-                    group_name = group_name.replace('﻿', '').replace('\ufeff', '').strip()
-                    current_group = group_name
-                    continue
-                
-                # 跳过注释行（以#开头的行） - 但要确保分类行已经处理过了
-                if line.startswith('#'):
-                    continue
-                
-                # 解析频道信息（格式：频道名称,URL）
-                if ',' in line:
-                    channel_name, url = line.split(',', 1)
-                    channel_name = channel_name.strip()
-                    url = url.strip()
-                    
-                    # 检查频道名是否为空
-                    if not channel_name:
-                        continue
-                    
-                    # 检查频道名是否为纯数字
-                    if channel_name.isdigit():
-                        continue
-                    
-                    # 购物频道过滤
-                    channel_name_lower = channel_name.lower()
-                    shopping_keywords = ['购物', '导购', '电视购物']
-                    if any(keyword in channel_name_lower for keyword in shopping_keywords):
-                        continue
-                    
-                    # 跳过无效的URL（允许http, https, udp, rtsp, rtmp等常见流媒体协议）
-                    if not url.startswith(('http://', 'https://', 'udp://', 'rtsp://', 'rtmp://', 'mms://', 'rtp://')):
-                        continue
-                    
-                    # 简化处理：直接使用频道名称，简单分类
-                    category = get_simple_category(channel_name)
-                    channels[category].append((channel_name, url))
+            return collect_channels(_iter_txt_channels(f))
     except Exception as e:
         print(f"解析本地文件 {file_path} 时出错: {e}")
-    
-    return channels
+        return defaultdict(list)
 
 # 动态计算最优并发数
 def get_optimal_workers():
@@ -1078,18 +1130,78 @@ def get_optimal_workers():
 
 # 测试频道URL有效性
 def test_channels(channels):
-    """测试所有频道的URL有效性（使用快速检测器优化）"""
+    """测试所有频道的URL有效性（增量模式下复用仍在有效期内的测试结论）"""
     if not config["url_testing"]["enable"]:
         print("📌 URL测试功能已禁用")
         return channels
     
-    print(f"🔍 开始测试频道URL有效性: {datetime.now(timezone(timedelta(hours=8)))}")
+    if config["incremental"]["enable"]:
+        return _test_channels_incremental(channels)
+    return _test_channels_live(channels)
+
+def get_health_store():
+    """获取流健康状态库（首次使用时打开）"""
+    global health_store
+    if health_store is None:
+        health_store = open_health_store(config["health"])
+    return health_store
+
+def _test_channels_live(channels):
+    """检测频道URL，启用健康状态库时只检测复检时间已到的URL"""
+    if config["health"]["enable"]:
+        return test_channels_with_health(get_health_store(), channels, _test_channels_uncached)
+    return _test_channels_uncached(channels)
+
+def _test_channels_incremental(channels):
+    """增量模式测试：只测试没有有效结论的频道，结果按原顺序合并"""
+    now = time.time()
+    verdict_ttl = config["incremental"]["verdict_ttl"]
+    
+    with incremental_lock:
+        verdicts = dict(cached_verdicts)
+    
+    reused_valid_urls = set()
+    reused_count = 0
+    channels_to_test = defaultdict(list)
+    for category, channel_list in channels.items():
+        for channel in channel_list:
+            _, url = channel
+            verdict = verdicts.get(url)
+            if verdict is not None and now - verdict[1] < verdict_ttl:
+                reused_count += 1
+                if verdict[0]:
+                    reused_valid_urls.add(url)
+            else:
+                channels_to_test[category].append(channel)
+    
+    to_test_count = sum(len(channel_list) for channel_list in channels_to_test.values())
+    print(f"♻️ 复用 {reused_count} 个频道的测试结论，需要重新测试 {to_test_count} 个频道")
     
-    # 收集所有需要测试的频道
-    all_channel_items = []
+    tested_valid_urls = set()
+    if channels_to_test:
+        tested_channels = _test_channels_live(channels_to_test)
+        tested_valid_urls = {url for channel_list in tested_channels.values() for _, url in channel_list}
+        with incremental_lock:
+            for channel_list in channels_to_test.values():
+                for _, url in channel_list:
+                    cached_verdicts[url] = (url in tested_valid_urls, now)
+    
+    _save_incremental_verdicts()
+    
+    valid_channels = defaultdict(list)
     for category, channel_list in channels.items():
-        for channel_name, url in channel_list:
-            all_channel_items.append((category, channel_name, url))
+        for channel in channel_list:
+            _, url = channel
+            if url in reused_valid_urls or url in tested_valid_urls:
+                valid_channels[category].append(channel)
+    return valid_channels
+
+def _test_channels_uncached(channels):
+    """测试所有频道的URL有效性（使用快速检测器优化）"""
+    print(f"🔍 开始测试频道URL有效性: {datetime.now(timezone(timedelta(hours=8)))}")
+    
+    # 收集所有需要测试的频道（直接引用原频道对象，不再重新打包）
+    all_channel_items = [(category, channel) for category, channel_list in channels.items() for channel in channel_list]
     
     total_channels = len(all_channel_items)
     print(f"📺 待测试频道总数: {total_channels}")
@@ -1107,25 +1219,23 @@ def test_channels(channels):
         print("🚀 使用轻量级快速检测器进行批量检测...")
         
         try:
-            # 准备URL列表
-            urls = [(category, channel_name, url) for category, channel_name, url in all_channel_items]
-            
             # 创建快速检测器
             checker = create_quick_checker(
                 timeout=config["url_testing"]["timeout"],
                 max_workers=min(32, config["url_testing"]["workers"]),
-                enable_dns_check=True
+                enable_dns_check=True,
+                per_host_limit=config["url_testing"].get("per_host_limit", 4),
+                host_rate=config["url_testing"].get("host_rate", 8.0),
+                backend=config["url_testing"].get("backend", "threads")
             )
             
             # 批量检测
-            results = checker.batch_check([url for _, _, url in urls], show_progress=True)
+            results = checker.batch_check([url for _, (_, url) in all_channel_items], show_progress=True)
             
             # 处理结果
-            for i, result in enumerate(results):
-                category, channel_name, url = urls[i]
-                
+            for i, ((category, channel), result) in enumerate(zip(all_channel_items, results)):
                 if result['valid']:
-                    valid_channels[category].append((channel_name, url))
+                    valid_channels[category].append(channel)
                     valid_count += 1
                 else:
                     invalid_count += 1
@@ -1151,11 +1261,8 @@ def test_channels(channels):
 
 def test_channels_traditional(channels):
     """传统URL检测方法（作为回退方案）"""
-    # 收集所有需要测试的频道
-    all_channel_items = []
-    for category, channel_list in channels.items():
-        for channel_name, url in channel_list:
-            all_channel_items.append((category, channel_name, url))
+    # 收集所有需要测试的频道（直接引用原频道对象，不再重新打包）
+    all_channel_items = [(category, channel) for category, channel_list in channels.items() for channel in channel_list]
     
     total_channels = len(all_channel_items)
     
@@ -1173,11 +1280,10 @@ def test_channels_traditional(channels):
     
     # 测试单个频道URL
     def test_single_channel(channel_item):
-        category, channel_name, url = channel_item
+        _, (channel_name, url) = channel_item
         # 对于4K频道使用稍长的超时时间（但不要过长）
         timeout = 4 if is_4k(channel_name, url) else config["url_testing"]["timeout"]
-        is_valid = check_url(url, timeout=timeout, retries=config["url_testing"]["retries"])
-        return (category, channel_name, url, is_valid)
+        return check_url(url, timeout=timeout, retries=config["url_testing"]["retries"])
     
     # 计算总超时时间（基于并发数和每个任务的最大超时时间）
     total_tested = len(all_channel_items)
@@ -1193,11 +1299,11 @@ def test_channels_traditional(channels):
         
         try:
             for future in as_completed(future_to_channel, timeout=total_timeout):
-                category, channel_name, url = future_to_channel[future]
+                category, channel = future_to_channel[future]
+                channel_name, _ = channel
                 try:
                     # 为单个future.result()添加超时时间
-                    result = future.result(timeout=base_timeout + 1)
-                    category, channel_name, url, is_valid = result
+                    is_valid = future.result(timeout=base_timeout + 1)
                 except concurrent.futures.TimeoutError:
                     print(f"⚠️  频道 {channel_name} 测试超时")
                     is_valid = False
@@ -1208,7 +1314,7 @@ def test_channels_traditional(channels):
                 tested_count += 1
                 
                 if is_valid:
-                    valid_channels[category].append((channel_name, url))
+                    valid_channels[category].append(channel)
                     valid_count += 1
                 else:
                     invalid_count += 1
@@ -1230,39 +1336,81 @@ def test_channels_traditional(channels):
     return valid_channels
 
 # 处理单个远程直播源
-def process_single_source(source_url):
+def process_single_source(source_url, cancel_event=None):
     """处理单个远程直播源或本地文件"""
-    content = fetch_m3u_content(source_url)
+    if source_url.startswith('file://'):
+        # 本地文件直接逐行流式解析，不把整个文件读入内存
+        file_path = source_url[7:]
+        try:
+            print(f"正在读取本地文件: {file_path}")
+            parsing_config = config.get("parsing", {})
+            return collect_channels(iter_channels_from_file(
+                file_path,
+                parallel_workers=parsing_config.get("parallel_workers", 0),
+                min_parallel_size=parsing_config.get("parallel_min_size_mb", 32) * 1024 * 1024
+            ))
+        except Exception as e:
+            print(f"读取本地文件 {file_path} 时出错: {e}")
+            return None
+    
+    content = fetch_m3u_content(source_url, cancel_event=cancel_event)
     if content:
-        # 根据内容判断格式
-        if content.strip().startswith('#EXTM3U'):
-            # M3U格式
-            return extract_channels_from_m3u(content)
-        else:
-            # TXT格式（安全地保存到临时文件再解析）
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False, encoding='utf-8') as f:
-                temp_file_path = f.name
-                f.write(content)
-            
-            # 设置安全的文件权限（仅所有者可读写）
-            os.chmod(temp_file_path, 0o600)
-            
-            try:
-                return extract_channels_from_txt(temp_file_path)
-            finally:
-                # 确保清理临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
+        if config["incremental"]["enable"]:
+            return _parse_source_incremental(source_url, content)
+        # M3U和TXT使用同一个流式解析入口，无需写入临时文件再读取
+        return collect_channels(iter_channels(_iter_text_lines(content)))
     return None
 
+def _parse_source_incremental(source_url, content):
+    """增量模式解析：内容哈希与上次相同时直接复用缓存中的解析结果和测试结论"""
+    content_hash = calculate_md5(content)
+    cached_channels = source_cache.get_derived(source_url, 'channels', content_hash)
+    
+    if cached_channels is not None:
+        print(f"♻️ 直播源内容未变化，复用上次的解析结果: {source_url}")
+        channels = defaultdict(list)
+        for category, channel_list in cached_channels.items():
+            channels[category] = [as_channel(item) for item in channel_list]
+        
+        # 恢复该源下频道的测试结论，同一URL出现在多个源时保留最近的结论
+        verdicts = source_cache.get_derived(source_url, 'verdicts', content_hash) or {}
+        with incremental_lock:
+            for url, (is_valid, tested_time) in verdicts.items():
+                previous = cached_verdicts.get(url)
+                if previous is None or previous[1] < tested_time:
+                    cached_verdicts[url] = (is_valid, tested_time)
+    else:
+        channels = collect_channels(iter_channels(_iter_text_lines(content)))
+        source_cache.put_derived(source_url, 'channels', content_hash, channels)
+    
+    with incremental_lock:
+        incremental_sources[source_url] = (
+            content_hash,
+            [url for channel_list in channels.values() for _, url in channel_list]
+        )
+    return channels
+
+def _save_incremental_verdicts():
+    """将测试结论按各直播源的内容哈希写入缓存，供下次运行复用"""
+    with incremental_lock:
+        sources = dict(incremental_sources)
+        verdicts = dict(cached_verdicts)
+    
+    for source_url, (content_hash, urls) in sources.items():
+        source_verdicts = {url: list(verdicts[url]) for url in urls if url in verdicts}
+        if source_verdicts:
+            source_cache.put_derived(source_url, 'verdicts', content_hash, source_verdicts)
+
 # 合并直播源
 def merge_sources(sources, local_files):
-    """合并多个直播源"""
-    all_channels = defaultdict(list)
-    seen = set()
+    """合并多个直播源（合并过程中使用列式频道表按 (频道名, URL) 去重，结束时再转换为频道字典）"""
+    channel_table = ChannelTable()
     
     print(f"🔍 开始合并直播源: {datetime.now(timezone(timedelta(hours=8)))}")
     
+    with incremental_lock:
+        incremental_sources.clear()
+    
     # 将本地文件转换为file:// URL
     local_sources = [f"file://{os.path.abspath(file_path)}" for file_path in local_files if os.path.exists(file_path)]
     
@@ -1272,54 +1420,76 @@ def merge_sources(sources, local_files):
     
     if not all_source_urls:
         print("❌ 没有可用的直播源")
-        return all_channels
-    
-    # 统一处理所有源（并发）
-    max_workers = get_optimal_workers()
-    print(f"使用 {max_workers} 个并发线程处理所有直播源...")
+        return defaultdict(list)
     
     remote_channel_count = 0
     local_channel_count = 0
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_source = {executor.submit(process_single_source, source_url): source_url for source_url in all_source_urls}
+    def merge_result(source_url, result):
+        """合并单个直播源的解析结果"""
+        nonlocal remote_channel_count, local_channel_count
         
-        for future in as_completed(future_to_source):
-            result = future.result()
-            source_url = future_to_source[future]
+        if result:
+            source_channels = sum(len(clist) for _, clist in result.items())
             
-            if result:
-                source_channels = sum(len(clist) for _, clist in result.items())
-                
-                # 判断是本地文件还是远程源
-                if source_url.startswith('file://'):
-                    local_channel_count += source_channels
-                    print(f"✅ 本地文件 {source_url[7:]} 获取到 {source_channels} 个频道")
-                else:
-                    remote_channel_count += source_channels
-                    print(f"✅ 远程源 {source_url} 获取到 {source_channels} 个频道")
-                
-                for group_title, channel_list in result.items():
-                    for channel_name, url in channel_list:
-                        # 4K过滤
-                        if config["filter"]["only_4k"] and not is_4k(channel_name, url):
-                            continue
-                        # 去重
-                        if (channel_name, url) not in seen:
-                            all_channels[group_title].append((channel_name, url))
-                            seen.add((channel_name, url))
+            # 判断是本地文件还是远程源
+            if source_url.startswith('file://'):
+                local_channel_count += source_channels
+                print(f"✅ 本地文件 {source_url[7:]} 获取到 {source_channels} 个频道")
             else:
-                # 判断是本地文件还是远程源
-                if source_url.startswith('file://'):
-                    print(f"❌ 本地文件 {source_url[7:]} 获取失败")
-                else:
-                    print(f"❌ 远程源 {source_url} 获取失败")
+                remote_channel_count += source_channels
+                print(f"✅ 远程源 {source_url} 获取到 {source_channels} 个频道")
+            
+            for group_title, channel_list in result.items():
+                for channel_name, url in channel_list:
+                    # 4K过滤
+                    if config["filter"]["only_4k"] and not is_4k(channel_name, url):
+                        continue
+                    # 去重
+                    channel_table.add(group_title, channel_name, url)
+        else:
+            # 判断是本地文件还是远程源
+            if source_url.startswith('file://'):
+                print(f"❌ 本地文件 {source_url[7:]} 获取失败")
+            else:
+                print(f"❌ 远程源 {source_url} 获取失败")
+    
+    # 统一处理所有源（并发）
+    max_workers = get_optimal_workers()
+    
+    if config["network"].get("fetch_mode") == "asyncio":
+        # asyncio模式：按主机限流，到达全局截止时间后取消慢速源
+        deadline = config["network"].get("fetch_deadline", 600)
+        per_host_limit = config["network"].get("per_host_limit", 2)
+        print(f"使用asyncio获取所有直播源（全局并发: {max_workers}, 每主机并发: {per_host_limit}, 截止时间: {deadline}秒）...")
+        
+        results, cancelled = fetch_sources_async(
+            all_source_urls,
+            process_single_source,
+            per_host_limit=per_host_limit,
+            max_concurrency=max_workers,
+            deadline=deadline
+        )
+        for source_url in cancelled:
+            print(f"⏱️ 直播源 {source_url} 超过全局截止时间，已取消")
+        
+        # 按原始顺序合并，保证输出稳定
+        for source_url in all_source_urls:
+            merge_result(source_url, results.get(source_url))
+    else:
+        print(f"使用 {max_workers} 个并发线程处理所有直播源...")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_source = {executor.submit(process_single_source, source_url): source_url for source_url in all_source_urls}
+            
+            for future in as_completed(future_to_source):
+                merge_result(future_to_source[future], future.result())
     
     print(f"📊 远程直播源获取总数: {remote_channel_count} 个频道")
     print(f"📊 本地直播源获取总数: {local_channel_count} 个频道")
-    print(f"📊 合并后总频道数: {sum(len(clist) for _, clist in all_channels.items())} 个频道")
+    print(f"📊 合并后总频道数: {len(channel_table)} 个频道（去除重复 {channel_table.duplicates} 个）")
     
-    return all_channels
+    return channel_table.to_dict()
 
 
 # 忽略requests的SSL警告
@@ -1351,6 +1521,9 @@ def _update_with_traditional_method(start_time):
     
     all_channels = merge_sources(all_sources, config['sources']['local'])
     
+    # 所有直播源获取完毕，统一落盘缓存
+    save_cache()
+    
     # 添加调试日志
     logger.info(f"🔍 合并后获取到的频道组数量: {len(all_channels)}")
     if not all_channels:
@@ -1520,6 +1693,8 @@ def main():
   python IPTV.py --check-syntax
   python IPTV.py --fix-chars
   python IPTV.py --filter-4k
+  python IPTV.py --update --async-fetch
+  python IPTV.py --update --incremental
         """
     )
     
@@ -1531,6 +1706,10 @@ def main():
                        help='修复IPTV.py文件中的不可打印字符')
     parser.add_argument('--filter-4k', action='store_true', 
                        help='只获取4K频道')
+    parser.add_argument('--async-fetch', action='store_true', 
+                       help='使用asyncio获取直播源（按主机限流，超过全局截止时间后取消慢速源）')
+    parser.add_argument('--incremental', action='store_true', 
+                       help='增量模式：内容未变化的直播源复用上次的解析结果和URL测试结论')
     
     try:
         # 验证命令行参数安全性
@@ -1539,6 +1718,11 @@ def main():
         # 解析命令行参数
         args = parser.parse_args()
         
+        if args.async_fetch:
+            config["network"]["fetch_mode"] = "asyncio"
+        if args.incremental:
+            config["incremental"]["enable"] = True
+        
         # 执行相应操作
         if args.update:
             # 手动更新模式
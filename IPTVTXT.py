@@ -12,6 +12,11 @@ import requests
 import concurrent.futures
 from collections import defaultdict
 from urllib.parse import urlparse
+from cache_store import open_cache_store
+from channel_record import Channel
+from channel_table import ChannelTable
+from quality_scorer import score_text, meets_resolution, is_4k_text, TIER_4K
+from stream_health import open_health_store, test_channels_with_health
 
 # 尝试导入快速URL检测器
 try:
@@ -53,11 +58,26 @@ DEFAULT_CONFIG = {
             "enable": True,    # 启用URL有效性测试
             "timeout": 2,      # URL测试超时时间（秒）
             "retries": 0,      # URL测试重试次数
-            "workers": 32      # URL测试并发数（降低并发数避免资源耗尽）
+            "workers": 32,     # URL测试并发数（降低并发数避免资源耗尽）
+            "per_host_limit": 4,  # 快速检测时每个主机的最大并发数
+            "host_rate": 8.0,     # 快速检测时每个主机每秒最多发起的请求数，0表示不限速
+            "backend": "threads"  # 快速检测后端: threads（requests线程池）或 asyncio（事件循环探测）
         },
     "cache": {
         "expiry_time": 3600,  # 缓存有效期（秒）
-        "file": "source_cache.json"  # 缓存文件路径
+        "dir": "source_cache",  # 缓存目录（与IPTV.py共用）
+        "max_size_mb": 200,  # 缓存内容总大小上限（MB），0表示不限制
+        "write_behind": True,  # 延迟写入：更新先保存在内存中，运行结束时统一落盘
+        "flush_interval": 60,  # 延迟写入的自动落盘间隔（秒），0表示只在运行结束时落盘
+        "file": "source_cache.json"  # 旧版JSON缓存文件路径（首次运行时自动导入）
+    },
+    "health": {
+        "enable": False,               # 启用流健康状态库，只重新检测复检时间已到的URL
+        "db_file": "stream_health.db", # 健康状态数据库文件
+        "healthy_ttl": 3600,           # 可用流的基础复检间隔（秒），连续可用时逐步延长
+        "max_healthy_ttl": 259200,     # 可用流的最长复检间隔（秒）
+        "failed_ttl": 1800,            # 失效流的基础复检间隔（秒），连续失效时指数退避
+        "max_failed_ttl": 604800       # 失效流的最长复检间隔（秒）
     },
     "output": {
         "m3u_file": "jieguo_txt.m3u",  # M3U输出文件
@@ -408,12 +428,19 @@ def update_global_vars_from_config():
     # 更新过滤设置
     open_filter_resolution = config["filter"]["resolution"]
     min_resolution = tuple(config["filter"]["min_resolution"])
+    
+    # 重建频道名称查找索引
+    rebuild_channel_index()
 
 # 直播源内容缓存配置
 import hashlib
 
-# 缓存字典，格式：{url: (cached_time, content, etag, last_modified)}
-source_cache = {}
+# 缓存存储，按URL索引，条目格式：(cached_time, content, etag, last_modified)
+# 由load_cache()按最终配置打开；模块导入时（包括并行解析的子进程）不创建缓存目录
+source_cache = None
+
+# 流健康状态库（启用health时按需打开）
+health_store = None
 
 # 初始化全局变量
 CACHE_FILE = DEFAULT_CONFIG["cache"]["file"]
@@ -421,48 +448,32 @@ cache_expiry_time = DEFAULT_CONFIG["cache"]["expiry_time"]
 open_filter_resolution = DEFAULT_CONFIG["filter"]["resolution"]
 min_resolution = tuple(DEFAULT_CONFIG["filter"]["min_resolution"])
 
-# 保存缓存到文件
+# 保存缓存
 def save_cache():
-    """将缓存保存到文件"""
+    """将延迟写入的缓存条目统一落盘，并输出缓存统计"""
+    if source_cache is None:
+        return True
     try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            # 转换为可序列化的格式
-            serializable_cache = {}
-            for url, (cached_time, content, etag, last_modified) in source_cache.items():
-                serializable_cache[url] = {
-                    'cached_time': cached_time,
-                    'content': content,
-                    'etag': etag,
-                    'last_modified': last_modified
-                }
-            json.dump(serializable_cache, f, ensure_ascii=False, indent=2)
+        written = source_cache.flush()
+        logger.info(f"💾 缓存已保存: 写入 {written} 个条目，{source_cache.stats_summary()}")
         return True
     except Exception as e:
         logger.error(f"保存缓存失败: {e}")
         return False
 
-# 从文件加载缓存
+# 加载缓存
 def load_cache():
-    """从文件加载缓存"""
+    """按当前配置打开缓存目录，并导入旧版JSON缓存文件中的条目"""
     global source_cache
     try:
-        if os.path.exists(CACHE_FILE):
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                serializable_cache = json.load(f)
-                # 转换回原始格式
-                source_cache = {}
-                for url, data in serializable_cache.items():
-                    source_cache[url] = (
-                        data['cached_time'],
-                        data['content'],
-                        data.get('etag'),
-                        data.get('last_modified')
-                    )
-            logger.info(f"✅ 从缓存文件加载了 {len(source_cache)} 个缓存条目")
+        source_cache = open_cache_store(config["cache"])
+        imported = source_cache.import_legacy_json(CACHE_FILE)
+        if imported:
+            logger.info(f"✅ 从旧版缓存文件导入了 {imported} 个缓存条目")
+        logger.info(f"✅ 缓存目录: {source_cache.cache_dir}，共 {len(source_cache)} 个缓存条目")
         return True
     except Exception as e:
         logger.error(f"加载缓存失败: {e}")
-        source_cache = {}
         return False
 
 # 计算内容的MD5哈希值
@@ -526,43 +537,6 @@ def normalize_url(url):
     
     return normalized
 
-# 高清检测的正则表达式模式（只针对URL）
-HD_PATTERNS = [
-    # 4K及以上
-    r'[48]k',
-    r'2160[pdi]',
-    r'uhd',
-    r'超高清',
-    r'4k',
-    # 2K
-    r'1440[pdi]',
-    r'qhd',
-    # 1080P及以上
-    r'1080[pdi]',
-    r'fhd',
-    # 其他高清标识
-    r'高清',
-    r'超清',
-    r'hd',
-    r'high.?definition',
-    r'high.?def',
-    # 特定的高清标识
-    r'hdmi',
-    r'蓝光',
-    r'blue.?ray',
-    r'hd.?live',
-    # 码率标识
-    r'[89]m',
-    r'[1-9]\d+m',
-    # 特定的URL参数标识
-    r'quality=high',
-    r'resolution=[1-9]\d{3}',
-    r'hd=true',
-    r'fhd=true'
-]
-
-HD_REGEX = re.compile('|'.join(HD_PATTERNS), re.IGNORECASE)
-
 # URL测试函数
 def check_url(url, timeout=2, retries=0):
     """测试URL是否可用
@@ -598,18 +572,28 @@ def check_url(url, timeout=2, retries=0):
         return False
 
 def test_channels(channels):
-    """测试所有频道的URL有效性（使用快速检测器优化）"""
+    """测试所有频道的URL有效性，启用健康状态库时只检测复检时间已到的URL"""
     if not config["url_testing"]["enable"]:
         print("📌 URL测试功能已禁用")
         return channels
     
+    if config["health"]["enable"]:
+        return test_channels_with_health(get_health_store(), channels, _test_channels_uncached)
+    return _test_channels_uncached(channels)
+
+def get_health_store():
+    """获取流健康状态库（首次使用时打开）"""
+    global health_store
+    if health_store is None:
+        health_store = open_health_store(config["health"])
+    return health_store
+
+def _test_channels_uncached(channels):
+    """测试所有频道的URL有效性（使用快速检测器优化）"""
     print(f"🔍 开始测试频道URL有效性...")
     
-    # 收集所有需要测试的频道
-    all_channel_items = []
-    for category, channel_list in channels.items():
-        for channel_name, url in channel_list:
-            all_channel_items.append((category, channel_name, url))
+    # 收集所有需要测试的频道（直接引用原频道对象，不再重新打包）
+    all_channel_items = [(category, channel) for category, channel_list in channels.items() for channel in channel_list]
     
     total_channels = len(all_channel_items)
     print(f"📺 待测试频道总数: {total_channels}")
@@ -627,25 +611,23 @@ def test_channels(channels):
         print("🚀 使用轻量级快速检测器进行批量检测...")
         
         try:
-            # 准备URL列表
-            urls = [(category, channel_name, url) for category, channel_name, url in all_channel_items]
-            
             # 创建快速检测器
             checker = create_quick_checker(
                 timeout=config["url_testing"]["timeout"],
                 max_workers=min(32, config["url_testing"]["workers"]),
-                enable_dns_check=True
+                enable_dns_check=True,
+                per_host_limit=config["url_testing"].get("per_host_limit", 4),
+                host_rate=config["url_testing"].get("host_rate", 8.0),
+                backend=config["url_testing"].get("backend", "threads")
             )
             
             # 批量检测
-            results = checker.batch_check([url for _, _, url in urls], show_progress=True)
+            results = checker.batch_check([url for _, (_, url) in all_channel_items], show_progress=True)
             
             # 处理结果
-            for i, result in enumerate(results):
-                category, channel_name, url = urls[i]
-                
+            for i, ((category, channel), result) in enumerate(zip(all_channel_items, results)):
                 if result['valid']:
-                    valid_channels[category].append((channel_name, url))
+                    valid_channels[category].append(channel)
                     valid_count += 1
                 else:
                     invalid_count += 1
@@ -676,7 +658,8 @@ def test_channels_traditional(channels):
     test_items = []
     seen_items = set()  # 用于跟踪已经添加的URL
     for category, channel_list in channels.items():
-        for channel_name, url in channel_list:
+        for channel in channel_list:
+            channel_name, url = channel
             # 检查是否已经添加过这个URL（使用规范化URL）
             normalized = normalize_url(url)
             if (category, channel_name, normalized) not in seen_items:
@@ -685,7 +668,7 @@ def test_channels_traditional(channels):
                     timeout = 5  # 4K频道超时5秒
                 else:
                     timeout = config["url_testing"]["timeout"]  # 使用配置中的超时时间
-                test_items.append((category, channel_name, url, timeout))
+                test_items.append((category, channel, url, timeout))
     
     # 并发测试URL
     tested_channels = defaultdict(list)
@@ -705,12 +688,13 @@ def test_channels_traditional(channels):
     try:
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             # 提交所有测试任务，future_to_test直接包含完整信息
-            future_to_test = {executor.submit(check_url, url, timeout, config["url_testing"]["retries"]): (category, channel_name, url) 
-                             for category, channel_name, url, timeout in test_items}
+            future_to_test = {executor.submit(check_url, url, timeout, config["url_testing"]["retries"]): (category, channel)
+                             for category, channel, url, timeout in test_items}
             
             # 收集测试结果，设置超时，防止单个任务阻塞
             for future in concurrent.futures.as_completed(future_to_test, timeout=total_tested * 2):
-                category, channel_name, url = future_to_test[future]
+                category, channel = future_to_test[future]
+                channel_name, url = channel
                 try:
                     # 为future.result()也设置超时，确保单个任务不会无限期等待
                     is_valid = future.result(timeout=timeout + 1)
@@ -719,7 +703,7 @@ def test_channels_traditional(channels):
                         normalized = normalize_url(url)
                         if (category, channel_name, normalized) not in seen_valid_items:
                             seen_valid_items.add((category, channel_name, normalized))
-                            tested_channels[category].append((channel_name, url))
+                            tested_channels[category].append(channel)
                             valid_count += 1
                             logger.debug(f"频道可用: {channel_name} -> {url}")
                     else:
@@ -745,119 +729,23 @@ def test_channels_traditional(channels):
 
     return tested_channels
 
-# 超清（4K及以上）检测的正则表达式模式
-ULTRA_HD_PATTERNS = [
-    r'[48]k',
-    r'2160[pdi]',
-    r'3840x2160',
-    r'uhd',
-    r'超高清',
-    r'4k'
-]
-
-ULTRA_HD_REGEX = re.compile('|'.join(ULTRA_HD_PATTERNS), re.IGNORECASE)
-
-# 预编译常用的分辨率检测正则表达式
-VERTICAL_RES_PATTERN = re.compile(r'(\d{3,4})[pdi]', re.IGNORECASE)
-WH_RES_PATTERN = re.compile(r'(\d+)x(\d+)', re.IGNORECASE)
-UNDERSCORE_RES_PATTERN = re.compile(r'(\d+)_(\d+)', re.IGNORECASE)
-RES_PARAM_PATTERN = re.compile(r'res=(\d+)', re.IGNORECASE)
-RESOLUTION_PARAM_PATTERN = re.compile(r'resolution=(\d+)x?(\d*)', re.IGNORECASE)
-
-# 分辨率检测的正则表达式模式（只针对URL）
-RESOLUTION_PATTERNS = [
-    r'(\d{3,4})[pdi]',  # 如1080p, 2160i
-    r'(\d+)x(\d+)',     # 如1920x1080, 3840x2160
-    r'(\d+)_(\d+)',     # 如1920_1080
-    r'res=([1-9]\d+)',       # 如res=1080
-    r'resolution=([1-9]\d+)x?([1-9]\d+)',  # 如resolution=1920x1080
-    r'width=([1-9]\d+).*?height=([1-9]\d+)',  # 如width=1920 height=1080
-]
-
 # 高清检测函数（仅针对URL分辨率参数）
 def is_high_quality_channel_line(url):
-    """判断频道线路是否为高清以上质量（仅通过URL分辨率参数检测）"""
+    """判断频道线路是否为高清以上质量（仅通过URL中的清晰度标识和分辨率参数检测）"""
     if not open_filter_resolution:
         return True
     
-    logger.debug(f"检查URL分辨率: {url}")
+    quality = score_text(url)
     
-    # 首先检查URL中是否包含高清标识
-    if HD_REGEX.search(url):
+    # URL中包含高清/4K标识（高清、蓝光、1080p、4K、高码率等）
+    if quality.hd_marker or quality.k4_marker:
         logger.debug(f"URL包含高清标识: {url}")
         return True
     
-    # 检查垂直分辨率（如1080p, 720i）
-    vertical_match = VERTICAL_RES_PATTERN.search(url)
-    if vertical_match:
-        try:
-            res_value = int(vertical_match.group(1))
-            logger.debug(f"找到垂直分辨率: {res_value}p")
-            if res_value >= min_resolution[1]:
-                logger.debug(f"垂直分辨率匹配: {res_value} >= {min_resolution[1]}")
-                return True
-        except ValueError:
-            logger.debug("垂直分辨率解析失败")
-    
-    # 检查宽高分辨率（如1920x1080, 1280x720）
-    wh_match = WH_RES_PATTERN.search(url)
-    if wh_match:
-        try:
-            width = int(wh_match.group(1))
-            height = int(wh_match.group(2))
-            logger.debug(f"找到宽高分辨率: {width}x{height}")
-            if width >= min_resolution[0] or height >= min_resolution[1]:
-                logger.debug(f"宽高分辨率匹配: {width}x{height} >= {min_resolution[0]}x{min_resolution[1]}")
-                return True
-        except ValueError:
-            logger.debug("宽高分辨率解析失败")
-    
-    # 检查下划线分隔的分辨率（如1920_1080）
-    underscore_match = UNDERSCORE_RES_PATTERN.search(url)
-    if underscore_match:
-        try:
-            width = int(underscore_match.group(1))
-            height = int(underscore_match.group(2))
-            logger.debug(f"找到下划线分隔分辨率: {width}x{height}")
-            if width >= min_resolution[0] or height >= min_resolution[1]:
-                logger.debug(f"下划线分隔分辨率匹配: {width}x{height} >= {min_resolution[0]}x{min_resolution[1]}")
-                return True
-        except ValueError:
-            logger.debug("下划线分隔分辨率解析失败")
-    
-    # 检查res参数（如res=1080）
-    res_param_match = RES_PARAM_PATTERN.search(url)
-    if res_param_match:
-        try:
-            res_value = int(res_param_match.group(1))
-            logger.debug(f"找到res参数: {res_value}")
-            if res_value >= min_resolution[1]:
-                logger.debug(f"res参数匹配: {res_value} >= {min_resolution[1]}")
-                return True
-        except ValueError:
-            logger.debug("res参数解析失败")
-    
-    # 检查resolution参数（如resolution=1920x1080）
-    resolution_param_match = RESOLUTION_PARAM_PATTERN.search(url)
-    if resolution_param_match:
-        try:
-            if resolution_param_match.group(2):
-                # 有宽高参数
-                width = int(resolution_param_match.group(1))
-                height = int(resolution_param_match.group(2))
-                logger.debug(f"找到resolution参数: {width}x{height}")
-                if width >= min_resolution[0] or height >= min_resolution[1]:
-                    logger.debug(f"resolution参数匹配: {width}x{height} >= {min_resolution[0]}x{min_resolution[1]}")
-                    return True
-            else:
-                # 只有一个参数（可能是垂直分辨率）
-                res_value = int(resolution_param_match.group(1))
-                logger.debug(f"找到resolution参数: {res_value}")
-                if res_value >= min_resolution[1]:
-                    logger.debug(f"resolution参数匹配: {res_value} >= {min_resolution[1]}")
-                    return True
-        except ValueError:
-            logger.debug("resolution参数解析失败")
+    # 分辨率（1080p、1920x1080、1920_1080、res=、resolution=）宽或高满足其一即可
+    if meets_resolution(quality, min_resolution, require_both=False):
+        logger.debug(f"分辨率匹配: {quality.width}x{quality.height} >= {min_resolution[0]}x{min_resolution[1]}")
+        return True
     
     logger.debug(f"URL不符合高清分辨率要求: {url}")
     return False
@@ -873,35 +761,44 @@ def is_ultra_high_quality(url, channel_name=""):
     返回:
         bool: 是否为超清频道
     """
-    # 检查URL中是否包含超清标识
-    if ULTRA_HD_REGEX.search(url):
+    # 检查URL中的超清标识和分辨率（2160p及以上，宽x高中宽≥3840或高≥2160）
+    if is_4k_text(url, require_both=False):
         return True
     
     # 检查频道名称中是否包含4K标识
-    if channel_name and ULTRA_HD_REGEX.search(channel_name):
-        return True
-    
-    # 检查垂直分辨率是否为2160及以上
-    vertical_match = VERTICAL_RES_PATTERN.search(url)
-    if vertical_match:
-        try:
-            res_value = int(vertical_match.group(1))
-            if res_value >= 2160:
-                return True
-        except ValueError:
-            pass
-    
-    # 检查宽高分辨率是否为3840x2160及以上
-    wh_match = WH_RES_PATTERN.search(url)
-    if wh_match:
-        try:
-            width, height = int(wh_match.group(1)), int(wh_match.group(2))
-            if width >= 3840 or height >= 2160:
-                return True
-        except ValueError:
-            pass
-    
-    return False
+    return bool(channel_name) and score_text(channel_name).tier == TIER_4K
+
+# 频道名称查找索引（由CHANNEL_MAPPING和CHANNEL_CATEGORIES构建）
+CHANNEL_ALIAS_INDEX = {}     # 小写别名/标准名 -> 标准名称
+CHANNEL_NAME_INDEX = {}      # 小写频道名 -> CHANNEL_CATEGORIES中的频道名称
+CHANNEL_CATEGORY_INDEX = {}  # 频道名称 -> 分类
+
+# 构建频道名称查找索引
+def rebuild_channel_index():
+    """根据CHANNEL_MAPPING和CHANNEL_CATEGORIES重建查找索引
+
+    修改频道映射或分类后需要调用此函数；重复的名称保留按定义顺序最先出现的一项，
+    与逐项遍历时第一个匹配项胜出的结果一致
+    """
+    alias_index = {}
+    for standard_name, aliases in CHANNEL_MAPPING.items():
+        alias_index.setdefault(standard_name.casefold(), standard_name)
+        for alias in aliases:
+            alias_index.setdefault(alias.casefold(), standard_name)
+
+    name_index = {}
+    category_index = {}
+    for category, channels in CHANNEL_CATEGORIES.items():
+        for channel in channels:
+            name_index.setdefault(channel.casefold(), channel)
+            category_index.setdefault(channel, category)
+
+    # 整体替换，避免其他线程读到构建了一半的索引
+    global CHANNEL_ALIAS_INDEX, CHANNEL_NAME_INDEX, CHANNEL_CATEGORY_INDEX
+    CHANNEL_ALIAS_INDEX, CHANNEL_NAME_INDEX, CHANNEL_CATEGORY_INDEX = alias_index, name_index, category_index
+    logger.debug(f"频道索引已构建: {len(alias_index)} 个别名，{len(category_index)} 个分类频道")
+
+rebuild_channel_index()
 
 # 频道名称标准化函数
 def normalize_channel_name(channel_name):
@@ -916,23 +813,15 @@ def normalize_channel_name(channel_name):
     if not channel_name:
         return ""
     
+    key = channel_name.casefold()
+    
     # 使用频道映射进行标准化
-    for standard_name, aliases in CHANNEL_MAPPING.items():
-        # 尝试匹配标准名称
-        if standard_name.lower() == channel_name.lower():
-            return standard_name
-        # 尝试匹配所有别名
-        for alias in aliases:
-            if alias.lower() == channel_name.lower():
-                return standard_name
+    standard_name = CHANNEL_ALIAS_INDEX.get(key)
+    if standard_name is not None:
+        return standard_name
     
     # 如果没有匹配到映射，尝试直接匹配CHANNEL_CATEGORIES中的频道名称
-    for category, channels in CHANNEL_CATEGORIES.items():
-        for channel in channels:
-            if channel.lower() == channel_name.lower():
-                return channel
-    
-    return channel_name
+    return CHANNEL_NAME_INDEX.get(key, channel_name)
 
 # 频道分类函数
 def get_channel_category(channel_name):
@@ -940,14 +829,8 @@ def get_channel_category(channel_name):
     if not channel_name:
         return None
     
-    # 检查频道是否在分类中
-    for category, channels in CHANNEL_CATEGORIES.items():
-        for channel in channels:
-            if channel_name == channel:
-                return category
-    
-    # 如果没有找到分类，返回None
-    return None
+    # 检查频道是否在分类中，没有找到分类时返回None
+    return CHANNEL_CATEGORY_INDEX.get(channel_name)
 
 # 从.txt内容中提取频道的函数
 def extract_channels_from_txt(content):
@@ -988,7 +871,7 @@ def extract_channels_from_txt(content):
                         category = get_channel_category(normalized_name)
                         # 只添加有分类的频道（不在CHANNEL_CATEGORIES中的频道会被舍弃）
                         if category:
-                            channels[category].append((normalized_name, url))
+                            channels[category].append(Channel(normalized_name, url))
                             logger.debug(f"添加4K频道: {normalized_name} -> {url} (分类: {category})")
                         else:
                             logger.debug(f"舍弃未分类4K频道: {normalized_name} -> {url}")
@@ -997,7 +880,7 @@ def extract_channels_from_txt(content):
                     category = get_channel_category(normalized_name)
                     # 只添加有分类的频道（不在CHANNEL_CATEGORIES中的频道会被舍弃）
                     if category:
-                        channels[category].append((normalized_name, url))
+                        channels[category].append(Channel(normalized_name, url))
                         logger.debug(f"添加高清频道: {normalized_name} -> {url} (分类: {category})")
                     else:
                         logger.debug(f"舍弃未分类频道: {normalized_name} -> {url}")
@@ -1137,20 +1020,21 @@ def fetch_txt_content(source_url, timeout=10):
     
     # 检查缓存是否存在且未过期
     current_time = time.time()
-    if source_url in source_cache:
-        cached_time, cached_content, etag, last_modified = source_cache[source_url]
-        if current_time - cached_time < cache_expiry_time:
-            logger.info(f"使用缓存的内容 (缓存时间: {cached_time})")
-            return cached_content
+    cached_meta = source_cache.get_meta(source_url)
+    if cached_meta is not None and current_time - cached_meta['cached_time'] < cache_expiry_time:
+        cached_entry = source_cache.get(source_url)
+        if cached_entry is not None:
+            source_cache.record_hit()
+            logger.info(f"使用缓存的内容 (缓存时间: {cached_entry.cached_time})")
+            return cached_entry.content
     
     # 准备条件请求头
     headers = {}
-    if source_url in source_cache:
-        _, _, etag, last_modified = source_cache[source_url]
-        if etag:
-            headers['If-None-Match'] = etag
-        if last_modified:
-            headers['If-Modified-Since'] = last_modified
+    if cached_meta is not None:
+        if cached_meta.get('etag'):
+            headers['If-None-Match'] = cached_meta['etag']
+        if cached_meta.get('last_modified'):
+            headers['If-Modified-Since'] = cached_meta['last_modified']
     
     try:
         # 发送请求
@@ -1159,12 +1043,12 @@ def fetch_txt_content(source_url, timeout=10):
         if response.status_code == 304:
             # 内容未修改，使用缓存内容
             logger.info(f"内容未修改，使用缓存")
-            if source_url in source_cache:
-                # 更新缓存时间
-                cached_time, cached_content, etag, last_modified = source_cache[source_url]
-                source_cache[source_url] = (current_time, cached_content, etag, last_modified)
-                save_cache()
-                return cached_content
+            cached_entry = source_cache.get(source_url)
+            if cached_entry is not None:
+                # 只更新缓存时间，不重写内容
+                source_cache.touch(source_url, current_time, cached_entry.etag, cached_entry.last_modified)
+                source_cache.record_revalidation()
+                return cached_entry.content
             else:
                 # 缓存中没有内容但返回304，重新请求
                 response = session.get(source_url, timeout=timeout)
@@ -1174,8 +1058,8 @@ def fetch_txt_content(source_url, timeout=10):
             content = response.text
             etag = response.headers.get('ETag')
             last_modified = response.headers.get('Last-Modified')
-            source_cache[source_url] = (current_time, content, etag, last_modified)
-            save_cache()
+            source_cache.put(source_url, current_time, content, etag, last_modified)
+            source_cache.record_miss()
             logger.info(f"获取成功，已更新缓存")
             return content
         else:
@@ -1184,9 +1068,10 @@ def fetch_txt_content(source_url, timeout=10):
     except requests.exceptions.RequestException as e:
         logger.error(f"获取 {source_url} 失败: {e}")
         # 如果请求失败但缓存中有内容，返回缓存内容
-        if source_url in source_cache:
+        cached_entry = source_cache.get(source_url)
+        if cached_entry is not None:
             logger.info(f"请求失败，使用缓存内容")
-            return source_cache[source_url][1]
+            return cached_entry.content
         return None
 
 # 主函数
@@ -1213,25 +1098,17 @@ def main():
             logger.error("没有找到.txt格式的直播源")
             return 1
         
-        # 获取所有.txt源的内容并提取频道
-        all_channels = defaultdict(list)
+        # 获取所有.txt源的内容并提取频道，合并到列式频道表中，按规范化URL去重
+        channel_table = ChannelTable(dedup_key=lambda channel_name, url: normalize_url(url))
         for source in txt_sources:
             content = fetch_txt_content(source, timeout=args.timeout)
             if content:
-                channels = extract_channels_from_txt(content)
-                # 合并频道
-                for category, category_channels in channels.items():
-                    all_channels[category].extend(category_channels)
+                channel_table.extend(extract_channels_from_txt(content))
+        
+        # 所有直播源获取完毕，统一落盘缓存
+        save_cache()
         
-        # 去重处理 - 使用URL规范化
-        unique_channels = defaultdict(list)
-        seen = set()
-        for category, channels in all_channels.items():
-            for channel_name, url in channels:
-                normalized = normalize_url(url)
-                if normalized not in seen:
-                    seen.add(normalized)
-                    unique_channels[category].append((channel_name, url))
+        unique_channels = channel_table.to_dict()
 
         if not unique_channels:
             logger.error("没有提取到任何高清频道")
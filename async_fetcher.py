@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+基于asyncio的直播源并发获取模块
+功能：按主机限制并发、复用全局Session连接池，并在到达全局截止时间后取消未完成的慢速源
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSourceFetcher:
+    """asyncio直播源获取器
+
+    实际的网络读取仍由fetch_func在线程中完成（以便复用requests的全局Session连接池），
+    asyncio负责调度：全局并发上限、每个主机的并发上限，以及全局截止时间。
+    到达截止时间后会设置取消信号，fetch_func应在读取数据块和重试等待之间检查该信号并尽快返回。
+    """
+
+    def __init__(self, fetch_func, per_host_limit=2, max_concurrency=16, deadline=600):
+        """
+        参数:
+            fetch_func: 获取函数，签名为 fetch_func(url, cancel_event)
+            per_host_limit: 每个主机的最大并发数
+            max_concurrency: 全局最大并发数
+            deadline: 全局截止时间（秒），超时后取消所有未完成的任务
+        """
+        self.fetch_func = fetch_func
+        self.per_host_limit = max(1, per_host_limit)
+        self.max_concurrency = max(1, max_concurrency)
+        self.deadline = deadline
+        self.cancel_event = threading.Event()
+        self._host_semaphores = {}
+
+    def _get_host_key(self, url):
+        """获取URL对应的主机标识，本地文件不受主机并发限制"""
+        if url.startswith('file://'):
+            return None
+        try:
+            return (urlparse(url).hostname or '').lower()
+        except ValueError:
+            return ''
+
+    async def _fetch_one(self, url, global_semaphore, executor):
+        """在全局和主机两级并发限制下获取单个源"""
+        loop = asyncio.get_running_loop()
+        host = self._get_host_key(url)
+        async with global_semaphore:
+            if host is None:
+                return await loop.run_in_executor(executor, self.fetch_func, url, self.cancel_event)
+            host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+            async with host_semaphore:
+                return await loop.run_in_executor(executor, self.fetch_func, url, self.cancel_event)
+
+    async def _run(self, urls):
+        """并发获取所有源，返回 (结果字典, 被取消的URL列表)"""
+        results = {}
+        cancelled = []
+        global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            tasks = {asyncio.ensure_future(self._fetch_one(url, global_semaphore, executor)): url for url in urls}
+            if not tasks:
+                return results, cancelled
+
+            done, pending = await asyncio.wait(tasks.keys(), timeout=self.deadline)
+
+            if pending:
+                # 到达全局截止时间：通知正在读取的线程中止，并取消仍在排队的任务
+                self.cancel_event.set()
+                for task in pending:
+                    task.cancel()
+                    cancelled.append(tasks[task])
+                await asyncio.gather(*pending, return_exceptions=True)
+                logger.warning(f"已到达全局截止时间 {self.deadline} 秒，取消 {len(pending)} 个未完成的直播源")
+
+            for task in done:
+                url = tasks[task]
+                try:
+                    results[url] = task.result()
+                except Exception as e:
+                    logger.error(f"获取 {url} 时出错: {e}")
+                    results[url] = None
+        finally:
+            # 不等待被取消的线程结束，它们会在检查到取消信号后自行退出
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results, cancelled
+
+    def fetch_all(self, urls):
+        """同步入口：并发获取所有源
+
+        返回:
+            tuple: (结果字典 {url: 结果}, 被取消的URL列表)
+        """
+        self.cancel_event.clear()
+        self._host_semaphores = {}
+        start_time = time.time()
+        results, cancelled = asyncio.run(self._run(list(urls)))
+        logger.info(f"asyncio获取完成: {len(results)} 个完成, {len(cancelled)} 个取消, 耗时: {time.time() - start_time:.2f}秒")
+        return results, cancelled
+
+
+def fetch_sources_async(urls, fetch_func, per_host_limit=2, max_concurrency=16, deadline=600):
+    """使用asyncio并发获取直播源的便捷函数"""
+    fetcher = AsyncSourceFetcher(
+        fetch_func,
+        per_host_limit=per_host_limit,
+        max_concurrency=max_concurrency,
+        deadline=deadline
+    )
+    return fetcher.fetch_all(urls)
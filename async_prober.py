@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+基于asyncio的HTTP探测引擎
+功能：直接使用asyncio.open_connection发送HEAD（必要时GET）请求检测URL可用性，
+单个事件循环即可同时处理数千个探测；结果格式与QuickURLChecker.check_url一致，
+可作为QuickURLChecker的另一种检测后端
+"""
+
+import ssl
+import time
+import queue
+import asyncio
+import threading
+import logging
+from urllib.parse import urlsplit, urljoin
+
+from quick_url_checker import VALID_STATUS_CODES, THROTTLE_STATUS_CODES
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUS_CODES = {301, 302, 303, 307, 308}
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 默认参数
+DEFAULT_MAX_IN_FLIGHT = 500     # 同时进行的探测数上限
+DEFAULT_MAX_REDIRECTS = 5       # 最大重定向次数
+MAX_HEADER_LINES = 100          # 最多读取的响应头行数
+HAPPY_EYEBALLS_DELAY = 0.25     # 由asyncio解析主机名时，尝试下一个地址前的等待时间（秒）
+
+
+class _TooManyRedirects(Exception):
+    """重定向次数超过上限"""
+
+
+class AsyncHTTPProber:
+    """asyncio HTTP探测器
+
+    使用固定数量的工作协程从输入中依次取URL，内存占用只与并发数有关，与URL总数无关；
+    每个探测（包括重定向和GET回退）受整体截止时间限制；同一主机受并发上限、请求速率和429/503退避限制。
+    """
+
+    def __init__(self, timeout=2, deadline=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 per_host_limit=4, host_rate=0, max_redirects=DEFAULT_MAX_REDIRECTS,
+                 resolver=None, throttle_retries=2, backoff_base=1.0, backoff_max=30.0,
+                 user_agent=DEFAULT_USER_AGENT, verify_ssl=True):
+        """
+        参数:
+            timeout: 单次请求（连接或读取响应头）的超时时间（秒）
+            deadline: 单个URL探测的总截止时间（秒），默认为timeout的2倍
+            max_in_flight: 同时进行的探测数上限
+            per_host_limit: 每个主机的最大并发数
+            host_rate: 每个主机每秒最多发起的请求数，0表示不限速
+            max_redirects: 最大重定向次数
+            resolver: 可选的主机名解析函数 resolver(host) -> 地址元组（如DNSCache.resolve），为None时由asyncio自行解析
+            throttle_retries: 遇到429/503时的最大重试次数
+            backoff_base: 限流退避的初始时间（秒）
+            backoff_max: 限流退避的最长时间（秒）
+            user_agent: 请求使用的User-Agent
+            verify_ssl: 是否验证HTTPS证书
+        """
+        self.timeout = timeout
+        self.deadline = deadline or timeout * 2
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_host_limit = max(1, per_host_limit)
+        self.host_rate = host_rate
+        self.max_redirects = max_redirects
+        self.resolver = resolver
+        self.throttle_retries = throttle_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.user_agent = user_agent
+        self.ssl_context = ssl.create_default_context()
+        if not verify_ssl:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+
+        # 以下状态在每次运行时重置（asyncio对象必须在所属事件循环中创建）
+        self._host_semaphores = {}
+        self._host_next_allowed = {}
+        self._host_backoff_until = {}
+        self._host_throttle_count = {}
+
+    # ---------- 单次请求 ----------
+
+    async def _open(self, parts):
+        """建立到目标主机的连接
+
+        由asyncio解析主机名时使用happy eyeballs同时尝试IPv4/IPv6地址；使用resolver时依次尝试解析到的每个地址
+        （双栈主机的第一个AAAA地址不可达时继续尝试其余地址，与requests后端一致），每个地址单独计算连接超时
+        """
+        host = parts.hostname
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        ssl_context = self.ssl_context if parts.scheme == 'https' else None
+        server_hostname = host if ssl_context else None
+
+        if self.resolver is None:
+            return await asyncio.wait_for(asyncio.open_connection(
+                host, port, ssl=ssl_context, server_hostname=server_hostname,
+                happy_eyeballs_delay=HAPPY_EYEBALLS_DELAY
+            ), timeout=self.timeout)
+
+        loop = asyncio.get_running_loop()
+        addresses = await loop.run_in_executor(None, self.resolver, host)
+        if not addresses:
+            raise ConnectionError("DNS解析失败")
+
+        last_error = None
+        for address in addresses:
+            try:
+                return await asyncio.wait_for(asyncio.open_connection(
+                    address, port, ssl=ssl_context, server_hostname=server_hostname
+                ), timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                last_error = e
+        raise last_error
+
+    async def _request(self, url, method, extra_headers=None):
+        """发送一次请求，只读取状态行和响应头
+
+        返回:
+            tuple: (状态码, Location响应头或None)
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError("不支持的URL")
+
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        host_header = parts.netloc.rpartition('@')[2]
+
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {host_header}",
+            f"User-Agent: {self.user_agent}",
+            "Accept: */*",
+            "Connection: close",
+        ]
+        for name, value in (extra_headers or {}).items():
+            headers.append(f"{name}: {value}")
+        request = ("\r\n".join(headers) + "\r\n\r\n").encode('latin-1', errors='replace')
+
+        reader, writer = await self._open(parts)
+        try:
+            writer.write(request)
+            await writer.drain()
+
+            status_line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+            fields = status_line.decode('latin-1').split(None, 2)
+            if len(fields) < 2 or not fields[0].startswith('HTTP/') or not fields[1].isdigit():
+                raise ConnectionError("无效的HTTP响应")
+            status_code = int(fields[1])
+
+            location = None
+            if status_code in REDIRECT_STATUS_CODES:
+                for _ in range(MAX_HEADER_LINES):
+                    line = await asyncio.wait_for(reader.readline(), timeout=self.timeout)
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    if name.strip().lower() == 'location':
+                        location = value.strip()
+            return status_code, location
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _request_following_redirects(self, url, method, extra_headers=None):
+        """发送请求并跟随重定向（与requests的allow_redirects=True行为一致）"""
+        current_url = url
+        for _ in range(self.max_redirects + 1):
+            status_code, location = await self._request(current_url, method, extra_headers)
+            if status_code not in REDIRECT_STATUS_CODES or not location:
+                return status_code
+            next_url = urljoin(current_url, location)
+            if urlsplit(next_url).scheme not in ('http', 'https'):
+                return status_code
+            current_url = next_url
+        raise _TooManyRedirects()
+
+    # ---------- 单个URL探测 ----------
+
+    async def _probe_once(self, url):
+        """HEAD探测，405/501时回退到只读取1KB的GET请求"""
+        status_code = await self._request_following_redirects(url, 'HEAD', {'Range': 'bytes=0-0'})
+        if status_code in VALID_STATUS_CODES:
+            return True, f"HTTP {status_code}", status_code
+
+        if status_code in (405, 501):  # 方法不允许
+            status_code = await self._request_following_redirects(url, 'GET', {'Range': 'bytes=0-1023'})
+            if status_code in VALID_STATUS_CODES:
+                return True, f"HTTP GET {status_code}", status_code
+
+        return False, f"HTTP状态码: {status_code}", status_code
+
+    async def probe(self, url):
+        """在截止时间内探测单个URL，返回与QuickURLChecker.check_url相同格式的结果"""
+        try:
+            is_valid, reason, status_code = await asyncio.wait_for(self._probe_once(url), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            is_valid, reason, status_code = False, "连接超时", None
+        except _TooManyRedirects:
+            is_valid, reason, status_code = False, "重定向过多", None
+        except (ConnectionError, OSError, ssl.SSLError, asyncio.IncompleteReadError):
+            is_valid, reason, status_code = False, "连接错误", None
+        except ValueError:
+            is_valid, reason, status_code = False, "URL解析失败", None
+        except Exception as e:
+            is_valid, reason, status_code = False, f"未知错误: {str(e)[:30]}", None
+        return {
+            'url': url,
+            'valid': is_valid,
+            'reason': reason,
+            'method': 'async_http',
+            'status_code': status_code
+        }
+
+    # ---------- 按主机限流 ----------
+
+    async def _wait_for_host_slot(self, host):
+        """等待主机的退避时间和速率限制"""
+        loop = asyncio.get_running_loop()
+        backoff_until = self._host_backoff_until.get(host, 0)
+        now = loop.time()
+        if now < backoff_until:
+            await asyncio.sleep(backoff_until - now)
+        if self.host_rate > 0:
+            now = loop.time()
+            next_allowed = max(now, self._host_next_allowed.get(host, now))
+            self._host_next_allowed[host] = next_allowed + 1.0 / self.host_rate
+            if next_allowed > now:
+                await asyncio.sleep(next_allowed - now)
+
+    async def _probe_limited(self, url):
+        """在主机并发上限、速率限制和限流退避下探测单个URL"""
+        try:
+            host = (urlsplit(url).hostname or '').lower()
+        except ValueError:
+            host = ''
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+
+        attempts = 0
+        while True:
+            async with semaphore:
+                await self._wait_for_host_slot(host)
+                result = await self.probe(url)
+
+            if result['status_code'] in THROTTLE_STATUS_CODES and attempts < self.throttle_retries:
+                attempts += 1
+                count = self._host_throttle_count.get(host, 0) + 1
+                self._host_throttle_count[host] = count
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (count - 1)))
+                self._host_backoff_until[host] = asyncio.get_running_loop().time() + delay
+                continue
+            if result['valid']:
+                self._host_throttle_count[host] = 0
+            return result
+
+    # ---------- 批量探测 ----------
+
+    async def _run(self, items, emit, stop=None):
+        """用固定数量的工作协程探测所有(索引, URL)，每完成一个等待emit(索引, 结果)；stop被设置后不再取新的URL"""
+        self._host_semaphores = {}
+        self._host_next_allowed = {}
+        self._host_backoff_until = {}
+        self._host_throttle_count = {}
+
+        iterator = iter(items)
+
+        async def worker():
+            # 各工作协程共享同一个迭代器，事件循环单线程执行，无需加锁
+            for index, url in iterator:
+                if stop is not None and stop.is_set():
+                    return
+                await emit(index, await self._probe_limited(url))
+
+        await asyncio.gather(*(worker() for _ in range(self.max_in_flight)))
+
+    def iter_probe(self, items):
+        """同步接口：在后台线程运行事件循环，按完成顺序产出结果
+
+        未被取走的结果最多max_in_flight × 2个：工作协程在事件循环中等待空位（不阻塞事件循环）；
+        调用方提前停止迭代（break、异常或生成器被关闭）时设置停止标志并取消事件循环中的探测，释放所有连接
+
+        参数:
+            items: 可迭代的 (索引, URL)
+
+        返回:
+            生成器，产出 (索引, 结果字典)
+        """
+        results = queue.Queue()
+        done = object()
+        errors = []
+        stop = threading.Event()
+        slots = []
+
+        async def emit(index, result):
+            await slots[0].acquire()
+            results.put((index, result))
+
+        async def main():
+            # asyncio对象必须在所属事件循环中创建
+            slots.append(asyncio.Semaphore(self.max_in_flight * 2))
+            await self._run(items, emit, stop)
+
+        loop = asyncio.new_event_loop()
+        main_task = loop.create_task(main())
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                pass
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                try:
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                    loop.run_until_complete(loop.shutdown_default_executor())
+                finally:
+                    asyncio.set_event_loop(None)
+                    loop.close()
+                    results.put(done)
+
+        def release_slot():
+            slots[0].release()
+
+        thread = threading.Thread(target=run_loop, name='async-prober', daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                try:
+                    loop.call_soon_threadsafe(release_slot)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+                yield item
+        finally:
+            stop.set()
+            try:
+                loop.call_soon_threadsafe(main_task.cancel)
+            except RuntimeError:
+                # 事件循环已正常结束并关闭
+                pass
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def probe_all(self, urls):
+        """同步接口：探测所有URL，返回与输入顺序一致的结果列表"""
+        urls = list(urls)
+        ordered = [None] * len(urls)
+        start_time = time.time()
+        for index, result in self.iter_probe(enumerate(urls)):
+            ordered[index] = result
+        logger.info(f"asyncio探测完成: {len(urls)} 个URL，耗时: {time.time() - start_time:.2f}秒")
+        return ordered
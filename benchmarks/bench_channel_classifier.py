@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+频道分类器性能对比
+生成指定数量的频道名，分别用原来的逐分类any()扫描和预编译的正则分类器分类，
+对比耗时并检查两者结果是否一致（原实现中'MTV'关键词为大写、永远不会命中，对比时按修正后的小写处理）
+
+用法:
+    python benchmarks/bench_channel_classifier.py --names 100000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_classifier import CATEGORY_TABLE, DEFAULT_CATEGORY, ChannelClassifier
+
+
+def legacy_category(channel_name):
+    """原来的实现：每个分类一次any()扫描"""
+    name_lower = channel_name.lower()
+    for category, keywords in CATEGORY_TABLE:
+        if any(keyword in name_lower for keyword in keywords):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def build_corpus(count, seed=1):
+    """生成频道名：约60%含分类关键词，其余为无关键词的地方台/杂项名称，大部分名称互不相同"""
+    rng = random.Random(seed)
+    keywords = [keyword for _, words in CATEGORY_TABLE for keyword in words]
+    prefixes = ['', 'HD ', '高清', '[备]', 'IPTV-', 'Live ']
+    suffixes = ['', ' HD', '-高清', '(1080p)', ' 测试', '+']
+    fillers = ['北京', '广东', '四川', '公共', '都市', '生活', '财经', '影视', 'Channel', 'TV', '频道', '综合']
+    names = []
+    for i in range(count):
+        parts = [rng.choice(prefixes), rng.choice(fillers)]
+        if rng.random() < 0.6:
+            parts.append(rng.choice(keywords).upper() if rng.random() < 0.3 else rng.choice(keywords))
+        parts.append(f"{rng.choice(fillers)}{i % 997}")
+        parts.append(rng.choice(suffixes))
+        names.append(''.join(parts))
+    return names
+
+
+def timed(func, names):
+    start = time.perf_counter()
+    results = [func(name) for name in names]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='频道分类器性能对比')
+    parser.add_argument('--names', type=int, default=100000, help='频道名数量')
+    parser.add_argument('--unique', type=int, default=2000, help='重复频道名测试中不重复名称的数量')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    names = build_corpus(args.names)
+    print(f"频道名数量: {len(names)}（不重复 {len(set(names))}）")
+
+    uncached = ChannelClassifier(cache_size=0)
+    cached = ChannelClassifier()
+
+    legacy_time, legacy_results = min(timed(legacy_category, names) for _ in range(args.repeat))
+    print(f"any()逐分类扫描:     {legacy_time:7.3f} 秒")
+
+    regex_time, regex_results = min(timed(uncached.classify, names) for _ in range(args.repeat))
+    print(f"预编译正则（无缓存）: {regex_time:7.3f} 秒  加速比 {legacy_time / regex_time:.2f}x")
+
+    mismatches = sum(1 for a, b in zip(legacy_results, regex_results) if a != b)
+    print(f"结果不一致的频道名: {mismatches}")
+
+    # 实际数据中同一频道名会在多个源中反复出现：从少量名称中重复抽样，对比带缓存的分类器
+    rng = random.Random(2)
+    pool = names[:args.unique]
+    repeated = [rng.choice(pool) for _ in range(len(names))]
+    print(f"\n重复频道名: {len(repeated)}（不重复 {len(set(repeated))}）")
+    legacy_time, legacy_results = min(timed(legacy_category, repeated) for _ in range(args.repeat))
+    print(f"any()逐分类扫描:     {legacy_time:7.3f} 秒")
+    cached_time, cached_results = min(timed(cached.classify, repeated) for _ in range(args.repeat))
+    print(f"预编译正则（带缓存）: {cached_time:7.3f} 秒  加速比 {legacy_time / cached_time:.2f}x")
+    mismatches = sum(1 for a, b in zip(legacy_results, cached_results) if a != b)
+    print(f"结果不一致的频道名: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+列式频道表内存对比
+生成指定行数的合成直播源（分类名、频道名、主机名大量重复，部分线路在多个源中重复出现），
+分别用原来的 {分类: [(频道名, URL), ...]} + seen集合 和列式频道表合并去重，
+用tracemalloc对比合并完成后占用的内存和耗时，并检查两者结果是否一致
+
+用法:
+    python benchmarks/bench_channel_table.py --lines 500000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from channel_table import ChannelTable
+
+CATEGORIES = ['央视频道', '卫视频道', '地方频道', '影视频道', '体育频道', '少儿频道', '新闻频道', '纪录频道',
+              '音乐频道', '港澳台', '国际频道', '4K频道', '综合频道', '教育频道', '财经频道', '生活频道']
+
+
+def generate_lines(count, seed=1):
+    """逐行生成 (分类, 频道名, URL)，每行的字符串都是新建的对象（与逐行解析文件时一致）"""
+    rng = random.Random(seed)
+    hosts = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}:{rng.choice([80, 8080, 9901, 4022])}"
+             for _ in range(300)]
+    channel_count = 4000
+    for _ in range(count):
+        # 约三分之一的线路在其他源中已经出现过
+        stream_id = rng.randrange(count * 2 // 3)
+        channel_id = stream_id % channel_count
+        category = CATEGORIES[channel_id % len(CATEGORIES)]
+        name = f"频道{channel_id}" + ('', ' HD', '高清')[stream_id % 3]
+        host = hosts[stream_id % len(hosts)]
+        url = f"http://{host}/live/{stream_id}/index.m3u8?token={stream_id * 7919 % 1000003}"
+        yield category, name, url
+
+
+def merge_legacy(lines):
+    """原来的做法：分类字典 + (频道名, URL) 元组 + seen集合"""
+    all_channels = defaultdict(list)
+    seen = set()
+    for category, name, url in lines:
+        if (name, url) not in seen:
+            all_channels[category].append((name, url))
+            seen.add((name, url))
+    return all_channels, seen
+
+
+def merge_table(lines):
+    """列式频道表"""
+    table = ChannelTable()
+    for category, name, url in lines:
+        table.add(category, name, url)
+    return table
+
+
+def measure(func, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(generate_lines(count))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='列式频道表内存对比')
+    parser.add_argument('--lines', type=int, default=500000, help='合成直播源的行数')
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    (legacy, seen), legacy_time, legacy_current, legacy_peak = measure(merge_legacy, args.lines)
+    legacy_rows = sum(len(channel_list) for channel_list in legacy.values())
+    print(f"输入行数: {args.lines}，去重后 {legacy_rows} 个频道")
+    print(f"字典+元组+seen集合: 内存 {legacy_current / mb:7.1f} MB（峰值 {legacy_peak / mb:7.1f} MB），耗时 {legacy_time:.2f} 秒")
+    del seen
+
+    table, table_time, table_current, table_peak = measure(merge_table, args.lines)
+    print(f"列式频道表:         内存 {table_current / mb:7.1f} MB（峰值 {table_peak / mb:7.1f} MB），耗时 {table_time:.2f} 秒  "
+          f"内存减少 {(1 - table_current / legacy_current) * 100:.0f}%")
+    print(f"列式频道表自身估算: {table.memory_usage() / mb:.1f} MB，"
+          f"分类 {len(table.categories)} 个，频道名 {len(table.names)} 个，URL数据 {len(table._url_data) / mb:.1f} MB")
+
+    converted = table.to_dict()
+    mismatches = sum(1 for category in legacy if list(legacy[category]) != list(converted.get(category, [])))
+    print(f"结果一致性: 分类顺序{'一致' if list(legacy) == list(converted) else '不一致'}，内容不一致的分类 {mismatches} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+编码识别读取性能对比
+生成两种指定大小的合成直播源：整个文件为GBK编码；UTF-8文件末尾拼接了一段GBK编码的频道（合并多个源时常见），
+分别用原来的“每种候选编码重新打开并完整读取一遍文件”和file_utils.read_file_with_encoding
+（BOM + 开头字节判断编码，一次解码，出错时只对出错的块逐行回退）读取，对比耗时
+
+用法:
+    python benchmarks/bench_file_encoding.py --size-mb 64
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_utils import DEFAULT_ENCODINGS, read_file_with_encoding
+
+
+def write_playlist(path, size_mb, encoding, tail_encoding=None):
+    """写入合成直播源，tail_encoding不为空时最后约1%的内容使用该编码"""
+    target = size_mb * 1024 * 1024
+    written = 0
+    i = 0
+    with open(path, 'wb') as f:
+        while written < target:
+            if i % 500 == 0:
+                line = f"地方频道{i // 500 % 40},#genre#\n"
+            else:
+                line = f"湖南卫视{i % 900},http://{i % 251}.stream.example.com:8080/live/{i}.flv\n"
+            use_tail = tail_encoding and written >= target * 99 // 100
+            data = line.encode(tail_encoding if use_tail else encoding)
+            f.write(data)
+            written += len(data)
+            i += 1
+
+
+def read_legacy(path):
+    """原来的做法：依次用每种候选编码打开并完整读取文件"""
+    for encoding in DEFAULT_ENCODINGS:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read(), encoding
+        except UnicodeDecodeError:
+            continue
+    return None, None
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='编码识别读取性能对比')
+    parser.add_argument('--size-mb', type=int, default=64, help='合成文件大小（MB）')
+    args = parser.parse_args()
+
+    cases = [
+        ('GBK', 'playlist_gbk.txt', 'gbk', None),
+        ('UTF-8 + 末尾GBK', 'playlist_mixed.txt', 'utf-8', 'gbk'),
+    ]
+    with tempfile.TemporaryDirectory(prefix='bench_encoding_') as tmp_dir:
+        for label, file_name, encoding, tail_encoding in cases:
+            path = os.path.join(tmp_dir, file_name)
+            write_playlist(path, args.size_mb, encoding, tail_encoding)
+
+            legacy_time, (legacy_content, legacy_encoding) = timed(lambda: read_legacy(path))
+            single_time, (content, detected) = timed(lambda: read_file_with_encoding(path))
+            print(f"\n{label}: {args.size_mb} MB")
+            print(f"  逐个编码完整读取:  {legacy_time:6.2f} 秒，编码 {legacy_encoding}")
+            print(f"  单次读取+按需回退: {single_time:6.2f} 秒，编码 {detected}  加速比 {legacy_time / single_time:.2f}x")
+            print(f"  内容与原做法{'一致' if content == legacy_content else '不一致（原做法整体换用其他编码）'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+本地大文件并行分块解析性能对比
+生成指定条目数的合成M3U和TXT文件，分别用逐行串行解析（IPTV.iter_channels）和
+mmap分块 + 进程池并行解析（IPTV.iter_channels_from_file）解析，对比耗时并检查结果是否一致
+
+用法:
+    python benchmarks/bench_parallel_parse.py --entries 500000 --workers 2 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import IPTV
+
+NAMES = ['CCTV-1 综合', 'CCTV-5 体育', '湖南卫视', '浙江卫视', '北京卫视', '凤凰中文', '少儿动画', '电影频道',
+         '纪实人文', '新闻综合', 'CGTN', '东方卫视', '江苏卫视', '广东体育', '音乐现场', '戏曲频道']
+
+
+def write_m3u(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U x-tvg-url="https://example.com/epg.xml"\n')
+        for i in range(entries):
+            name = f"{NAMES[i % len(NAMES)]}{i % 900}"
+            f.write(f'#EXTINF:-1 tvg-id="{i}" tvg-name="{name}" tvg-logo="https://logo.example.com/{i % 900}.png" '
+                    f'group-title="分组{i % 40}",{name}\n')
+            f.write(f'http://{i % 251}.stream.example.com:8080/live/{i}/index.m3u8?token={i * 7919 % 1000003}\n')
+
+
+def write_txt(path, entries):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(entries):
+            if i % 500 == 0:
+                f.write(f'分组{i // 500 % 40},#genre#\n')
+            f.write(f'{NAMES[i % len(NAMES)]}{i % 900},http://{i % 251}.stream.example.com:8080/live/{i}.flv\n')
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def bench_file(path, workers_list):
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    serial_time, serial_result = timed(lambda: list(IPTV.iter_channels_from_file(path)))
+    print(f"\n{os.path.basename(path)}: {size_mb:.1f} MB，解析出 {len(serial_result)} 个频道")
+    print(f"  串行逐行解析:        {serial_time:7.2f} 秒")
+    for workers in workers_list:
+        parallel_time, parallel_result = timed(
+            lambda: list(IPTV.iter_channels_from_file(path, parallel_workers=workers)))
+        same = '一致' if parallel_result == serial_result else '不一致'
+        print(f"  并行解析（{workers}进程）:    {parallel_time:7.2f} 秒  加速比 {serial_time / parallel_time:.2f}x  结果{same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地大文件并行分块解析性能对比')
+    parser.add_argument('--entries', type=int, default=500000, help='合成文件的频道条目数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4], help='并行进程数（可指定多个）')
+    args = parser.parse_args()
+
+    print(f"CPU核心数: {multiprocessing.cpu_count()}")
+    with tempfile.TemporaryDirectory(prefix='bench_parse_') as tmp_dir:
+        m3u_path = os.path.join(tmp_dir, 'playlist.m3u')
+        txt_path = os.path.join(tmp_dir, 'playlist.txt')
+        write_m3u(m3u_path, args.entries)
+        write_txt(txt_path, args.entries)
+        bench_file(m3u_path, args.workers)
+        bench_file(txt_path, args.workers)
+
+
+if __name__ == "__main__":
+    main()
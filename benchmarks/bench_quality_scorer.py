@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+线路清晰度检测性能对比
+读取jieguo_txt.txt中的 (频道名, URL)，分别用原来的多次正则扫描（HD_REGEX、各分辨率正则、4K正则逐个search）
+和融合正则的逐行/批量评估接口判断“是否高清”和“是否超清”，对比耗时和结果一致性
+
+用法:
+    python benchmarks/bench_quality_scorer.py --repeat 100
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import quality_scorer
+from quality_scorer import score_text, score_batch, meets_resolution, TIER_4K, NUMPY_AVAILABLE
+
+MIN_RESOLUTION = (1920, 1080)
+
+# ---------- 原实现（逐个正则扫描） ----------
+
+LEGACY_HD_REGEX = re.compile('|'.join([
+    r'[48]k', r'2160[pdi]', r'uhd', r'超高清', r'4k', r'1440[pdi]', r'qhd', r'1080[pdi]', r'fhd',
+    r'高清', r'超清', r'hd', r'high.?definition', r'high.?def', r'hdmi', r'蓝光', r'blue.?ray',
+    r'hd.?live', r'[89]m', r'[1-9]\d+m', r'quality=high', r'resolution=[1-9]\d{3}', r'hd=true', r'fhd=true'
+]), re.IGNORECASE)
+LEGACY_VERTICAL = re.compile(r'(\d{3,4})[pdi]', re.IGNORECASE)
+LEGACY_WH = re.compile(r'(\d+)x(\d+)', re.IGNORECASE)
+LEGACY_UNDERSCORE = re.compile(r'(\d+)_(\d+)', re.IGNORECASE)
+LEGACY_RES_PARAM = re.compile(r'res=(\d+)', re.IGNORECASE)
+LEGACY_RESOLUTION_PARAM = re.compile(r'resolution=(\d+)x?(\d*)', re.IGNORECASE)
+LEGACY_ULTRA_HD_REGEX = re.compile('|'.join([r'[48]k', r'2160[pdi]', r'3840x2160', r'uhd', r'超高清', r'4k']), re.IGNORECASE)
+
+
+def legacy_is_high_quality(url):
+    if LEGACY_HD_REGEX.search(url):
+        return True
+    match = LEGACY_VERTICAL.search(url)
+    if match and int(match.group(1)) >= MIN_RESOLUTION[1]:
+        return True
+    for pattern in (LEGACY_WH, LEGACY_UNDERSCORE):
+        match = pattern.search(url)
+        if match and (int(match.group(1)) >= MIN_RESOLUTION[0] or int(match.group(2)) >= MIN_RESOLUTION[1]):
+            return True
+    match = LEGACY_RES_PARAM.search(url)
+    if match and int(match.group(1)) >= MIN_RESOLUTION[1]:
+        return True
+    match = LEGACY_RESOLUTION_PARAM.search(url)
+    if match:
+        if match.group(2):
+            if int(match.group(1)) >= MIN_RESOLUTION[0] or int(match.group(2)) >= MIN_RESOLUTION[1]:
+                return True
+        elif int(match.group(1)) >= MIN_RESOLUTION[1]:
+            return True
+    return False
+
+
+def legacy_is_ultra_high_quality(url, channel_name):
+    if LEGACY_ULTRA_HD_REGEX.search(url) or LEGACY_ULTRA_HD_REGEX.search(channel_name):
+        return True
+    match = LEGACY_VERTICAL.search(url)
+    if match and int(match.group(1)) >= 2160:
+        return True
+    match = LEGACY_WH.search(url)
+    if match and (int(match.group(1)) >= 3840 or int(match.group(2)) >= 2160):
+        return True
+    return False
+
+
+# ---------- 测试 ----------
+
+def load_rows(path):
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if ',' in line and '#genre#' not in line:
+                name, url = line.split(',', 1)
+                rows.append((name, url))
+    return rows
+
+
+def bench_legacy(rows):
+    """原实现：高清判断和超清判断各自对URL做多次正则扫描"""
+    start = time.perf_counter()
+    high_quality = [legacy_is_high_quality(url) for _, url in rows]
+    ultra = [legacy_is_ultra_high_quality(url, name) for name, url in rows]
+    return time.perf_counter() - start, high_quality, ultra
+
+
+def bench_per_line(rows):
+    """新的逐行接口：URL只扫描一次，高清和超清判断共用同一个评估结果"""
+    start = time.perf_counter()
+    high_quality = []
+    ultra = []
+    for name, url in rows:
+        url_quality = score_text(url)
+        high_quality.append(url_quality.hd_marker or url_quality.k4_marker
+                            or meets_resolution(url_quality, MIN_RESOLUTION, require_both=False))
+        ultra.append(url_quality.tier == TIER_4K or score_text(name).tier == TIER_4K)
+    return time.perf_counter() - start, high_quality, ultra
+
+
+def bench_batch(rows):
+    """批量接口：每行频道名和URL拼接后扫描一次，按列统一过滤"""
+    start = time.perf_counter()
+    batch = score_batch(rows)
+    high_quality = batch.meets_resolution(MIN_RESOLUTION, require_both=False)
+    ultra = batch.at_least(TIER_4K)
+    return time.perf_counter() - start, list(high_quality), list(ultra)
+
+
+def count_mismatches(expected, actual):
+    return sum(1 for a, b in zip(expected, actual) if bool(a) != bool(b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='线路清晰度检测性能对比')
+    parser.add_argument('--file', default=os.path.join(ROOT_DIR, 'jieguo_txt.txt'), help='频道列表文件（TXT格式）')
+    parser.add_argument('--repeat', type=int, default=100, help='将文件中的行重复多少次')
+    args = parser.parse_args()
+
+    base_rows = load_rows(args.file)
+    # 每次重复时给URL加上不同的查询参数，避免评估缓存让结果失真
+    rows = [(name, f"{url}{'&' if '?' in url else '?'}r={i}") for i in range(args.repeat) for name, url in base_rows]
+    print(f"线路数: {len(rows)}（文件 {len(base_rows)} 行 x {args.repeat}），NumPy: {'可用' if NUMPY_AVAILABLE else '不可用'}")
+
+    legacy_time, legacy_hq, legacy_ultra = bench_legacy(rows)
+    print(f"逐个正则扫描:         {legacy_time:7.3f} 秒")
+
+    quality_scorer.score_text.cache_clear()
+    line_time, line_hq, line_ultra = bench_per_line(rows)
+    print(f"融合正则逐行评估:     {line_time:7.3f} 秒  加速比 {legacy_time / line_time:.2f}x  "
+          f"不一致: 高清 {count_mismatches(legacy_hq, line_hq)} / 超清 {count_mismatches(legacy_ultra, line_ultra)}")
+
+    quality_scorer.score_text.cache_clear()
+    batch_time, _, batch_ultra = bench_batch(rows)
+    print(f"融合正则批量评估:     {batch_time:7.3f} 秒  加速比 {legacy_time / batch_time:.2f}x  "
+          f"不一致: 超清 {count_mismatches(legacy_ultra, batch_ultra)}")
+
+    # 不加随机参数的原始线路（同一频道名、URL在多个源中重复出现时命中评估缓存）
+    repeated = base_rows * args.repeat
+    legacy_time, _, _ = bench_legacy(repeated)
+    quality_scorer.score_text.cache_clear()
+    cached_time, _, _ = bench_per_line(repeated)
+    print(f"重复线路: 逐个正则扫描 {legacy_time:.3f} 秒，融合正则（带缓存） {cached_time:.3f} 秒  加速比 {legacy_time / cached_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
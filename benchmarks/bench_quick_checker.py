@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+URL检测后端性能对比
+在本地启动一个模拟直播源服务器（每个响应带固定延迟），分别用requests线程池和asyncio探测引擎检测同一批URL，
+对比耗时和结果一致性
+
+用法:
+    python benchmarks/bench_quick_checker.py --urls 2000 --delay 0.05
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quick_url_checker import QuickURLChecker
+from async_prober import AsyncHTTPProber
+
+
+class LocalStreamServer:
+    """本地模拟直播源服务器（asyncio实现，可同时保持数千个连接）
+
+    路径:
+        /ok/...        HEAD和GET都返回200
+        /head405/...   HEAD返回405，GET返回200（测试GET回退）
+        /redirect/...  302重定向到/ok/
+        /missing/...   返回404
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.port = None
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            method, path = request_line.decode('latin-1').split()[:2]
+            await asyncio.sleep(self.delay)
+
+            extra = ''
+            if path.startswith('/ok/'):
+                status = '200 OK'
+            elif path.startswith('/head405/'):
+                status = '405 Method Not Allowed' if method == 'HEAD' else '200 OK'
+            elif path.startswith('/redirect/'):
+                status = '302 Found'
+                extra = f"Location: /ok/{path.split('/', 2)[2]}\r\n"
+            else:
+                status = '404 Not Found'
+            writer.write(f"HTTP/1.1 {status}\r\n{extra}Content-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def build_urls(port, count):
+    """按 8:1:1:1 的比例生成正常、HEAD 405、重定向和404的URL"""
+    kinds = ['ok'] * 8 + ['head405', 'redirect', 'missing']
+    return [f"http://127.0.0.1:{port}/{kinds[i % len(kinds)]}/{i}.m3u8" for i in range(count)]
+
+
+def bench_threads(urls, workers, timeout):
+    """requests线程池后端（只测HTTP探测，跳过会拒绝本地地址的预筛选）"""
+    checker = QuickURLChecker(timeout=timeout, max_workers=workers, enable_dns_check=False)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(checker._check_http_url_status, urls))
+    return time.perf_counter() - start, [r[0] for r in results]
+
+
+def bench_asyncio(urls, in_flight, timeout):
+    """asyncio探测后端"""
+    prober = AsyncHTTPProber(timeout=timeout, max_in_flight=in_flight, per_host_limit=in_flight)
+    start = time.perf_counter()
+    results = prober.probe_all(urls)
+    return time.perf_counter() - start, [r['valid'] for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='URL检测后端性能对比')
+    parser.add_argument('--urls', type=int, default=2000, help='URL数量')
+    parser.add_argument('--delay', type=float, default=0.05, help='模拟服务器每个响应的延迟（秒）')
+    parser.add_argument('--workers', type=int, default=32, help='线程池后端的线程数')
+    parser.add_argument('--in-flight', type=int, default=500, help='asyncio后端的最大并发探测数')
+    parser.add_argument('--timeout', type=float, default=5, help='单次请求超时时间（秒）')
+    args = parser.parse_args()
+
+    server = LocalStreamServer(delay=args.delay).start()
+    urls = build_urls(server.port, args.urls)
+    print(f"模拟服务器: 127.0.0.1:{server.port}，响应延迟 {args.delay * 1000:.0f}ms，URL数量 {len(urls)}")
+
+    thread_time, thread_valid = bench_threads(urls, args.workers, args.timeout)
+    print(f"threads  ({args.workers} 线程):     {thread_time:7.2f} 秒  {len(urls) / thread_time:8.1f} URL/s  有效 {sum(thread_valid)}")
+
+    async_time, async_valid = bench_asyncio(urls, args.in_flight, args.timeout)
+    print(f"asyncio  ({args.in_flight} 并发):    {async_time:7.2f} 秒  {len(urls) / async_time:8.1f} URL/s  有效 {sum(async_valid)}")
+
+    mismatches = sum(1 for a, b in zip(thread_valid, async_valid) if a != b)
+    print(f"结果不一致的URL: {mismatches}")
+    print(f"加速比: {thread_time / async_time:.2f}x")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
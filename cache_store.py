@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+直播源内容缓存存储模块
+功能：按URL索引的磁盘缓存，元数据（缓存时间、ETag、Last-Modified、内容哈希）与压缩后的内容分开存放，
+支持单条目O(1)读写、原子更新以及按总大小淘汰，供IPTV.py和IPTVTXT.py共用。
+启用延迟写入（write-behind）时，更新只记录在内存中的脏条目里，在运行结束、到达刷新间隔或进程退出时统一落盘
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import glob
+import tempfile
+import time
+import atexit
+import threading
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目，字段顺序与旧的source_cache元组保持一致，便于直接解包
+CacheEntry = namedtuple('CacheEntry', ['cached_time', 'content', 'etag', 'last_modified'])
+
+# 默认缓存目录和大小上限
+DEFAULT_CACHE_DIR = "source_cache"
+DEFAULT_MAX_SIZE_MB = 200
+DEFAULT_FLUSH_INTERVAL = 60
+
+META_DIR_NAME = "meta"
+BODY_DIR_NAME = "body"
+DERIVED_DIR_NAME = "derived"
+
+# 旧版JSON缓存文件导入后改名追加的后缀（不再重复导入）
+LEGACY_IMPORTED_SUFFIX = ".imported"
+
+
+def calculate_content_hash(content):
+    """计算内容的MD5哈希值（与脚本中的calculate_md5保持一致）"""
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def _atomic_write(path, data):
+    """先写入同目录下的临时文件，再通过os.replace原子替换目标文件"""
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SourceCacheStore:
+    """按URL索引的直播源缓存
+
+    目录结构:
+        <cache_dir>/meta/<sha1(url)>.json   元数据（url、缓存时间、ETag、Last-Modified、内容哈希、大小）
+        <cache_dir>/body/<sha1(url)>.gz     gzip压缩的内容
+        <cache_dir>/derived/<sha1(url)>.<name>.json   按内容哈希保存的派生数据（解析结果、测试结论等）
+
+    读写单个URL只会访问对应的两个小文件，不会加载或重写其他条目。
+    兼容旧代码的字典用法：`url in store`、`store[url]`（返回CacheEntry）、`store[url] = (...)`。
+
+    write_behind=True时，put/touch只把条目标记为脏数据保存在内存中，由flush()统一写入磁盘；
+    读取时优先返回尚未落盘的脏条目，因此对调用方透明。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_MAX_SIZE_MB,
+                 write_behind=False, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        参数:
+            cache_dir: 缓存目录
+            max_size_mb: 压缩内容的总大小上限（MB），超过后按缓存时间淘汰最旧的条目，0表示不限制
+            write_behind: 是否启用延迟写入
+            flush_interval: 延迟写入时的自动刷新间隔（秒），0表示只在运行结束或进程退出时刷新
+        """
+        self.cache_dir = cache_dir
+        self.meta_dir = os.path.join(cache_dir, META_DIR_NAME)
+        self.body_dir = os.path.join(cache_dir, BODY_DIR_NAME)
+        self.derived_dir = os.path.join(cache_dir, DERIVED_DIR_NAME)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else 0
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._total_size = None  # 延迟统计，首次写入时才扫描目录
+        # 脏条目：{key: {'meta': 元数据, 'content': 新内容或None（None表示只更新了元数据）}}
+        self._dirty = {}
+        self._last_flush = time.time()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'flushes': 0, 'writes': 0}
+        if write_behind:
+            atexit.register(self.flush)
+
+    # ---------- 路径与元数据 ----------
+
+    @staticmethod
+    def _key(url):
+        """URL对应的文件名键"""
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key):
+        return os.path.join(self.meta_dir, key + '.json')
+
+    def _body_path(self, key):
+        return os.path.join(self.body_dir, key + '.gz')
+
+    def _derived_path(self, key, name):
+        return os.path.join(self.derived_dir, f"{key}.{name}.json")
+
+    def _ensure_dirs(self):
+        os.makedirs(self.meta_dir, exist_ok=True)
+        os.makedirs(self.body_dir, exist_ok=True)
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取缓存元数据失败，忽略该条目: {e}")
+            return None
+
+    def _write_meta(self, key, meta):
+        data = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        _atomic_write(self._meta_path(key), data)
+
+    def _scan_total_size(self):
+        """统计当前压缩内容的总大小"""
+        total = 0
+        try:
+            with os.scandir(self.body_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.gz') and entry.is_file():
+                        total += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        return total
+
+    # ---------- 统计 ----------
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def record_hit(self):
+        """记录一次缓存命中（缓存未过期，直接使用）"""
+        self._count('hits')
+
+    def record_miss(self):
+        """记录一次缓存未命中（无缓存或内容已变化，需要重新下载）"""
+        self._count('misses')
+
+    def record_revalidation(self):
+        """记录一次重新验证（304或内容哈希未变化，只刷新缓存时间）"""
+        self._count('revalidations')
+
+    def stats_summary(self):
+        """返回缓存统计信息的可读字符串"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses'] + stats['revalidations']
+        hit_rate = (stats['hits'] + stats['revalidations']) / lookups * 100 if lookups else 0
+        return (f"命中 {stats['hits']}，重新验证 {stats['revalidations']}，未命中 {stats['misses']}，"
+                f"命中率 {hit_rate:.1f}%，落盘 {stats['flushes']} 次/{stats['writes']} 个条目")
+
+    # ---------- 公共接口 ----------
+
+    def get_meta(self, url):
+        """只读取元数据（不解压内容），不存在时返回None"""
+        key = self._key(url)
+        with self._lock:
+            dirty = self._dirty.get(key)
+            if dirty is not None:
+                return dict(dirty['meta'])
+        return self._read_meta(key)
+
+    def get(self, url, default=None):
+        """读取完整的缓存条目，不存在或内容损坏时返回default"""
+        key = self._key(url)
+        with self._lock:
+            dirty = self._dirty.get(key)
+            if dirty is not None:
+                meta = dirty['meta']
+                content = dirty['content']
+        if dirty is None:
+            meta = self._read_meta(key)
+            if meta is None:
+                return default
+            content = None
+        if content is None:
+            content = self._read_body(key)
+            if content is None:
+                return default
+        return CacheEntry(meta['cached_time'], content, meta.get('etag'), meta.get('last_modified'))
+
+    def _read_body(self, key):
+        try:
+            with gzip.open(self._body_path(key), 'rb') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            logger.warning(f"读取缓存内容失败，忽略该条目: {e}")
+            return None
+
+    def put(self, url, cached_time, content, etag=None, last_modified=None):
+        """写入（或覆盖）一个缓存条目，内容和元数据分别原子替换"""
+        key = self._key(url)
+        meta = {
+            'url': url,
+            'cached_time': cached_time,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': calculate_content_hash(content)
+        }
+
+        if self.write_behind:
+            with self._lock:
+                self._dirty[key] = {'meta': meta, 'content': content}
+            self._maybe_flush()
+            return
+
+        with self._lock:
+            self._write_entry(key, meta, content)
+            self._enforce_size_limit(keep_key=key)
+
+    def touch(self, url, cached_time, etag=None, last_modified=None):
+        """内容未变化时只更新元数据（缓存时间、ETag、Last-Modified），不重写内容
+
+        返回:
+            bool: 条目存在并已更新时返回True
+        """
+        key = self._key(url)
+        with self._lock:
+            dirty = self._dirty.get(key)
+            meta = dirty['meta'] if dirty is not None else self._read_meta(key)
+            if meta is None:
+                return False
+            meta['cached_time'] = cached_time
+            meta['etag'] = etag
+            meta['last_modified'] = last_modified
+            if self.write_behind:
+                if dirty is None:
+                    self._dirty[key] = {'meta': meta, 'content': None}
+            else:
+                self._write_meta(key, meta)
+        if self.write_behind:
+            self._maybe_flush()
+        return True
+
+    def _write_entry(self, key, meta, content):
+        """把一个条目写入磁盘（调用方需持有锁）"""
+        self._ensure_dirs()
+        if self._total_size is None:
+            self._total_size = self._scan_total_size()
+        if content is not None:
+            body = gzip.compress(content.encode('utf-8'), compresslevel=6)
+            old_meta = self._read_meta(key)
+            meta['size'] = len(body)
+            # 先写内容再写元数据：元数据存在即表示内容完整
+            _atomic_write(self._body_path(key), body)
+            self._total_size += len(body) - (old_meta.get('size', 0) if old_meta else 0)
+        self._write_meta(key, meta)
+        self.stats['writes'] += 1
+
+    def _enforce_size_limit(self, keep_key=None):
+        if self.max_size_bytes and self._total_size is not None and self._total_size > self.max_size_bytes:
+            self._evict(keep_key=keep_key)
+
+    def _maybe_flush(self):
+        """到达刷新间隔时自动落盘"""
+        if self.flush_interval and time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """将所有脏条目写入磁盘
+
+        返回:
+            int: 写入的条目数
+        """
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            written = 0
+            for key, item in dirty.items():
+                try:
+                    self._write_entry(key, item['meta'], item['content'])
+                    written += 1
+                except OSError as e:
+                    logger.error(f"缓存落盘失败: {e}")
+            self._enforce_size_limit()
+            self.stats['flushes'] += 1
+        logger.debug(f"缓存落盘完成，写入 {written} 个条目")
+        return written
+
+    def get_derived(self, url, name, content_hash):
+        """读取与指定内容哈希对应的派生数据
+
+        派生数据（如解析后的频道列表、URL测试结论）只在源内容未变化时有效，
+        内容哈希不一致时返回None，调用方应重新计算并通过put_derived()保存
+        """
+        try:
+            with open(self._derived_path(self._key(url), name), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取缓存派生数据失败，忽略该条目: {e}")
+            return None
+        if record.get('content_hash') != content_hash:
+            return None
+        return record.get('data')
+
+    def put_derived(self, url, name, content_hash, data):
+        """保存与指定内容哈希对应的派生数据（data需可JSON序列化）"""
+        record = {'url': url, 'content_hash': content_hash, 'data': data}
+        payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        key = self._key(url)
+        with self._lock:
+            os.makedirs(self.derived_dir, exist_ok=True)
+            _atomic_write(self._derived_path(key, name), payload)
+
+    def delete(self, url):
+        """删除一个缓存条目"""
+        key = self._key(url)
+        with self._lock:
+            self._dirty.pop(key, None)
+            self._remove_key(key)
+
+    def _remove_key(self, key):
+        meta = self._read_meta(key)
+        paths = [self._meta_path(key), self._body_path(key)]
+        paths.extend(glob.glob(os.path.join(glob.escape(self.derived_dir), key + '.*.json')))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        if meta and self._total_size is not None:
+            self._total_size -= meta.get('size', 0)
+
+    def _evict(self, keep_key=None):
+        """按缓存时间从旧到新淘汰条目，直到总大小回到上限以内（调用方需持有锁）"""
+        candidates = []
+        try:
+            with os.scandir(self.meta_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.json'):
+                        continue
+                    key = entry.name[:-5]
+                    if key == keep_key:
+                        continue
+                    meta = self._read_meta(key)
+                    if meta is not None:
+                        candidates.append((meta.get('cached_time', 0), key))
+        except FileNotFoundError:
+            return
+
+        candidates.sort()
+        evicted = 0
+        for _, key in candidates:
+            if self._total_size <= self.max_size_bytes:
+                break
+            self._remove_key(key)
+            evicted += 1
+        if evicted:
+            logger.info(f"缓存超过大小上限，已淘汰 {evicted} 个最旧的条目")
+
+    def __len__(self):
+        try:
+            with os.scandir(self.meta_dir) as entries:
+                on_disk = {entry.name[:-5] for entry in entries if entry.name.endswith('.json')}
+        except FileNotFoundError:
+            on_disk = set()
+        with self._lock:
+            return len(on_disk.union(self._dirty))
+
+    def __contains__(self, url):
+        key = self._key(url)
+        with self._lock:
+            if key in self._dirty:
+                return True
+        return os.path.exists(self._meta_path(key))
+
+    def __getitem__(self, url):
+        entry = self.get(url)
+        if entry is None:
+            raise KeyError(url)
+        return entry
+
+    def __setitem__(self, url, value):
+        cached_time, content, etag, last_modified = value
+        self.put(url, cached_time, content, etag, last_modified)
+
+    def __delitem__(self, url):
+        self.delete(url)
+
+    def import_legacy_json(self, json_file):
+        """导入旧版source_cache.json中的条目（仅导入缓存中尚不存在的URL）
+
+        导入的条目写入磁盘后，旧文件改名为 *.imported，之后启动时不再读取，
+        已从新缓存中淘汰或删除的条目也不会被重新导入
+
+        返回:
+            int: 导入的条目数
+        """
+        if not json_file or not os.path.exists(json_file):
+            return 0
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                legacy_cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取旧版缓存文件 {json_file} 失败: {e}")
+            return 0
+
+        imported = 0
+        for url, data in legacy_cache.items():
+            if url in self or not isinstance(data, dict) or data.get('content') is None:
+                continue
+            self.put(url, data.get('cached_time', 0), data['content'], data.get('etag'), data.get('last_modified'))
+            imported += 1
+
+        self.flush()
+        try:
+            os.replace(json_file, json_file + LEGACY_IMPORTED_SUFFIX)
+        except OSError as e:
+            logger.warning(f"重命名旧版缓存文件 {json_file} 失败: {e}")
+        return imported
+
+
+def open_cache_store(cache_config):
+    """根据配置中的cache段创建缓存存储"""
+    return SourceCacheStore(
+        cache_dir=cache_config.get("dir", DEFAULT_CACHE_DIR),
+        max_size_mb=cache_config.get("max_size_mb", DEFAULT_MAX_SIZE_MB),
+        write_behind=cache_config.get("write_behind", True),
+        flush_interval=cache_config.get("flush_interval", DEFAULT_FLUSH_INTERVAL)
+    )
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+频道关键词分类器
+功能：根据数据驱动的分类表把所有关键词预编译成一个正则表达式，
+每个频道名只需一次匹配即可得到分类，分类优先级与分类表顺序一致
+"""
+
+import re
+from functools import lru_cache
+
+# 默认分类（没有任何关键词命中时）
+DEFAULT_CATEGORY = "综合频道"
+
+# 分类表：按优先级从高到低排列，同一频道名命中多个分类时取排在前面的分类
+# 关键词不区分大小写
+CATEGORY_TABLE = [
+    ("4K频道", ['4k', '2160p', '超高清', 'uhd']),
+    ("央视频道", ['央视', 'cctv', 'cnn']),
+    ("卫视频道", ['卫视', '东方卫视', '湖南卫视', '江苏卫视', '浙江卫视']),
+    ("港澳频道", ['香港', '台湾', '澳门', 'hktv', 'cti', 'ctv']),
+    ("电影频道", ['电影', 'movie', 'cinema']),
+    ("儿童频道", ['儿童', '少儿', '动画', '卡通', 'kids']),
+    ("体育频道", ['体育', 'sports', '足球', '篮球']),
+    ("综艺频道", ['综艺', 'variety', '娱乐']),
+    ("新闻频道", ['新闻', 'news', '资讯']),
+    ("音乐频道", ['音乐', 'music', 'mtv']),
+]
+
+# 分类结果缓存的条目数（同一频道名会在多个源中反复出现）
+CACHE_SIZE = 65536
+
+
+class ChannelClassifier:
+    """预编译的多关键词频道分类器
+
+    每个分类编译为一个命名分组的前瞻分支 (?P<cN>(?=.*?(?:关键词1|关键词2...)))，
+    所有分支按优先级拼接成一个在名称开头匹配的正则。匹配时引擎按顺序尝试各分支，
+    第一个成功的分支即为优先级最高的命中分类，整个过程在一次re调用内完成。
+    """
+
+    def __init__(self, table=CATEGORY_TABLE, default=DEFAULT_CATEGORY, cache_size=CACHE_SIZE):
+        """
+        参数:
+            table: [(分类名, [关键词, ...]), ...]，按优先级从高到低排列
+            default: 没有关键词命中时返回的分类
+            cache_size: 分类结果缓存的条目数，0表示不缓存
+        """
+        self.default = default
+        self._group_categories = {}
+        branches = []
+        for index, (category, keywords) in enumerate(table):
+            keywords = [keyword.lower() for keyword in keywords if keyword]
+            if not keywords:
+                continue
+            group = f"c{index}"
+            self._group_categories[group] = category
+            # 长关键词在前，避免短关键词抢先匹配（对结果无影响，只减少回溯）
+            alternation = '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+            branches.append(f"(?P<{group}>(?=.*?(?:{alternation})))")
+        self._pattern = re.compile('|'.join(branches), re.DOTALL) if branches else None
+
+        if cache_size:
+            self.classify = lru_cache(maxsize=cache_size)(self._classify)
+        else:
+            self.classify = self._classify
+
+    def _classify(self, channel_name):
+        if self._pattern is None:
+            return self.default
+        match = self._pattern.match(channel_name.lower())
+        if match is None:
+            return self.default
+        return self._group_categories[match.lastgroup]
+
+
+# 默认分类器，导入时构建一次
+default_classifier = ChannelClassifier()
+
+
+def classify_channel(channel_name):
+    """使用默认分类表对频道名分类"""
+    return default_classifier.classify(channel_name)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+频道名称匹配索引
+功能：从所有直播源的频道中一次性构建 频道名 -> URL列表 的索引，
+精确匹配和别名匹配只需字典查找；可选的模糊匹配先用字符二元组倒排索引和长度约束筛选候选，
+再用difflib计算相似度，避免与所有频道名逐一比较
+"""
+
+import re
+from difflib import SequenceMatcher
+
+# 模糊匹配时忽略的字符（空格、连字符、下划线等分隔符）
+FUZZY_IGNORED_CHARS = re.compile(r'[\s\-_·.]+')
+
+# 默认模糊匹配阈值
+DEFAULT_FUZZY_THRESHOLD = 0.8
+
+
+def _fuzzy_key(name):
+    """模糊匹配用的规范化名称：去掉分隔符并转为小写"""
+    return FUZZY_IGNORED_CHARS.sub('', name).casefold()
+
+
+def _ngrams(text):
+    """字符二元组集合；单字符名称使用字符本身"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class ChannelMatcher:
+    """频道名称匹配器
+
+    参数:
+        all_channels: {分类: [(频道名, URL), ...]}
+        case_sensitive: 精确匹配和别名匹配是否区分大小写
+    """
+
+    def __init__(self, all_channels, case_sensitive=True):
+        self.case_sensitive = case_sensitive
+        # 按 all_channels 的分类顺序和频道顺序保存URL，与逐个遍历的结果顺序一致
+        self._urls_by_name = {}
+        for channel_list in all_channels.values():
+            for channel_name, url in channel_list:
+                self._urls_by_name.setdefault(self._key(channel_name), []).append(url)
+
+        # 模糊匹配索引在第一次模糊查找时构建
+        self._fuzzy_keys = None
+        self._fuzzy_names = None
+        self._gram_index = None
+
+    def _key(self, name):
+        return name if self.case_sensitive else name.casefold()
+
+    def lookup(self, name):
+        """精确查找频道名对应的URL列表（不存在时返回空列表）"""
+        return list(self._urls_by_name.get(self._key(name), ()))
+
+    def lookup_aliases(self, aliases):
+        """按别名顺序依次查找，返回所有别名对应的URL列表"""
+        urls = []
+        for alias in aliases:
+            urls.extend(self._urls_by_name.get(self._key(alias), ()))
+        return urls
+
+    def _build_fuzzy_index(self):
+        """构建 规范化名称 -> 原始名称 的映射和二元组倒排索引"""
+        names_by_fuzzy_key = {}
+        for key in self._urls_by_name:
+            fuzzy_key = _fuzzy_key(key)
+            if fuzzy_key:
+                names_by_fuzzy_key.setdefault(fuzzy_key, []).append(key)
+
+        self._fuzzy_keys = list(names_by_fuzzy_key)
+        self._fuzzy_names = [names_by_fuzzy_key[key] for key in self._fuzzy_keys]
+        self._gram_index = {}
+        for key_id, fuzzy_key in enumerate(self._fuzzy_keys):
+            for gram in _ngrams(fuzzy_key):
+                self._gram_index.setdefault(gram, []).append(key_id)
+
+    def fuzzy_lookup(self, name, threshold=DEFAULT_FUZZY_THRESHOLD):
+        """模糊查找频道名
+
+        只比较与查询名共享至少一个二元组、且长度满足阈值上限的候选名称；
+        返回相似度最高（且不低于阈值）的所有频道名对应的URL列表
+
+        返回:
+            tuple: (URL列表, 匹配到的频道名列表, 相似度)，没有匹配时为 ([], [], 0.0)
+        """
+        if self._gram_index is None:
+            self._build_fuzzy_index()
+
+        query = _fuzzy_key(name)
+        if not query:
+            return [], [], 0.0
+
+        shared = {}
+        for gram in _ngrams(query):
+            for key_id in self._gram_index.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+
+        query_len = len(query)
+        best_ratio = 0.0
+        best_ids = []
+        matcher = SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(query)
+        # 共享二元组多的候选优先比较，便于尽早确定最高相似度
+        for key_id in sorted(shared, key=shared.get, reverse=True):
+            candidate = self._fuzzy_keys[key_id]
+            # 相似度 2*M/(la+lb) 的上限由较短名称的长度决定
+            candidate_len = len(candidate)
+            upper_bound = 2.0 * min(query_len, candidate_len) / (query_len + candidate_len)
+            if upper_bound < threshold or upper_bound < best_ratio:
+                continue
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio < threshold or ratio < best_ratio:
+                continue
+            if ratio > best_ratio:
+                best_ratio = ratio
+                best_ids = [key_id]
+            else:
+                best_ids.append(key_id)
+
+        urls = []
+        names = []
+        for key_id in best_ids:
+            for key in self._fuzzy_names[key_id]:
+                names.append(key)
+                urls.extend(self._urls_by_name[key])
+        return urls, names, best_ratio
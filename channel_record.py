@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+频道记录类型
+功能：为IPTV.py、IPTVTXT.py和验证器提供统一的紧凑频道记录
+- Channel: (频道名, URL) 二元组的子类，内存占用与普通元组相同，频道名自动驻留（sys.intern），
+  同一频道名在所有直播源中只保存一份；可直接解包、比较、序列化为JSON，兼容原有的元组用法
+- ChannelRecord: 验证器使用的__slots__记录，解析、验证、输出各阶段原地更新同一个对象，
+  同时支持按键访问（record['name']、record.get('resolution')），兼容原有的字典用法
+"""
+
+import sys
+from operator import itemgetter
+
+
+class Channel(tuple):
+    """频道 (频道名, URL)"""
+
+    __slots__ = ()
+
+    def __new__(cls, name, url):
+        return tuple.__new__(cls, (sys.intern(name) if type(name) is str else name, url))
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return f"Channel(name={self[0]!r}, url={self[1]!r})"
+
+    name = property(itemgetter(0), doc="频道名")
+    url = property(itemgetter(1), doc="URL")
+
+
+def as_channel(item):
+    """将 (频道名, URL) 形式的元组或列表（例如从JSON缓存读出的数据）转为Channel"""
+    if type(item) is Channel:
+        return item
+    name, url = item
+    return Channel(name, url)
+
+
+def intern_text(value):
+    """驻留字符串（分类名、频道名等大量重复的字符串）"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class ChannelRecord:
+    """验证器使用的频道记录
+
+    解析时创建，验证结果直接写入同一个对象，不再为每个频道另建结果字典；
+    各字段也可以像字典一样按键读写，未设置的字段为None
+    """
+
+    __slots__ = ('name', 'url', 'category', 'original_index', 'valid', 'resolution',
+                 'resolution_width', 'resolution_height', 'codec', 'audio', 'error', 'latency',
+                 'is_ipv6', 'is_special_protocol', 'from_health_db')
+
+    # 每次验证前需要重置的字段及其初始值（valid为None表示尚未验证）
+    RESULT_DEFAULTS = (('valid', None), ('resolution', None), ('resolution_width', None),
+                       ('resolution_height', None), ('codec', None), ('audio', None), ('error', None),
+                       ('latency', None), ('is_ipv6', None), ('is_special_protocol', None),
+                       ('from_health_db', None))
+
+    def __init__(self, name, url, category='未分类', resolution=None, original_index=0):
+        self.name = intern_text(name)
+        self.url = url
+        self.category = intern_text(category)
+        self.original_index = original_index
+        self.reset()
+        self.resolution = resolution
+
+    def reset(self):
+        """清除上一次的验证结果"""
+        for field, default in self.RESULT_DEFAULTS:
+            setattr(self, field, default)
+
+    # ---------- 字典兼容接口 ----------
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def keys(self):
+        return [field for field in self.__slots__ if getattr(self, field) is not None]
+
+    def to_dict(self):
+        """转换为普通字典（供JSON序列化或进度回调使用），省略未设置的可选字段"""
+        result = {field: getattr(self, field) for field in self.__slots__}
+        for field in ('latency', 'is_ipv6', 'is_special_protocol', 'from_health_db'):
+            if result[field] is None:
+                del result[field]
+        if result['valid'] is None:
+            result['valid'] = False
+        return result
+
+    def __repr__(self):
+        return f"ChannelRecord(name={self.name!r}, url={self.url!r}, category={self.category!r}, valid={self.valid!r})"
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+列式频道表
+功能：合并大量直播源时按列存储频道，替代 {分类: [(频道名, URL), ...]} + seen集合 的做法
+- 分类名、频道名在字符串池中只保存一份，每行只存4字节的分类ID和频道名ID
+- URL以UTF-8编码连续存放在一个bytearray中，每行只存一个8字节的结束偏移，不再为每条URL保留str对象
+- 去重索引只保存键的哈希值和行号，哈希相同时再取出该行比较，不保存键本身
+- 按分类分组、转换为原来的字典结构（频道为Channel）都在需要时才进行
+"""
+
+import sys
+from array import array
+from collections import OrderedDict, defaultdict
+
+from channel_record import Channel
+
+
+def channel_key(name, url):
+    """默认去重键：频道名和URL都相同才视为重复"""
+    return (name, url)
+
+
+class StringPool:
+    """字符串池：字符串 <-> 整数ID"""
+
+    def __init__(self):
+        self._ids = {}
+        self._values = []
+
+    def intern(self, value):
+        """返回字符串的ID，不存在时加入池中"""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value = sys.intern(value)
+            value_id = len(self._values)
+            self._ids[value] = value_id
+            self._values.append(value)
+        return value_id
+
+    def get_id(self, value):
+        """返回字符串的ID，不存在时返回None"""
+        return self._ids.get(value)
+
+    def __getitem__(self, value_id):
+        return self._values[value_id]
+
+    def __len__(self):
+        return len(self._values)
+
+    def memory_usage(self):
+        """估算占用的字节数（字符串本身、列表和字典）"""
+        return (sys.getsizeof(self._ids) + sys.getsizeof(self._values)
+                + sum(sys.getsizeof(value) for value in self._values))
+
+
+class ChannelTable:
+    """列式频道表
+
+    参数:
+        dedup_key: 去重键函数 key(频道名, URL)，返回可哈希的值；键相同的频道只保留第一条。
+                   默认按 (频道名, URL) 去重，为None时不去重
+    """
+
+    def __init__(self, dedup_key=channel_key):
+        self.categories = StringPool()
+        self.names = StringPool()
+        self._category_ids = array('i')
+        self._name_ids = array('i')
+        self._url_data = bytearray()
+        self._url_ends = array('q')
+        self._dedup_key = dedup_key
+        # 键的哈希值 -> 行号（哈希冲突时为行号列表）
+        self._key_rows = {}
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self._name_ids)
+
+    def url(self, row):
+        """第row行的URL"""
+        start = self._url_ends[row - 1] if row else 0
+        return self._url_data[start:self._url_ends[row]].decode('utf-8')
+
+    def channel(self, row):
+        """第row行的频道 Channel(频道名, URL)"""
+        return Channel(self.names[self._name_ids[row]], self.url(row))
+
+    def category(self, row):
+        """第row行的分类名"""
+        return self.categories[self._category_ids[row]]
+
+    def _find_duplicate(self, key, key_hash):
+        """查找键相同的已有行，返回True表示重复"""
+        existing = self._key_rows.get(key_hash)
+        if existing is None:
+            return False
+        rows = existing if type(existing) is list else (existing,)
+        for row in rows:
+            if self._dedup_key(self.names[self._name_ids[row]], self.url(row)) == key:
+                return True
+        return False
+
+    def _index_row(self, key_hash, row):
+        existing = self._key_rows.get(key_hash)
+        if existing is None:
+            self._key_rows[key_hash] = row
+        elif type(existing) is list:
+            existing.append(row)
+        else:
+            self._key_rows[key_hash] = [existing, row]
+
+    def add(self, category, name, url):
+        """添加一个频道，重复时不添加
+
+        返回:
+            bool: 是否已添加
+        """
+        if self._dedup_key is not None:
+            key = self._dedup_key(name, url)
+            key_hash = hash(key)
+            if key_hash in self._key_rows and self._find_duplicate(key, key_hash):
+                self.duplicates += 1
+                return False
+            self._index_row(key_hash, len(self))
+
+        self._category_ids.append(self.categories.intern(category))
+        self._name_ids.append(self.names.intern(name))
+        self._url_data += url.encode('utf-8')
+        self._url_ends.append(len(self._url_data))
+        return True
+
+    def extend(self, channels):
+        """添加 {分类: [(频道名, URL), ...]} 中的所有频道，返回实际添加的数量"""
+        added = 0
+        for category, channel_list in channels.items():
+            for channel_name, url in channel_list:
+                if self.add(category, channel_name, url):
+                    added += 1
+        return added
+
+    def group_by_category(self):
+        """按分类分组
+
+        返回:
+            OrderedDict: {分类: array(行号)}，分类按第一次出现的顺序，行号按添加顺序
+        """
+        groups = OrderedDict()
+        categories = self.categories
+        for row, category_id in enumerate(self._category_ids):
+            rows = groups.get(category_id)
+            if rows is None:
+                rows = groups[category_id] = array('i')
+            rows.append(row)
+        return OrderedDict((categories[category_id], rows) for category_id, rows in groups.items())
+
+    def category_counts(self):
+        """各分类的频道数 {分类: 数量}"""
+        return OrderedDict((category, len(rows)) for category, rows in self.group_by_category().items())
+
+    def to_dict(self):
+        """转换为 defaultdict(list) {分类: [Channel(频道名, URL), ...]}，与原来的频道字典结构相同"""
+        channels = defaultdict(list)
+        for category, rows in self.group_by_category().items():
+            channels[category] = [self.channel(row) for row in rows]
+        return channels
+
+    def memory_usage(self):
+        """估算表占用的字节数（各列、字符串池和去重索引）"""
+        index_size = sys.getsizeof(self._key_rows) + sum(
+            sys.getsizeof(key_hash) + sys.getsizeof(rows) for key_hash, rows in self._key_rows.items())
+        return (sys.getsizeof(self._category_ids) + sys.getsizeof(self._name_ids)
+                + sys.getsizeof(self._url_data) + sys.getsizeof(self._url_ends)
+                + self.categories.memory_usage() + self.names.memory_usage() + index_size)
@@ -7,12 +7,67 @@ M3U/TXT格式双向转换工具
 支持 M3U → TXT 和 TXT → M3U 双向转换
 """
 
-import re
 import argparse
 import os
 import sys
+import tempfile
 from datetime import datetime
 
+from file_utils import detect_file_encoding, iter_lines_with_encoding, read_file_with_encoding
+from playlist_parser import iter_m3u_entries
+
+# 流式读取M3U文件时的缓冲区大小
+READ_BUFFER_SIZE = 1024 * 1024
+
+# 分组暂存行在内存中的缓冲上限（字符数），超过后统一追加写入各分组的临时文件
+SPILL_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class GroupSpill:
+    """按分组暂存TXT行的临时文件
+
+    转换时各分组的频道行先放入内存缓冲，缓冲超过SPILL_BUFFER_SIZE后追加写入各自的临时文件，
+    全部解析完成后再按分组名排序依次拼接到输出文件，内存占用与输入文件大小无关
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self._paths = {}
+        self._buffers = {}
+        self._buffered = 0
+    
+    def write(self, group, line):
+        """向分组追加一行"""
+        buffer = self._buffers.get(group)
+        if buffer is None:
+            buffer = self._buffers[group] = []
+            if group not in self._paths:
+                self._paths[group] = os.path.join(self.directory, f"{len(self._paths):06d}.txt")
+        buffer.append(line)
+        self._buffered += len(line) + 1
+        if self._buffered >= SPILL_BUFFER_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """将所有分组的缓冲追加写入临时文件"""
+        for group, buffer in self._buffers.items():
+            with open(self._paths[group], 'a', encoding='utf-8') as f:
+                f.write('\n'.join(buffer))
+                f.write('\n')
+        self._buffers.clear()
+        self._buffered = 0
+    
+    def groups(self):
+        """所有写入过的分组"""
+        return list(self._paths)
+    
+    def copy_to(self, group, output):
+        """将分组暂存的内容按写入顺序复制到输出文件"""
+        with open(self._paths[group], 'r', encoding='utf-8') as f:
+            for line in f:
+                output.write(line)
+
+
 class M3UConverter:
     """M3U文件转换器类"""
     
@@ -20,178 +75,98 @@ class M3UConverter:
         """初始化M3U转换器"""
         # 支持的编码格式列表，按优先级排序
         self.encodings = ['utf-8', 'gbk', 'gb2312', 'latin1', 'iso-8859-1']
-        # 改进的正则表达式模式，支持更多M3U格式变体
-        self.patterns = [
-            # 标准格式：#EXTINF:-1 ... tvg-name="频道名" ... group-title="分组名",频道显示名
-            # 仅匹配EXTINF行，不包含URL
-            r"#EXTINF:[^\n]+?tvg-name=[\"']?([^\"']+)[\"']?[^\n]*?group-title=[\"']?([^\"']+)[\"']?[^\n]*?,([^\n]+)",
-            # 简化格式：#EXTINF:-1 ... tvg-name="频道名" ...,频道显示名（没有分组）
-            r"#EXTINF:[^\n]+?tvg-name=[\"']?([^\"']+)[\"']?[^\n]*?,([^\n]+)",
-            # 极简格式：#EXTINF:-1,频道显示名
-            r"#EXTINF:[^\n]+?,([^\n]+)",
-        ]
     
     def read_file_with_encoding(self, file_path):
-        """尝试使用多种编码读取文件"""
-        for encoding in self.encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                return content, encoding
-            except UnicodeDecodeError:
-                continue
-            except Exception:
-                continue
-        return None, None
+        """读取文件并自动识别编码（只读取一次文件，见file_utils.read_file_with_encoding）"""
+        return read_file_with_encoding(file_path, self.encodings)
     
-    def parse_m3u_content(self, content):
-        """解析M3U内容，提取频道信息"""
-        group_channels = {}
-        processed_channels = set()  # 用于跟踪已处理的频道URL组合
+    def iter_channel_lines(self, lines, stats=None):
+        """流式解析M3U行，逐个产出 (分组名, "频道显示名,URL")
         
-        # 按行处理内容，确保每个频道只被处理一次
-        lines = content.split('\n')
-        i = 0
-        total_matches = 0
+        解析状态机（playlist_parser.iter_m3u_entries）只保留当前条目，条目下的多行URL都属于该频道；
+        相同的URL只产出一次
         
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('#EXTINF:'):
-                # 找到一个频道开始行
-                extinf_line = line
-                j = i + 1
-                urls_text = []
-                
-                # 收集后续的URL行，直到遇到下一个EXTINF或文件结束
-                while j < len(lines):
-                    next_line = lines[j].strip()
-                    if next_line and not next_line.startswith('#'):
-                        urls_text.append(next_line)
-                    elif next_line.startswith('#EXTINF:'):
-                        break
-                    j += 1
-                
-                if urls_text:
-                    urls = urls_text
-                    total_matches += 1
-                    
-                    # 尝试匹配不同的格式
-                    match = None
-                    pattern_used = None
-                    
-                    # 先尝试最具体的模式
-                    for pattern in self.patterns:
-                        full_match = re.match(pattern, extinf_line, re.DOTALL)
-                        if full_match:
-                            match = full_match.groups()
-                            pattern_used = pattern
-                            break
-                    
-                    if match:
-                        if len(match) == 3:
-                            # 标准格式：tvg_name, group_title, channel_name
-                            tvg_name, group_title, channel_name = match
-                        elif len(match) == 2:
-                            # 简化格式：tvg_name, channel_name
-                            tvg_name, channel_name = match
-                            group_title = ""
-                        else:
-                            # 极简格式：channel_name
-                            channel_name = match[0]
-                            tvg_name = match[0]  # 没有tvg-name时，使用频道显示名
-                            group_title = ""
-                        
-                        # 清理数据，保持原始频道名称不变
-                        tvg_name = tvg_name.strip() if tvg_name else ""
-                        group_title = group_title.strip() if group_title else ""
-                        channel_name = channel_name.strip() if channel_name else ""
-                        
-                        # 如果没有频道显示名，使用tvg-name作为频道显示名
-                        if not channel_name:
-                            channel_name = tvg_name
-                        
-                        # 保持原有的分组信息，不添加额外分组
-                        group_title = group_title.strip()
-                        # 如果没有分组信息，保持为空字符串
-                        if not group_title:
-                            group_title = ""
-                        
-                        # 添加到分组
-                        if group_title not in group_channels:
-                            group_channels[group_title] = []
-                        
-                        # 为每个URL创建一行，只包含频道显示名和URL，不包含分组名
-                        for url in urls:
-                            url = url.strip()
-                            if url:
-                                # 格式: 频道显示名,URL （不包含分组名）
-                                channel_line = f"{channel_name},{url}"
-                                # 使用URL作为唯一标识，避免重复处理相同的频道URL组合
-                                if url not in processed_channels:
-                                    processed_channels.add(url)
-                                    group_channels[group_title].append(channel_line)
-                
-                # 跳过已处理的行
-                i = j
-            else:
-                i += 1
+        参数:
+            lines: 任意可迭代的行（文件对象按缓冲区分块读取）
+            stats: 可选的统计字典，解析后 stats['entries'] 为条目数
+        """
+        seen_urls = set()
+        entries = 0
+        for entry in iter_m3u_entries(lines):
+            entries += 1
+            # 保持原始频道名称不变：优先使用显示名，没有显示名时使用tvg-name
+            channel_name = entry.name
+            # 保持原有的分组信息，不添加额外分组；没有分组信息时为空字符串
+            group_title = entry.group_title
+            
+            for url in entry.urls:
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    # 格式: 频道显示名,URL （不包含分组名）
+                    yield group_title, f"{channel_name},{url}"
         
-        return group_channels, total_matches
+        if stats is not None:
+            stats['entries'] = entries
+    
+    def parse_m3u_content(self, content):
+        """解析M3U内容，提取频道信息（一次性返回所有分组，适合较小的内容）"""
+        group_channels = {}
+        stats = {'entries': 0}
+        for group_title, channel_line in self.iter_channel_lines(content.split('\n'), stats):
+            group_channels.setdefault(group_title, []).append(channel_line)
+        return group_channels, stats['entries']
     
     def convert_m3u_to_txt(self, m3u_file_path, txt_file_path):
-        """将M3U文件转换为TXT格式"""
-        try:
-            # 检查文件是否存在
-            with open(m3u_file_path, 'r', encoding='utf-8') as f:
-                pass
-        except FileNotFoundError:
-            return False
-        
-        # 检查文件是否为空
-        import os
-        file_size = os.path.getsize(m3u_file_path)
-        if file_size == 0:
-            return False
+        """将M3U文件转换为TXT格式
         
-        # 读取文件内容
-        content, used_encoding = self.read_file_with_encoding(m3u_file_path)
-        if content is None:
+        按块流式读取文件，频道行按分组暂存到临时文件，内存占用与文件大小无关；
+        编码只根据BOM和文件开头的字节判断一次，读取中途出现解码错误时才改为逐行解码、
+        对出错的行逐行回退到其他候选编码，不再为每个候选编码重新读取整个文件
+        """
+        # 检查文件是否存在、是否为空
+        if not os.path.isfile(m3u_file_path) or os.path.getsize(m3u_file_path) == 0:
             return False
         
-        # 解析M3U内容
-        group_channels, total_matches = self.parse_m3u_content(content)
-        
-        if total_matches == 0:
+        encoding = detect_file_encoding(m3u_file_path, self.encodings)
+        if encoding is None:
             return False
         
-        # 统计信息
-        total_groups = len([g for g in group_channels if group_channels[g]])
-        total_sources = sum(len(channels) for channels in group_channels.values())
-        
-        # 生成输出内容
-        output_lines = []
-        
-        # 添加频道信息
-        for group, channels in sorted(group_channels.items()):
-            if channels:  # 只写入有频道的分组
-                if group:  # 只有当分组名称非空时才写入分组标题
-                    output_lines.append(f"{group},#genre#")
-                # 写入该分组下的所有频道URL
-                for channel_line in channels:
-                    output_lines.append(channel_line)
-                # 分组之间空一行
-                output_lines.append("")
-        
-        # 写入TXT文件
         try:
-            with open(txt_file_path, 'w', encoding='utf-8-sig') as txt:  # 使用utf-8-sig确保Windows正确识别
-                for line in output_lines:
-                    txt.write(line + '\n')
+            with open(m3u_file_path, 'r', encoding=encoding, buffering=READ_BUFFER_SIZE) as f:
+                return self._stream_m3u_to_txt(f, txt_file_path)
+        except UnicodeDecodeError:
+            pass
+        
+        # 开头之后出现了其他编码的内容
+        if encoding.startswith(('utf-16', 'utf-32')):
+            with open(m3u_file_path, 'r', encoding=encoding, errors='replace', buffering=READ_BUFFER_SIZE) as f:
+                return self._stream_m3u_to_txt(f, txt_file_path)
+        return self._stream_m3u_to_txt(iter_lines_with_encoding(m3u_file_path, encoding, self.encodings),
+                                       txt_file_path)
+    
+    def _stream_m3u_to_txt(self, lines, txt_file_path):
+        """流式转换已解码的行，行解码出错时抛出UnicodeDecodeError"""
+        stats = {'entries': 0}
+        with tempfile.TemporaryDirectory(prefix='m3u2txt_') as spill_dir:
+            spill = GroupSpill(spill_dir)
+            for group_title, channel_line in self.iter_channel_lines(lines, stats):
+                spill.write(group_title, channel_line)
+            spill.flush()
             
-            return True
-                
-        except Exception:
-            return False
+            if stats['entries'] == 0:
+                return False
+            
+            # 写入TXT文件：分组按名称排序，分组之间空一行
+            try:
+                with open(txt_file_path, 'w', encoding='utf-8-sig') as txt:  # 使用utf-8-sig确保Windows正确识别
+                    for group in sorted(spill.groups()):
+                        if group:  # 只有当分组名称非空时才写入分组标题
+                            txt.write(f"{group},#genre#\n")
+                        spill.copy_to(group, txt)
+                        txt.write('\n')
+                return True
+            except Exception:
+                return False
     
     def convert_txt_to_m3u(self, txt_file_path, m3u_file_path):
         """将TXT格式转换为M3U格式"""
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+文件读写与编码检测
+功能：只读取一次文件即可确定编码并完成解码
+- 先检查BOM（UTF-8、UTF-16、UTF-32），没有BOM时取开头一段字节依次试解码候选编码
+- 用选定的编码一次解码整个缓冲区；只有解码出错时才逐行回退到其他候选编码，
+  不再为每个候选编码重新打开、完整读取一遍文件
+- 较大的文件用mmap映射后直接解码，不额外复制一份字节
+"""
+
+import os
+import json
+import mmap
+import codecs
+
+# 候选编码（按优先级排序）
+DEFAULT_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'latin1', 'iso-8859-1')
+
+# 编码检测时采样的字节数
+SAMPLE_SIZE = 64 * 1024
+
+# 达到该大小的文件使用mmap读取
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# 解码出错后按块重试的块大小（块内仍有错误时才逐行回退）
+FALLBACK_BLOCK_SIZE = 1024 * 1024
+
+# BOM -> 编码（UTF-32的BOM以UTF-16的BOM开头，需要先检查）
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(data, encodings=DEFAULT_ENCODINGS, sample_size=SAMPLE_SIZE):
+    """根据BOM和开头的字节判断编码
+
+    参数:
+        data: bytes、bytearray、memoryview或mmap
+        encodings: 候选编码
+
+    返回:
+        str: 编码名称
+    """
+    head = bytes(data[:4])
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    sample = bytes(data[:sample_size])
+    for encoding in encodings:
+        try:
+            # 增量解码器允许样本末尾是不完整的多字节字符
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return encodings[-1] if encodings else 'utf-8'
+
+
+def _decode_line(line, encoding, encodings):
+    """解码单行：依次尝试选定的编码和其他候选编码，都失败时替换无法解码的字节"""
+    try:
+        return line.decode(encoding)
+    except UnicodeDecodeError:
+        pass
+    for candidate in encodings:
+        if candidate == encoding:
+            continue
+        try:
+            return line.decode(candidate)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return line.decode(encoding, errors='replace')
+
+
+def decode_bytes(data, encoding, encodings=DEFAULT_ENCODINGS):
+    """用选定的编码一次解码整个缓冲区，出错时逐行回退
+
+    出错位置所在行之前的部分仍然一次解码；之后按FALLBACK_BLOCK_SIZE切成以换行符结尾的块，
+    整块能用选定的编码解码时直接解码，否则只对该块逐行回退
+
+    参数:
+        data: bytes、bytearray、memoryview或mmap
+        encoding: detect_encoding选出的编码
+        encodings: 逐行回退时依次尝试的候选编码
+    """
+    try:
+        return str(memoryview(data), encoding)
+    except UnicodeDecodeError as e:
+        error_pos = e.start
+
+    # UTF-16/32的\n不是单字节，无法按行切分，直接替换无法解码的字节
+    if encoding.startswith(('utf-16', 'utf-32')):
+        return str(memoryview(data), encoding, errors='replace')
+
+    start = data.rfind(b'\n', 0, error_pos) + 1
+    parts = [str(memoryview(data)[:start], encoding)]
+    length = len(data)
+    while start < length:
+        end = data.find(b'\n', min(start + FALLBACK_BLOCK_SIZE, length))
+        end = length if end == -1 else end + 1
+        block = bytes(data[start:end])
+        try:
+            parts.append(block.decode(encoding))
+        except UnicodeDecodeError:
+            parts.append('\n'.join(_decode_line(line, encoding, encodings) for line in block.split(b'\n')))
+        start = end
+    text = ''.join(parts)
+    if encoding == 'utf-8-sig' and text.startswith('\ufeff'):
+        text = text[1:]
+    return text
+
+
+def read_file_with_encoding(file_path, encodings=DEFAULT_ENCODINGS):
+    """读取文本文件并自动识别编码（文件只读取一次）
+
+    返回:
+        tuple: (内容, 编码)，读取失败时为 (None, None)
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return '', encodings[0] if encodings else 'utf-8'
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    encoding = detect_encoding(data, encodings)
+                    return decode_bytes(data, encoding, encodings), encoding
+            data = f.read()
+    except (IOError, OSError, ValueError):
+        return None, None
+
+    encoding = detect_encoding(data, encodings)
+    return decode_bytes(data, encoding, encodings), encoding
+
+
+def detect_file_encoding(file_path, encodings=DEFAULT_ENCODINGS, sample_size=SAMPLE_SIZE):
+    """只读取文件开头的字节判断编码，读取失败时返回None"""
+    try:
+        with open(file_path, 'rb') as f:
+            return detect_encoding(f.read(sample_size), encodings, sample_size)
+    except (IOError, OSError):
+        return None
+
+
+def read_text_sample(file_path, size=4096, encodings=DEFAULT_ENCODINGS):
+    """读取文件开头的一段文本（用于判断文件类型），读取失败时返回None"""
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read(size)
+    except (IOError, OSError):
+        return None
+    encoding = detect_encoding(data, encodings)
+    return codecs.getincrementaldecoder(encoding)(errors='replace').decode(data, final=False)
+
+
+def iter_lines_with_encoding(file_path, encoding, encodings=DEFAULT_ENCODINGS):
+    """以二进制方式逐行读取文件并解码，解码出错的行逐行回退到其他候选编码"""
+    with open(file_path, 'rb') as f:
+        first = True
+        for line in f:
+            text = _decode_line(line, encoding, encodings)
+            if first:
+                first = False
+                if encoding == 'utf-8-sig' and text.startswith('\ufeff'):
+                    text = text[1:]
+            yield text
+
+
+def read_json_with_encoding(file_path, encodings=DEFAULT_ENCODINGS):
+    """读取JSON文件并自动识别编码，读取失败时抛出异常"""
+    content, _ = read_file_with_encoding(file_path, encodings)
+    if content is None:
+        raise IOError(f"无法读取文件: {file_path}")
+    return json.loads(content)
+
+
+def write_file_with_encoding(file_path, content, encoding='utf-8'):
+    """写入文本文件（自动创建所在目录）"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', encoding=encoding) as f:
+        f.write(content)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+大文件并行分块解析
+功能：用mmap打开本地直播源文件，在安全的记录边界处切分成若干块（M3U在#EXTINF行首，TXT在行首），
+用进程池并行解析各块，再按原始顺序合并结果
+- 块起点之前最后出现的分类（TXT的",#genre#"分类行、M3U的group-title）作为该块的初始分类传给解析函数，
+  依赖“当前分类”的解析器跨块边界时结果与串行解析一致
+- 解析函数签名为 parse_func(lines, file_format, carry_category)，返回可序列化的结果列表；
+  需为模块级函数，以便在子进程中按引用加载
+- 调用方通常是带有后台线程的多线程进程（下载线程、缓存延迟写入线程），进程池不使用fork启动方式，
+  默认使用forkserver（不支持时使用spawn）
+"""
+
+import io
+import os
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+FORMAT_M3U = 'm3u'
+FORMAT_TXT = 'txt'
+
+# TXT分类行标记
+GENRE_MARKER = b',#genre#'
+
+# M3U记录起点
+EXTINF_MARKER = b'\n#EXTINF'
+
+# M3U分组属性
+GROUP_TITLE_MARKER = b'group-title="'
+
+# 每个进程分配的块数（块多一些可以减少单个慢块拖慢整体的情况）
+CHUNKS_PER_WORKER = 4
+
+# 单块最小字节数，文件较小时减少块数
+MIN_CHUNK_SIZE = 1024 * 1024
+
+
+def detect_format(data):
+    """根据第一个非空行判断文件格式（与IPTV.iter_channels的判断方式一致）"""
+    pos = 0
+    length = len(data)
+    while pos < length:
+        end = data.find(b'\n', pos)
+        if end == -1:
+            end = length
+        line = data[pos:end].strip().lstrip(b'\xef\xbb\xbf')
+        if line:
+            return FORMAT_M3U if line.startswith(b'#EXTM3U') else FORMAT_TXT
+        pos = end + 1
+    return FORMAT_TXT
+
+
+def find_chunk_bounds(data, file_format, chunk_count):
+    """计算各块的 (起点, 终点)，起点都落在记录边界上"""
+    length = len(data)
+    chunk_count = max(1, min(chunk_count, length // MIN_CHUNK_SIZE))
+    bounds = []
+    start = 0
+    for i in range(1, chunk_count):
+        target = max(length * i // chunk_count, start)
+        if file_format == FORMAT_M3U:
+            pos = data.find(EXTINF_MARKER, target)
+        else:
+            pos = data.find(b'\n', target)
+        if pos == -1:
+            break
+        boundary = pos + 1
+        if boundary > start:
+            bounds.append((start, boundary))
+            start = boundary
+    bounds.append((start, length))
+    return bounds
+
+
+def find_carry_category(data, start, file_format, encoding='utf-8'):
+    """查找块起点之前最后出现的分类，没有时返回None"""
+    if start == 0:
+        return None
+    if file_format == FORMAT_M3U:
+        pos = data.rfind(GROUP_TITLE_MARKER, 0, start)
+        if pos == -1:
+            return None
+        value_start = pos + len(GROUP_TITLE_MARKER)
+        value_end = data.find(b'"', value_start, start)
+        if value_end == -1:
+            return None
+        return data[value_start:value_end].decode(encoding, errors='replace').strip()
+
+    pos = data.rfind(GENRE_MARKER, 0, start)
+    while pos != -1:
+        line_end = data.find(b'\n', pos, start)
+        line_end = start if line_end == -1 else line_end
+        # 只有标记位于行尾时才是分类行
+        if not data[pos + len(GENRE_MARKER):line_end].strip():
+            line_start = data.rfind(b'\n', 0, pos) + 1
+            return data[line_start:pos].decode(encoding, errors='replace').strip()
+        pos = data.rfind(GENRE_MARKER, 0, pos)
+    return None
+
+
+def default_mp_context():
+    """进程池的启动方式：forkserver（不支持时为spawn），多线程进程中fork子进程可能死锁"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _parse_chunk(file_path, start, end, file_format, carry_category, parse_func, encoding):
+    """子进程：映射文件并解析 [start, end) 范围内的行"""
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode(encoding)
+    # 与逐行读取文件时一致，按通用换行符（\n、\r\n、\r）分行
+    return parse_func(io.StringIO(text, newline=None), file_format, carry_category)
+
+
+def parse_file_parallel(file_path, parse_func, workers, encoding='utf-8', mp_context=None):
+    """并行分块解析文件，按原始顺序返回所有块的结果
+
+    参数:
+        file_path: 本地文件路径
+        parse_func: 模块级解析函数 parse_func(lines, file_format, carry_category) -> list
+        workers: 进程数
+        encoding: 文件编码（块在换行符处切分，适用于UTF-8、GBK等换行符为单字节的编码）
+        mp_context: 进程池的multiprocessing上下文，默认为default_mp_context()
+
+    返回:
+        list: 各块结果按顺序拼接
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            file_format = detect_format(data)
+            bounds = find_chunk_bounds(data, file_format, workers * CHUNKS_PER_WORKER)
+            tasks = [(start, end, find_carry_category(data, start, file_format, encoding))
+                     for start, end in bounds]
+
+    if len(tasks) == 1 or workers <= 1:
+        results = []
+        for start, end, carry_category in tasks:
+            results.extend(_parse_chunk(file_path, start, end, file_format, carry_category, parse_func, encoding))
+        return results
+
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                             mp_context=mp_context or default_mp_context()) as executor:
+        futures = [executor.submit(_parse_chunk, file_path, start, end, file_format, carry_category,
+                                   parse_func, encoding)
+                   for start, end, carry_category in tasks]
+        # 按提交顺序取结果，保证合并后的顺序与文件中一致
+        for future in futures:
+            results.extend(future.result())
+    return results
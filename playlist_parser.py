@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+M3U播放列表解析
+功能：逐行扫描M3U内容（线性时间，不跨行回溯），供IPTV.py、convert_m3u_to_txt.py和验证器共用
+- #EXTINF行只解析一次：时长、属性字典（tvg-name、group-title、tvg-logo等，属性名统一为小写）和显示名，
+  引号内的逗号不会被当作显示名的分隔符；属性字典在第一次访问时才解析
+- #EXTVLCOPT、#KODIPROP行作为播放选项附加到所属条目，#EXTGRP行作为分组
+- 一个#EXTINF之后可以跟多行URL，均属于同一条目；不要求必须有tvg-name，也不限定http协议
+"""
+
+import re
+
+# 词法单元类型
+TOKEN_EXTINF = 'extinf'    # #EXTINF行，值为ExtInf
+TOKEN_OPTION = 'option'    # #EXTVLCOPT/#KODIPROP行，值为 (标签, 选项内容)
+TOKEN_GROUP = 'group'      # #EXTGRP行，值为分组名
+TOKEN_URL = 'url'          # 非注释的非空行（URL，或混在M3U中的TXT分类行等），值为去掉首尾空白的行
+
+# 作为播放选项处理的标签
+OPTION_TAGS = ('#EXTVLCOPT:', '#KODIPROP:')
+
+# #EXTINF属性：name="value"、name='value' 或 name=value
+EXTINF_ATTR_PATTERN = re.compile(r'([\w-]+)\s*=\s*("[^"]*"|\'[^\']*\'|[^\s"\']+)')
+
+# 引号（查找显示名分隔逗号时跳过引号内的内容）
+QUOTE_PATTERN = re.compile(r'["\']')
+
+
+class ExtInf:
+    """解析后的#EXTINF行
+
+    属性:
+        duration: 时长字符串（通常为"-1"）
+        attrs: 属性字典，属性名为小写（第一次访问时解析）
+        title: 逗号后的显示名
+    """
+
+    __slots__ = ('duration', 'title', '_attr_text', '_attrs')
+
+    def __init__(self, duration, attr_text, title):
+        self.duration = duration
+        self.title = title
+        self._attr_text = attr_text
+        self._attrs = None
+
+    @property
+    def attrs(self):
+        if self._attrs is None:
+            self._attrs = _parse_attrs(self._attr_text)
+        return self._attrs
+
+    @property
+    def name(self):
+        """频道名：优先使用显示名，没有显示名时使用tvg-name"""
+        return self.title or self.attrs.get('tvg-name', '')
+
+    def __repr__(self):
+        return f"ExtInf(duration={self.duration!r}, attrs={self.attrs!r}, title={self.title!r})"
+
+
+class M3UEntry:
+    """一个M3U条目：#EXTINF信息、播放选项、分组和一个或多个URL"""
+
+    __slots__ = ('info', 'options', 'group', 'urls')
+
+    def __init__(self, info, options=None):
+        self.info = info
+        self.options = options if options is not None else []
+        self.group = ''
+        self.urls = []
+
+    @property
+    def name(self):
+        return self.info.name
+
+    @property
+    def attrs(self):
+        return self.info.attrs
+
+    @property
+    def group_title(self):
+        """分组：优先使用group-title属性，其次为#EXTGRP"""
+        return self.info.attrs.get('group-title') or self.group
+
+    def __repr__(self):
+        return f"M3UEntry(name={self.name!r}, group={self.group_title!r}, urls={self.urls!r})"
+
+
+def _parse_attrs(attr_text):
+    """解析#EXTINF属性，同名属性保留第一个"""
+    attrs = {}
+    for key, value in EXTINF_ATTR_PATTERN.findall(attr_text):
+        key = key.lower()
+        if key not in attrs:
+            if value[0] in '"\'':
+                value = value[1:-1]
+            attrs[key] = value.strip()
+    return attrs
+
+
+def _find_title_comma(body):
+    """查找分隔属性和显示名的逗号（跳过引号内的逗号），没有时返回-1"""
+    comma = body.find(',')
+    # 常见情况：第一个逗号之前的双引号都已闭合且没有单引号，该逗号即为分隔符
+    if comma == -1 or (body.count('"', 0, comma) % 2 == 0 and body.find("'", 0, comma) == -1):
+        return comma
+
+    pos = 0
+    while True:
+        comma = body.find(',', pos)
+        if comma == -1:
+            return -1
+        quote = QUOTE_PATTERN.search(body, pos, comma)
+        if quote is None:
+            return comma
+        close = body.find(quote.group(), quote.end())
+        if close == -1:
+            # 引号未闭合，按第一个逗号分隔
+            return comma
+        pos = close + 1
+
+
+def parse_extinf(line):
+    """解析一行#EXTINF
+
+    参数:
+        line: 以#EXTINF:开头的行（已去掉首尾空白）
+
+    返回:
+        ExtInf
+    """
+    body = line[8:]
+    comma = _find_title_comma(body)
+    if comma == -1:
+        head, title = body, ''
+    else:
+        head, title = body[:comma], body[comma + 1:].strip()
+
+    head = head.strip()
+    duration, _, attr_text = head.partition(' ')
+    if '=' in duration:
+        # 没有时长，直接是属性
+        duration, attr_text = '', head
+    return ExtInf(duration, attr_text, title)
+
+
+def iter_m3u_tokens(lines):
+    """逐行切分M3U内容，产出 (类型, 值)
+
+    参数:
+        lines: 任意可迭代的字符串行
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] != '#':
+            yield TOKEN_URL, line
+        elif line.startswith('#EXTINF:'):
+            yield TOKEN_EXTINF, parse_extinf(line)
+        elif line.startswith(OPTION_TAGS):
+            tag, _, value = line.partition(':')
+            yield TOKEN_OPTION, (tag[1:], value.strip())
+        elif line.startswith('#EXTGRP:'):
+            yield TOKEN_GROUP, line[8:].strip()
+        # 其他注释行（#EXTM3U等）忽略
+
+
+def iter_m3u_entries(lines):
+    """逐个产出M3UEntry（只产出至少有一个URL的条目）
+
+    #EXTINF之前或条目URL之后出现的播放选项属于下一个条目；
+    没有#EXTINF的URL行会被忽略
+    """
+    entry = None
+    pending_options = []
+    for kind, value in iter_m3u_tokens(lines):
+        if kind == TOKEN_URL:
+            if entry is not None:
+                entry.urls.append(value)
+        elif kind == TOKEN_EXTINF:
+            if entry is not None and entry.urls:
+                yield entry
+            entry = M3UEntry(value, pending_options)
+            pending_options = []
+        elif kind == TOKEN_OPTION:
+            if entry is not None and not entry.urls:
+                entry.options.append(value)
+            else:
+                pending_options.append(value)
+        elif entry is not None:
+            entry.group = value
+    if entry is not None and entry.urls:
+        yield entry
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+线路清晰度批量评估
+功能：用一个融合的正则表达式一次扫描频道名/URL，同时提取4K标识、高清标识和各种分辨率写法
+（1080p、1920x1080、1920_1080、res=1080、resolution=1920x1080、width=1920&height=1080），
+得到每行的清晰度等级和解析出的宽高；批量接口可选使用NumPy按最低分辨率统一过滤
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# 可选依赖：NumPy（批量阈值过滤）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 清晰度等级
+TIER_UNKNOWN = 0   # 未识别
+TIER_HD = 1        # 带高清标识（高清、HD、蓝光、高码率等）
+TIER_FHD = 2       # 1080P及以上
+TIER_4K = 3        # 4K及以上
+
+TIER_NAMES = {TIER_UNKNOWN: "未知", TIER_HD: "高清", TIER_FHD: "全高清", TIER_4K: "4K"}
+
+# 作为高清标识的垂直分辨率（与原HD_PATTERNS中的1080p/1440p/2160p一致）
+HD_MARKER_HEIGHTS = frozenset((1080, 1440, 2160))
+
+# 视为4K标识的完整分辨率
+K4_MARKER_RESOLUTIONS = frozenset(((3840, 2160), (7680, 4320)))
+
+# 融合的清晰度标记正则：整个表达式放在零宽前瞻中，finditer在每个位置都尝试匹配，
+# 因此相互重叠的标记（如"1920x1080p"中的"1920x1080"和"1080p"）都能被识别；
+# 同一位置按分支顺序只取第一个匹配的分支（各分辨率写法由数字后的分隔符区分，不会在同一位置冲突）
+QUALITY_TOKEN_PATTERN = re.compile(r'''(?=[\dxrwhuqfb48高超蓝])(?=(?:
+    (?<!\d)(?P<xw>\d+)x(?P<xh>\d+)                             # 1920x1080
+  | (?<!\d)(?P<uw>\d+)_(?P<uh>\d+)                             # 1920_1080
+  | (?P<v>\d{3,4})[pdi]                                        # 1080p, 2160i
+  | res=(?P<res>[1-9]\d+)                                      # res=1080
+  | resolution=(?P<rw>[1-9]\d+)(?:x(?P<rh>[1-9]\d+))?          # resolution=1920x1080, resolution=1080
+  | width=(?P<ww>[1-9]\d+).*?height=(?P<wh>[1-9]\d+)           # width=1920&height=1080
+  | (?P<k4>[48]k|uhd|超高清)                                    # 4K标识
+  | (?P<fhd>fhd|qhd)                                          # 1080P/2K标识
+  | (?P<hd>高清|超清|hd|high.?def|蓝光|blue.?ray|quality=high|[89]m|(?<!\d)[1-9]\d+m)  # 高清/高码率标识
+))''', re.IGNORECASE | re.VERBOSE)
+
+# 正则分组名 -> 分辨率写法（每种写法只取第一次出现的值，与逐个正则search的结果一致）
+RESOLUTION_KINDS = {'xh': 'x', 'uh': 'underscore', 'v': 'vertical', 'res': 'res',
+                    'rw': 'resolution', 'rh': 'resolution', 'wh': 'width'}
+
+# 用于判断4K的分辨率写法
+K4_RESOLUTION_KINDS = frozenset(('x', 'vertical'))
+
+# 每行最多的分辨率候选数（每种写法一个）
+MAX_RESOLUTIONS = len(set(RESOLUTION_KINDS.values()))
+
+# 单行评估结果
+#   tier: 清晰度等级
+#   width/height: 各分辨率候选中高度最大的一个（只有垂直分辨率时width为0）
+#   resolutions: 分辨率候选 ((宽, 高), ...)，每种写法取第一次出现的值，宽为0表示只有垂直分辨率
+#   k4_marker: 是否带4K标识（4K、8K、UHD、超高清、2160p、3840x2160等）
+#   hd_marker: 是否带高清标识（高清、HD、蓝光、高码率、1080p/1440p/2160p、4位数的resolution参数等）
+QualityInfo = namedtuple('QualityInfo', ['tier', 'width', 'height', 'resolutions', 'k4_marker', 'hd_marker'])
+
+EMPTY_QUALITY = QualityInfo(TIER_UNKNOWN, 0, 0, (), False, False)
+
+# 单条文本评估结果的缓存条目数（同一频道名、同一URL会反复出现）
+CACHE_SIZE = 65536
+
+
+def _candidate_meets(width, height, min_width, min_height, require_both):
+    """单个分辨率候选是否满足最低分辨率：只有垂直分辨率时只比较高度"""
+    if not width:
+        return height >= min_height
+    if require_both:
+        return width >= min_width and height >= min_height
+    return width >= min_width or height >= min_height
+
+
+def _scan(text):
+    """扫描文本中的所有清晰度标记
+
+    返回:
+        tuple: (分辨率候选字典 {写法: (宽, 高)}, 4K标识, 1080P标识, 高清标识)
+    """
+    resolutions = {}
+    k4_marker = fhd_marker = hd_marker = False
+    for match in QUALITY_TOKEN_PATTERN.finditer(text):
+        group = match.lastgroup
+        kind = RESOLUTION_KINDS.get(group)
+        if kind is None:
+            if group == 'k4':
+                k4_marker = True
+            elif group == 'fhd':
+                fhd_marker = hd_marker = True
+            else:
+                hd_marker = True
+            continue
+
+        if group == 'xh':
+            resolution = (int(match.group('xw')), int(match.group('xh')))
+            if resolution in K4_MARKER_RESOLUTIONS:
+                k4_marker = True
+        elif group == 'uh':
+            resolution = (int(match.group('uw')), int(match.group('uh')))
+        elif group == 'v':
+            resolution = (0, int(match.group('v')))
+            if resolution[1] in HD_MARKER_HEIGHTS:
+                fhd_marker = hd_marker = True
+                if resolution[1] == 2160:
+                    k4_marker = True
+        elif group == 'res':
+            resolution = (0, int(match.group('res')))
+        elif kind == 'resolution':
+            if match.group('rh'):
+                resolution = (int(match.group('rw')), int(match.group('rh')))
+            else:
+                resolution = (0, int(match.group('rw')))
+            if len(match.group('rw')) >= 4:
+                hd_marker = True
+        else:
+            resolution = (int(match.group('ww')), int(match.group('wh')))
+        resolutions.setdefault(kind, resolution)
+    return resolutions, k4_marker, fhd_marker, hd_marker
+
+
+def _meets_4k(resolutions, k4_marker, require_both):
+    """带4K标识，或宽x高/垂直分辨率达到3840x2160（下划线、URL参数中的长数字多为时间戳或ID，不参与判断）"""
+    return k4_marker or any(_candidate_meets(w, h, 3840, 2160, require_both)
+                            for kind, (w, h) in resolutions.items() if kind in K4_RESOLUTION_KINDS)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def score_text(text):
+    """评估单条文本（频道名、URL或两者拼接）的清晰度
+
+    返回:
+        QualityInfo
+    """
+    if not text:
+        return EMPTY_QUALITY
+    resolutions, k4_marker, fhd_marker, hd_marker = _scan(text)
+    candidates = tuple(resolutions.values())
+    width, height = max(candidates, key=lambda item: (item[1], item[0]), default=(0, 0))
+
+    if _meets_4k(resolutions, k4_marker, True):
+        tier = TIER_4K
+    elif fhd_marker or any(_candidate_meets(w, h, 1920, 1080, True) for w, h in candidates):
+        tier = TIER_FHD
+    elif hd_marker:
+        tier = TIER_HD
+    else:
+        tier = TIER_UNKNOWN
+    return QualityInfo(tier, width, height, candidates, k4_marker, hd_marker)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def is_4k_text(text, require_both=True):
+    """文本是否为4K：带4K标识，或宽x高/垂直分辨率达到3840x2160
+
+    参数:
+        require_both: True时宽高都要满足（与score_text的TIER_4K一致），False时宽或高满足其一即可
+            （如3840x1600、4096x1716等宽银幕分辨率）
+    """
+    if not text:
+        return False
+    resolutions, k4_marker, _, _ = _scan(text)
+    return _meets_4k(resolutions, k4_marker, require_both)
+
+
+def meets_resolution(info, min_resolution, require_both=True):
+    """判断评估结果中是否有满足最低分辨率的分辨率候选
+
+    参数:
+        info: QualityInfo
+        min_resolution: (最低宽度, 最低高度)
+        require_both: True时宽高都要满足（只有垂直分辨率时只比较高度），False时满足其一即可
+    """
+    min_width, min_height = min_resolution
+    return any(_candidate_meets(w, h, min_width, min_height, require_both) for w, h in info.resolutions)
+
+
+class QualityBatch:
+    """批量评估结果（按输入顺序），安装了NumPy时各列为ndarray，否则为list
+
+    属性:
+        tiers/widths/heights: 每行的清晰度等级和最大分辨率
+        infos: 每行的QualityInfo
+    """
+
+    def __init__(self, infos):
+        self.infos = infos
+        tiers = [info.tier for info in infos]
+        widths = [info.width for info in infos]
+        heights = [info.height for info in infos]
+        if NUMPY_AVAILABLE:
+            self.tiers = np.array(tiers, dtype=np.int8)
+            self.widths = np.array(widths, dtype=np.int64)
+            self.heights = np.array(heights, dtype=np.int64)
+            # 分辨率候选矩阵（行 x 写法），不足的位置补0
+            self._candidate_widths = np.zeros((len(infos), MAX_RESOLUTIONS), dtype=np.int64)
+            self._candidate_heights = np.zeros((len(infos), MAX_RESOLUTIONS), dtype=np.int64)
+            for row, info in enumerate(infos):
+                for column, (w, h) in enumerate(info.resolutions):
+                    self._candidate_widths[row, column] = w
+                    self._candidate_heights[row, column] = h
+        else:
+            self.tiers, self.widths, self.heights = tiers, widths, heights
+
+    def __len__(self):
+        return len(self.infos)
+
+    def meets_resolution(self, min_resolution, require_both=True):
+        """逐行判断是否满足最低分辨率，返回布尔数组/列表（规则同meets_resolution函数）"""
+        if not NUMPY_AVAILABLE:
+            return [meets_resolution(info, min_resolution, require_both) for info in self.infos]
+        min_width, min_height = min_resolution
+        widths, heights = self._candidate_widths, self._candidate_heights
+        height_ok = heights >= min_height
+        width_ok = widths >= min_width
+        pair_ok = (width_ok & height_ok) if require_both else (width_ok | height_ok)
+        # 补0的位置宽高都为0，只有min_height<=0时才会被误判为满足，这里一并排除
+        present = (widths > 0) | (heights > 0)
+        return (present & np.where(widths > 0, pair_ok, height_ok)).any(axis=1)
+
+    def at_least(self, tier):
+        """逐行判断清晰度等级是否不低于tier"""
+        if NUMPY_AVAILABLE:
+            return self.tiers >= tier
+        return [value >= tier for value in self.tiers]
+
+
+def score_batch(rows):
+    """批量评估 (频道名, URL) 的清晰度
+
+    每行的频道名和URL拼接后用融合正则扫描一次
+
+    参数:
+        rows: 可迭代的 (频道名, URL)
+
+    返回:
+        QualityBatch
+    """
+    return QualityBatch([score_text(f"{name} {url}") for name, url in rows])
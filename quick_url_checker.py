@@ -5,11 +5,15 @@
 """
 
 import re
+import math
 import time
 import requests
 import socket
+import ipaddress
+import threading
+from collections import OrderedDict, deque
 from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,7 +23,8 @@ URL_REGEX = re.compile(
     r'^https?://'  # http:// or https://
     r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
     r'localhost|'  # localhost...
-    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}|'  # ...or ip
+    r'\[[0-9A-F:.]+\])'  # ...or ipv6
     r'(?::\d+)?'  # optional port
     r'(?:/?|[/?]\S+)$', re.IGNORECASE)
 
@@ -52,6 +57,25 @@ TRUSTED_DOMAINS = [
 # HTTP状态码白名单（认为是有效的）
 VALID_STATUS_CODES = {200, 201, 202, 203, 204, 206, 301, 302, 303, 304, 307, 308}
 
+# 表示服务器限流/过载的状态码，触发按主机退避并重新排队
+THROTTLE_STATUS_CODES = {429, 503}
+
+# 按主机调度的默认参数
+DEFAULT_PER_HOST_LIMIT = 4      # 每个主机的最大并发数
+DEFAULT_HOST_RATE = 8.0         # 每个主机每秒最多发起的请求数（令牌桶速率），0表示不限速
+DEFAULT_BACKOFF_BASE = 1.0      # 遇到429/503后的初始退避时间（秒）
+DEFAULT_BACKOFF_MAX = 30.0      # 最长退避时间（秒）
+DEFAULT_THROTTLE_RETRIES = 2    # 同一URL因限流重新排队的最大次数
+
+# 检测后端：threads使用requests线程池，asyncio使用async_prober的事件循环探测
+DEFAULT_BACKEND = 'threads'
+DEFAULT_ASYNC_MAX_IN_FLIGHT = 500
+
+# DNS缓存的默认参数
+DEFAULT_DNS_TTL = 300           # 解析成功结果的缓存时间（秒）
+DEFAULT_DNS_NEGATIVE_TTL = 60   # 解析失败结果的缓存时间（秒）
+DEFAULT_DNS_WORKERS = 16        # 批量预解析的并发数
+
 # 危险的URL模式（跳过检测）
 DANGEROUS_PATTERNS = [
     r'<script', r'javascript:', r'vbscript:',  # XSS
@@ -59,13 +83,135 @@ DANGEROUS_PATTERNS = [
     r'\${.*}', r'\(.*\)',  # 模板变量
 ]
 
+class DNSCache:
+    """线程安全的DNS解析缓存
+    
+    使用getaddrinfo(AF_UNSPEC)同时解析A和AAAA记录；成功结果按TTL缓存，失败结果按较短的TTL做负缓存。
+    多个线程同时解析同一个主机名时只发起一次真正的查询，其余线程等待该结果。
+    """
+    
+    def __init__(self, ttl=DEFAULT_DNS_TTL, negative_ttl=DEFAULT_DNS_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = {}      # host -> (过期时间, 地址元组，失败时为空元组)
+        self._inflight = {}   # host -> threading.Event
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0}
+    
+    @staticmethod
+    def _is_ip_literal(host):
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+    
+    def _lookup(self, host):
+        """执行真正的DNS查询，返回地址元组（失败时为空元组）"""
+        try:
+            infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        except (socket.gaierror, socket.herror, UnicodeError, OSError):
+            return ()
+        addresses = []
+        for info in infos:
+            address = info[4][0]
+            if address not in addresses:
+                addresses.append(address)
+        return tuple(addresses)
+    
+    def resolve(self, host):
+        """解析主机名
+        
+        返回:
+            tuple: 解析到的IPv4/IPv6地址，解析失败时为空元组
+        """
+        if not host:
+            return ()
+        host = host.lower()
+        if self._is_ip_literal(host):
+            return (host,)
+        
+        while True:
+            with self._lock:
+                entry = self._cache.get(host)
+                if entry is not None and entry[0] > time.monotonic():
+                    if entry[1]:
+                        self.stats['hits'] += 1
+                    else:
+                        self.stats['negative_hits'] += 1
+                    return entry[1]
+                event = self._inflight.get(host)
+                if event is None:
+                    # 由当前线程负责查询
+                    event = threading.Event()
+                    self._inflight[host] = event
+                    self.stats['misses'] += 1
+                    break
+            # 其他线程正在查询同一主机名，等待其结果后重新读取缓存
+            event.wait()
+        
+        try:
+            addresses = self._lookup(host)
+        finally:
+            with self._lock:
+                ttl = self.ttl if addresses else self.negative_ttl
+                self._cache[host] = (time.monotonic() + ttl, addresses)
+                self._inflight.pop(host).set()
+        return addresses
+    
+    def prefetch(self, hosts, max_workers=DEFAULT_DNS_WORKERS):
+        """并发预解析一批主机名（每个主机名只解析一次）
+        
+        返回:
+            int: 解析失败的主机名数量
+        """
+        unique_hosts = {host.lower() for host in hosts if host and not self._is_ip_literal(host)}
+        if not unique_hosts:
+            return 0
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_hosts))) as executor:
+            results = list(executor.map(self.resolve, unique_hosts))
+        failed = sum(1 for addresses in results if not addresses)
+        logger.info(f"DNS预解析完成: {len(unique_hosts)} 个主机名，{failed} 个解析失败，耗时: {time.time() - start_time:.2f}秒")
+        return failed
+
+class _HostState:
+    """单个主机的调度状态：待检测队列、并发数、令牌桶和退避时间"""
+    
+    __slots__ = ('queue', 'active', 'tokens', 'last_refill', 'backoff_until', 'throttle_count')
+    
+    def __init__(self, capacity):
+        self.queue = deque()
+        self.active = 0
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.backoff_until = 0.0
+        self.throttle_count = 0
+
 class QuickURLChecker:
     """轻量级URL快速检测器"""
     
-    def __init__(self, timeout=2, max_workers=32, enable_dns_check=True):
+    def __init__(self, timeout=2, max_workers=32, enable_dns_check=True,
+                 per_host_limit=DEFAULT_PER_HOST_LIMIT, host_rate=DEFAULT_HOST_RATE,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 throttle_retries=DEFAULT_THROTTLE_RETRIES, dns_cache=None,
+                 backend=DEFAULT_BACKEND, async_max_in_flight=DEFAULT_ASYNC_MAX_IN_FLIGHT):
         self.timeout = timeout
         self.max_workers = max_workers
         self.enable_dns_check = enable_dns_check
+        # DNS缓存（可在多个检测器之间共享）
+        self.dns_cache = dns_cache or DNSCache()
+        
+        # 检测后端
+        self.backend = backend
+        self.async_max_in_flight = async_max_in_flight
+        
+        # 按主机调度：单个主机的并发上限、令牌桶速率，以及遇到429/503时的自适应退避
+        self.per_host_limit = max(1, per_host_limit)
+        self.host_rate = host_rate
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.throttle_retries = throttle_retries
         
         # 创建优化的Session
         self.session = requests.Session()
@@ -127,17 +273,20 @@ class QuickURLChecker:
             if pattern.search(url):
                 return False, f"包含风险模式: {pattern.pattern}"
         
-        # DNS预检查（可选）
+        # DNS预检查（可选，使用缓存，支持IPv4和IPv6）
         if self.enable_dns_check:
-            try:
-                socket.gethostbyname(parsed.hostname)
-            except (socket.gaierror, socket.herror):
+            if not self.dns_cache.resolve(parsed.hostname):
                 return False, "DNS解析失败"
         
         return True, "预筛选通过"
     
     def check_http_url(self, url):
         """检测HTTP/HTTPS URL"""
+        is_valid, reason, _ = self._check_http_url_status(url)
+        return is_valid, reason
+    
+    def _check_http_url_status(self, url):
+        """检测HTTP/HTTPS URL，同时返回状态码（请求失败时为None）"""
         try:
             # 尝试HEAD请求
             response = self.session.head(
@@ -148,7 +297,7 @@ class QuickURLChecker:
             
             # 检查状态码
             if response.status_code in VALID_STATUS_CODES:
-                return True, f"HTTP {response.status_code}"
+                return True, f"HTTP {response.status_code}", response.status_code
             
             # 如果HEAD失败，尝试GET请求（限制响应大小）
             if response.status_code in (405, 501):  # 方法不允许
@@ -160,20 +309,20 @@ class QuickURLChecker:
                 )
                 
                 if response.status_code in VALID_STATUS_CODES:
-                    return True, f"HTTP GET {response.status_code}"
+                    return True, f"HTTP GET {response.status_code}", response.status_code
             
-            return False, f"HTTP状态码: {response.status_code}"
+            return False, f"HTTP状态码: {response.status_code}", response.status_code
             
         except requests.exceptions.Timeout:
-            return False, "连接超时"
+            return False, "连接超时", None
         except requests.exceptions.ConnectionError:
-            return False, "连接错误"
+            return False, "连接错误", None
         except requests.exceptions.TooManyRedirects:
-            return False, "重定向过多"
+            return False, "重定向过多", None
         except requests.exceptions.RequestException as e:
-            return False, f"请求错误: {str(e)[:50]}"
+            return False, f"请求错误: {str(e)[:50]}", None
         except Exception as e:
-            return False, f"未知错误: {str(e)[:30]}"
+            return False, f"未知错误: {str(e)[:30]}", None
     
     def is_trusted_domain(self, url):
         """检查是否为可信域名"""
@@ -217,12 +366,13 @@ class QuickURLChecker:
         
         # 标准HTTP检测
         if url.startswith(('http://', 'https://')):
-            is_valid, reason = self.check_http_url(url)
+            is_valid, reason, status_code = self._check_http_url_status(url)
             return {
                 'url': url,
                 'valid': is_valid,
                 'reason': reason,
-                'method': 'http_check'
+                'method': 'http_check',
+                'status_code': status_code
             }
         else:
             # 非HTTP协议直接返回有效（无法通过HTTP检测）
@@ -233,53 +383,239 @@ class QuickURLChecker:
                 'method': 'protocol_skip'
             }
     
-    def batch_check(self, urls, show_progress=True):
-        """批量检测URL"""
-        results = []
+    def _check_url_safe(self, url):
+        """检测单个URL，异常时返回错误结果而不是抛出"""
+        try:
+            return self.check_url(url)
+        except Exception as e:
+            return {
+                'url': url,
+                'valid': False,
+                'reason': f"检测异常: {str(e)[:30]}",
+                'method': 'error'
+            }
+    
+    def _host_key(self, url):
+        """获取URL的主机标识，用于按主机调度"""
+        try:
+            return (urlparse(url.strip()).hostname or '').lower()
+        except (ValueError, AttributeError):
+            return ''
+    
+    def _host_ready_in(self, state, now):
+        """计算主机还需等待多久才能发起下一个请求
+        
+        返回:
+            float: 0表示可以立即发起；math.inf表示需要等待该主机的任务完成
+        """
+        if state.active >= self.per_host_limit:
+            return math.inf
+        if now < state.backoff_until:
+            return state.backoff_until - now
+        if self.host_rate > 0:
+            # 令牌桶：按速率补充令牌，容量等于单主机并发上限
+            state.tokens = min(self.per_host_limit, state.tokens + (now - state.last_refill) * self.host_rate)
+            state.last_refill = now
+            if state.tokens < 1:
+                return (1 - state.tokens) / self.host_rate
+        return 0.0
+    
+    def _on_throttled(self, state):
+        """主机返回429/503时按指数退避暂停该主机"""
+        state.throttle_count += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (state.throttle_count - 1)))
+        state.backoff_until = time.monotonic() + delay
+        return delay
+    
+    def iter_check(self, urls, show_progress=True):
+        """流式批量检测URL
+        
+        每完成一个检测就产出一次，调用方无需等待整批完成即可开始处理结果。
+        请求按主机调度：同一主机受并发上限和令牌桶速率限制，返回429/503时该主机指数退避，
+        对应URL重新排队，其他主机的请求继续占满全局线程池。
+        
+        返回:
+            生成器，产出 (输入索引, 结果字典)，顺序为完成顺序
+        """
+        urls = list(urls)
         total = len(urls)
+        if total == 0:
+            return
+        
+        if self.backend == 'asyncio':
+            yield from self._iter_check_async(urls, show_progress)
+            return
         
         logger.info(f"开始批量检测 {total} 个URL...")
         start_time = time.time()
+        valid_count = 0
+        completed = 0
+        
+        # 按主机分组排队
+        hosts = OrderedDict()
+        for index, url in enumerate(urls):
+            host = self._host_key(url) if isinstance(url, str) else ''
+            if host not in hosts:
+                hosts[host] = _HostState(self.per_host_limit)
+            hosts[host].queue.append(index)
+        logger.info(f"共 {len(hosts)} 个主机，每主机并发上限 {self.per_host_limit}")
+        
+        # 检测开始前并发预解析所有主机名，后续quick_filter直接命中DNS缓存
+        if self.enable_dns_check:
+            self.dns_cache.prefetch(hosts.keys())
+        
+        throttle_attempts = {}
+        pending = {}  # future -> (输入索引, 主机)
         
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            future_to_url = {
-                executor.submit(self.check_url, url): url 
-                for url in urls
-            }
-            
-            # 处理结果
-            for i, future in enumerate(as_completed(future_to_url), 1):
-                try:
+            while completed < total:
+                # 分发：轮询各主机，在全局线程池未满时提交所有就绪的请求
+                now = time.monotonic()
+                next_wake = None
+                for host in list(hosts):
+                    if len(pending) >= self.max_workers:
+                        break
+                    state = hosts[host]
+                    dispatched = False
+                    while state.queue and len(pending) < self.max_workers:
+                        wait_time = self._host_ready_in(state, now)
+                        if wait_time > 0:
+                            if wait_time != math.inf:
+                                next_wake = wait_time if next_wake is None else min(next_wake, wait_time)
+                            break
+                        index = state.queue.popleft()
+                        state.active += 1
+                        if self.host_rate > 0:
+                            state.tokens -= 1
+                        future = executor.submit(self._check_url_safe, urls[index])
+                        pending[future] = (index, host)
+                        dispatched = True
+                    if not state.queue and state.active == 0:
+                        del hosts[host]
+                    elif dispatched:
+                        # 已分发的主机移到队尾，保证各主机轮流获得线程
+                        hosts.move_to_end(host)
+                
+                if not pending:
+                    # 所有主机都在退避或等待令牌
+                    time.sleep(next_wake if next_wake is not None else 0.01)
+                    continue
+                
+                done, _ = wait(pending, timeout=next_wake, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, host = pending.pop(future)
+                    state = hosts[host]
+                    state.active -= 1
                     result = future.result()
-                    results.append(result)
                     
-                    if show_progress and i % 100 == 0:
+                    # 被限流：主机退避，URL重新排队，不计为无效
+                    if result.get('status_code') in THROTTLE_STATUS_CODES:
+                        attempts = throttle_attempts.get(index, 0)
+                        if attempts < self.throttle_retries:
+                            throttle_attempts[index] = attempts + 1
+                            delay = self._on_throttled(state)
+                            state.queue.appendleft(index)
+                            logger.debug(f"主机 {host} 返回 {result['status_code']}，退避 {delay:.1f} 秒后重试")
+                            continue
+                    elif result['valid']:
+                        state.throttle_count = 0
+                    
+                    if not state.queue and state.active == 0:
+                        del hosts[host]
+                    
+                    completed += 1
+                    if result['valid']:
+                        valid_count += 1
+                    
+                    if show_progress and completed % 100 == 0:
                         elapsed = time.time() - start_time
-                        rate = i / elapsed if elapsed > 0 else 0
-                        logger.info(f"进度: {i}/{total} ({i/total*100:.1f}%) - 速率: {rate:.1f} URL/s")
-                        
-                except Exception as e:
-                    url = future_to_url[future]
-                    results.append({
-                        'url': url,
-                        'valid': False,
-                        'reason': f"检测异常: {str(e)[:30]}",
-                        'method': 'error'
-                    })
+                        rate = completed / elapsed if elapsed > 0 else 0
+                        logger.info(f"进度: {completed}/{total} ({completed/total*100:.1f}%) - 速率: {rate:.1f} URL/s")
+                    
+                    yield index, result
         
         elapsed = time.time() - start_time
-        valid_count = sum(1 for r in results if r['valid'])
         logger.info(f"检测完成: {total} 个URL，{valid_count} 个有效 ({valid_count/total*100:.1f}%)，耗时: {elapsed:.2f}秒")
+    
+    def _iter_check_async(self, urls, show_progress=True):
+        """asyncio后端：同步完成预筛选，HTTP探测交给AsyncHTTPProber在单个事件循环中并发执行"""
+        from async_prober import AsyncHTTPProber
+        
+        total = len(urls)
+        logger.info(f"开始批量检测 {total} 个URL（asyncio后端）...")
+        start_time = time.time()
+        
+        if self.enable_dns_check:
+            self.dns_cache.prefetch(self._host_key(url) for url in urls if isinstance(url, str))
+        
+        # 预筛选未通过和非HTTP协议的URL直接产出结果，其余交给异步探测
+        http_items = []
+        completed = 0
+        valid_count = 0
+        for index, url in enumerate(urls):
+            is_valid, reason = self.quick_filter(url)
+            if not is_valid:
+                result = {'url': url, 'valid': False, 'reason': reason, 'method': 'prefilter'}
+            elif not url.startswith(('http://', 'https://')):
+                result = {'url': url, 'valid': True, 'reason': '非HTTP协议', 'method': 'protocol_skip'}
+            else:
+                http_items.append((index, url))
+                continue
+            completed += 1
+            valid_count += result['valid']
+            yield index, result
+        
+        prober = AsyncHTTPProber(
+            timeout=self.timeout,
+            max_in_flight=self.async_max_in_flight,
+            per_host_limit=self.per_host_limit,
+            host_rate=self.host_rate,
+            resolver=self.dns_cache.resolve if self.enable_dns_check else None,
+            throttle_retries=self.throttle_retries,
+            backoff_base=self.backoff_base,
+            backoff_max=self.backoff_max,
+            user_agent=self.session.headers.get('User-Agent')
+        )
+        probe_results = prober.iter_probe(http_items)
+        try:
+            for index, result in probe_results:
+                completed += 1
+                valid_count += result['valid']
+                if show_progress and completed % 100 == 0:
+                    elapsed = time.time() - start_time
+                    rate = completed / elapsed if elapsed > 0 else 0
+                    logger.info(f"进度: {completed}/{total} ({completed/total*100:.1f}%) - 速率: {rate:.1f} URL/s")
+                yield index, result
+        finally:
+            # 调用方提前停止迭代时立即停止事件循环中的探测并释放连接
+            probe_results.close()
+        
+        elapsed = time.time() - start_time
+        logger.info(f"检测完成: {total} 个URL，{valid_count} 个有效 ({valid_count/total*100:.1f}%)，耗时: {elapsed:.2f}秒")
+    
+    def batch_check(self, urls, show_progress=True):
+        """批量检测URL
         
+        返回:
+            list: 检测结果列表，顺序与输入的urls一致（results[i]对应urls[i]）
+        """
+        urls = list(urls)
+        results = [None] * len(urls)
+        for index, result in self.iter_check(urls, show_progress=show_progress):
+            results[index] = result
         return results
 
-def create_quick_checker(timeout=2, max_workers=32, enable_dns_check=True):
+def create_quick_checker(timeout=2, max_workers=32, enable_dns_check=True,
+                         per_host_limit=DEFAULT_PER_HOST_LIMIT, host_rate=DEFAULT_HOST_RATE,
+                         backend=DEFAULT_BACKEND):
     """创建快速检测器实例"""
     return QuickURLChecker(
         timeout=timeout,
         max_workers=max_workers,
-        enable_dns_check=enable_dns_check
+        enable_dns_check=enable_dns_check,
+        per_host_limit=per_host_limit,
+        host_rate=host_rate,
+        backend=backend
     )
 
 def quick_check_urls(urls, timeout=2, max_workers=32, enable_dns_check=True):
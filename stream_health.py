@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+直播流健康状态数据库
+功能：以规范化后的流URL为键，持久化记录最近检测时间、检测结论、延迟、分辨率、编码和连续失败次数，
+根据历史结果计算下次检测时间：稳定可用的流逐步延长复检间隔，失效的流按指数退避，
+测试器只需要对已到期的条目重新探测
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+from collections import defaultdict
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# 默认数据库文件
+DEFAULT_DB_FILE = "stream_health.db"
+
+# 默认复检间隔（秒）
+DEFAULT_HEALTHY_TTL = 3600            # 可用流的基础复检间隔
+DEFAULT_MAX_HEALTHY_TTL = 3 * 86400   # 可用流的最长复检间隔
+DEFAULT_FAILED_TTL = 1800             # 失效流的基础复检间隔
+DEFAULT_MAX_FAILED_TTL = 7 * 86400    # 失效流的最长复检间隔
+
+# 默认端口，规范化时去掉
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'rtsp': 554, 'rtmp': 1935}
+
+# 累积多少条未提交的记录后自动提交
+COMMIT_BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_health (
+    url TEXT PRIMARY KEY,
+    last_checked REAL NOT NULL,
+    next_check REAL NOT NULL,
+    last_status INTEGER NOT NULL,
+    latency REAL,
+    resolution TEXT,
+    codec TEXT,
+    error TEXT,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    consecutive_successes INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+COLUMNS = ('url', 'last_checked', 'next_check', 'last_status', 'latency', 'resolution',
+           'codec', 'error', 'consecutive_failures', 'consecutive_successes')
+
+
+def normalize_stream_url(url):
+    """规范化流URL作为数据库键
+
+    协议和主机名转为小写、去掉默认端口和片段；保留路径与查询参数（不同的鉴权参数可能对应不同的流）
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc
+    if parts.hostname:
+        host = parts.hostname.lower()
+        if ':' in host:
+            host = f"[{host}]"
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        if port and DEFAULT_PORTS.get(scheme) != port:
+            host = f"{host}:{port}"
+        userinfo = netloc.rpartition('@')[0]
+        netloc = f"{userinfo}@{host}" if userinfo else host
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class StreamHealthStore:
+    """基于SQLite的流健康状态库（线程安全）"""
+
+    def __init__(self, db_file=DEFAULT_DB_FILE, healthy_ttl=DEFAULT_HEALTHY_TTL,
+                 max_healthy_ttl=DEFAULT_MAX_HEALTHY_TTL, failed_ttl=DEFAULT_FAILED_TTL,
+                 max_failed_ttl=DEFAULT_MAX_FAILED_TTL):
+        """
+        参数:
+            db_file: SQLite数据库文件路径
+            healthy_ttl: 可用流的基础复检间隔（秒），连续可用时按2的幂次延长
+            max_healthy_ttl: 可用流的最长复检间隔（秒）
+            failed_ttl: 失效流的基础复检间隔（秒），连续失效时按2的幂次退避
+            max_failed_ttl: 失效流的最长复检间隔（秒）
+        """
+        self.db_file = db_file
+        self.healthy_ttl = healthy_ttl
+        self.max_healthy_ttl = max_healthy_ttl
+        self.failed_ttl = failed_ttl
+        self.max_failed_ttl = max_failed_ttl
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_stream_health_next_check ON stream_health(next_check)")
+        self._conn.commit()
+
+    def _row_to_record(self, row):
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def get(self, url):
+        """获取单个URL的健康记录，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM stream_health WHERE url = ?",
+                (normalize_stream_url(url),)
+            ).fetchone()
+        return self._row_to_record(row)
+
+    def get_many(self, urls):
+        """批量获取健康记录
+
+        返回:
+            dict: {原始URL: 记录}，没有记录的URL不包含在结果中
+        """
+        keys = {}
+        for url in urls:
+            keys.setdefault(normalize_stream_url(url), []).append(url)
+
+        records = {}
+        key_list = list(keys)
+        # SQLite单条语句的参数个数有限制，分批查询
+        with self._lock:
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM stream_health WHERE url IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    record = self._row_to_record(row)
+                    for url in keys[record['url']]:
+                        records[url] = record
+        return records
+
+    def split_due(self, urls, now=None):
+        """将URL分为“记录仍有效”和“需要重新检测”两部分
+
+        返回:
+            tuple: ({URL: 记录}（未到期的记录）, [需要检测的URL])
+        """
+        now = time.time() if now is None else now
+        records = self.get_many(urls)
+        fresh = {}
+        due = []
+        for url in urls:
+            record = records.get(url)
+            if record is not None and record['next_check'] > now:
+                fresh[url] = record
+            else:
+                due.append(url)
+        return fresh, due
+
+    def _next_interval(self, valid, successes, failures):
+        """根据连续成功/失败次数计算下次检测的间隔"""
+        if valid:
+            return min(self.healthy_ttl * (2 ** min(successes - 1, 16)), self.max_healthy_ttl)
+        return min(self.failed_ttl * (2 ** min(failures - 1, 16)), self.max_failed_ttl)
+
+    def record(self, url, valid, latency=None, resolution=None, codec=None, error=None, checked_time=None):
+        """记录一次检测结果并计算下次检测时间"""
+        self.record_many([(url, valid, latency, resolution, codec, error)], checked_time=checked_time)
+
+    def record_many(self, results, checked_time=None):
+        """批量记录检测结果
+
+        参数:
+            results: 可迭代的 (url, valid, latency, resolution, codec, error) 元组
+            checked_time: 检测时间，默认为当前时间
+        """
+        now = time.time() if checked_time is None else checked_time
+        with self._lock:
+            for url, valid, latency, resolution, codec, error in results:
+                key = normalize_stream_url(url)
+                row = self._conn.execute(
+                    "SELECT consecutive_failures, consecutive_successes, resolution, codec FROM stream_health WHERE url = ?",
+                    (key,)
+                ).fetchone()
+                failures, successes, old_resolution, old_codec = row if row else (0, 0, None, None)
+                if valid:
+                    successes, failures = successes + 1, 0
+                    # 本次未检测分辨率时保留上次的结果
+                    resolution = resolution or old_resolution
+                    codec = codec or old_codec
+                else:
+                    successes, failures = 0, failures + 1
+                next_check = now + self._next_interval(valid, successes, failures)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO stream_health "
+                    f"({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    (key, now, next_check, 1 if valid else 0, latency, resolution, codec, error,
+                     failures, successes)
+                )
+                self._pending_writes += 1
+            if self._pending_writes >= COMMIT_BATCH_SIZE:
+                self._conn.commit()
+                self._pending_writes = 0
+
+    def flush(self):
+        """提交尚未写入的记录"""
+        with self._lock:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        """提交并关闭数据库"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def stats(self):
+        """返回数据库中的条目统计"""
+        now = time.time()
+        with self._lock:
+            total, healthy, due = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(last_status), 0), COALESCE(SUM(next_check <= ?), 0) FROM stream_health",
+                (now,)
+            ).fetchone()
+        return {'total': total, 'healthy': healthy, 'failed': total - healthy, 'due': due}
+
+
+def open_health_store(health_config):
+    """根据配置中的health段创建健康状态库"""
+    return StreamHealthStore(
+        db_file=health_config.get("db_file", DEFAULT_DB_FILE),
+        healthy_ttl=health_config.get("healthy_ttl", DEFAULT_HEALTHY_TTL),
+        max_healthy_ttl=health_config.get("max_healthy_ttl", DEFAULT_MAX_HEALTHY_TTL),
+        failed_ttl=health_config.get("failed_ttl", DEFAULT_FAILED_TTL),
+        max_failed_ttl=health_config.get("max_failed_ttl", DEFAULT_MAX_FAILED_TTL)
+    )
+
+
+def test_channels_with_health(store, channels, test_func):
+    """用健康状态库包装频道测试函数
+
+    只把复检时间已到的频道交给test_func测试，其余频道直接沿用库中的结论；
+    测试结果写回数据库，最终按输入顺序返回所有可用频道。
+
+    参数:
+        store: StreamHealthStore实例
+        channels: {分类: [(频道名, URL), ...]}
+        test_func: 测试函数，接收同样结构的频道字典，返回其中可用的频道字典
+
+    返回:
+        defaultdict(list): 可用频道 {分类: [(频道名, URL), ...]}
+    """
+    urls = [url for channel_list in channels.values() for _, url in channel_list]
+    fresh, due = store.split_due(urls)
+    due_set = set(due)
+
+    channels_to_test = defaultdict(list)
+    for category, channel_list in channels.items():
+        for channel in channel_list:
+            _, url = channel
+            if url in due_set:
+                channels_to_test[category].append(channel)
+
+    reused_valid = sum(1 for record in fresh.values() if record['last_status'])
+    logger.info(f"健康状态库: 沿用 {len(fresh)} 个URL的结论（{reused_valid} 个可用），需要重新检测 {len(due_set)} 个URL")
+
+    tested_valid_urls = set()
+    if channels_to_test:
+        tested_channels = test_func(channels_to_test)
+        if not isinstance(tested_channels, dict):
+            # 测试被中断等情况，原样返回测试函数的结果
+            return tested_channels
+        tested_valid_urls = {url for channel_list in tested_channels.values() for _, url in channel_list}
+        store.record_many(
+            (url, url in tested_valid_urls, None, None, None, None if url in tested_valid_urls else '检测失败')
+            for url in due_set
+        )
+        store.flush()
+
+    valid_channels = defaultdict(list)
+    for category, channel_list in channels.items():
+        for channel in channel_list:
+            _, url = channel
+            record = fresh.get(url)
+            if url in tested_valid_urls or (record is not None and record['last_status']):
+                valid_channels[category].append(channel)
+    return valid_channels
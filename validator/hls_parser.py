@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+HLS播放列表解析
+功能：通过共用的连接池会话下载HLS播放列表（每个播放列表只下载一次），解析为结构化对象，
+供验证器中的分辨率检测、首个分片提取和基于内容的推断共用
+- 主播放列表：解析#EXT-X-STREAM-INF属性列表（RESOLUTION、BANDWIDTH、CODECS等，引号内的逗号不会被当作分隔符）
+- 媒体播放列表：按顺序收集分片URI
+- 相对URI按播放列表的最终URL（跟随重定向后）解析为绝对URL
+"""
+
+import re
+import threading
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 属性列表：KEY=VALUE，VALUE为带引号的字符串或不含逗号的值
+ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^",]*)')
+
+# 共用会话的连接池大小
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 32
+
+# 单个播放列表的最大下载时间（秒）
+MAX_FETCH_TIMEOUT = 15
+
+
+def parse_attribute_list(text):
+    """解析HLS属性列表，返回 {属性名: 值}（去掉值两端的引号）"""
+    attrs = {}
+    for key, value in ATTRIBUTE_PATTERN.findall(text):
+        if value.startswith('"'):
+            value = value[1:-1]
+        attrs.setdefault(key, value)
+    return attrs
+
+
+def _parse_resolution(value):
+    """'1920x1080' -> (1920, 1080)，格式不正确或为0时返回None"""
+    width, _, height = (value or '').lower().partition('x')
+    if width.isdigit() and height.isdigit() and int(width) > 0 and int(height) > 0:
+        return int(width), int(height)
+    return None
+
+
+class HLSVariant:
+    """主播放列表中的一个码率（#EXT-X-STREAM-INF及其后的URI）"""
+
+    __slots__ = ('uri', 'attrs', 'bandwidth', 'resolution', 'codecs')
+
+    def __init__(self, uri, attrs):
+        self.uri = uri
+        self.attrs = attrs
+        bandwidth = attrs.get('BANDWIDTH', '')
+        self.bandwidth = int(bandwidth) if bandwidth.isdigit() else None
+        self.resolution = _parse_resolution(attrs.get('RESOLUTION'))
+        self.codecs = attrs.get('CODECS')
+
+    def __repr__(self):
+        return f"HLSVariant(uri={self.uri!r}, bandwidth={self.bandwidth!r}, resolution={self.resolution!r}, codecs={self.codecs!r})"
+
+
+class HLSPlaylist:
+    """解析后的HLS播放列表
+
+    属性:
+        url: 播放列表的URL（相对URI的基准）
+        text: 播放列表原文
+        variants: 码率列表（主播放列表）
+        segments: 分片的绝对URL列表（媒体播放列表）
+        uris: 按出现顺序排列的所有URI（码率和分片）
+    """
+
+    __slots__ = ('url', 'text', 'variants', 'segments', 'uris')
+
+    def __init__(self, url, text, variants, segments, uris):
+        self.url = url
+        self.text = text
+        self.variants = variants
+        self.segments = segments
+        self.uris = uris
+
+    @property
+    def is_master(self):
+        return bool(self.variants)
+
+    def best_variant(self):
+        """分辨率最高的码率（高度相同时取先出现的），没有带分辨率的码率时返回None"""
+        best = None
+        for variant in self.variants:
+            if variant.resolution and (best is None or variant.resolution[1] > best.resolution[1]):
+                best = variant
+        return best
+
+    @property
+    def resolution(self):
+        """最高码率的 (宽, 高)，没有时返回None"""
+        best = self.best_variant()
+        return best.resolution if best else None
+
+    @property
+    def first_uri(self):
+        """第一个URI（主播放列表为第一个码率，媒体播放列表为第一个分片），没有时返回None"""
+        return self.uris[0] if self.uris else None
+
+    def __repr__(self):
+        return f"HLSPlaylist(url={self.url!r}, variants={len(self.variants)}, segments={len(self.segments)})"
+
+
+def parse_playlist(text, base_url):
+    """解析HLS播放列表文本
+
+    参数:
+        text: 播放列表内容
+        base_url: 解析相对URI的基准URL（播放列表自身的URL）
+
+    返回:
+        HLSPlaylist
+    """
+    variants = []
+    segments = []
+    uris = []
+    pending_variant = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            if line.startswith('#EXT-X-STREAM-INF:'):
+                pending_variant = parse_attribute_list(line[18:])
+            continue
+        uri = urljoin(base_url, line)
+        uris.append(uri)
+        if pending_variant is not None:
+            variants.append(HLSVariant(uri, pending_variant))
+            pending_variant = None
+        else:
+            segments.append(uri)
+    return HLSPlaylist(base_url, text, variants, segments, uris)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """返回共用的连接池会话（第一次调用时创建）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def fetch_playlist(url, timeout, headers=None, session=None):
+    """下载并解析HLS播放列表，失败（网络错误或状态码不是200）时返回None
+
+    参数:
+        session: 使用的requests会话，默认为共用的连接池会话
+    """
+    session = session or get_session()
+    try:
+        response = session.get(url, timeout=min(timeout, MAX_FETCH_TIMEOUT), headers=headers, allow_redirects=True)
+        if response.status_code != 200:
+            return None
+        text = response.text
+        base_url = response.url or url
+    except Exception:
+        return None
+    return parse_playlist(text, base_url)
@@ -50,6 +50,38 @@ except ImportError:
     def is_http_url(url):
         return url.startswith(('http://', 'https://'))
 from datetime import datetime
+from channel_record import ChannelRecord
+from playlist_parser import iter_m3u_tokens, TOKEN_EXTINF, TOKEN_URL
+
+# 所有ffprobe/mediainfo子进程都通过共用的调度器启动（限制并发、按负载准入）
+try:
+    from .probe_scheduler import run_probe, configure_probe_scheduler
+    from .hls_parser import fetch_playlist
+    from .ts_sniffer import probe_ts_segment
+except ImportError:
+    from probe_scheduler import run_probe, configure_probe_scheduler
+    from hls_parser import fetch_playlist
+    from ts_sniffer import probe_ts_segment
+
+# 导入流健康状态库（可选）
+try:
+    from stream_health import StreamHealthStore
+    STREAM_HEALTH_AVAILABLE = True
+except ImportError:
+    STREAM_HEALTH_AVAILABLE = False
+
+# 导入探测结果缓存（可选）
+try:
+    try:
+        from .probe_cache import ProbeCache, playlist_fingerprint, DEFAULT_TTL as PROBE_CACHE_TTL
+    except ImportError:
+        from probe_cache import ProbeCache, playlist_fingerprint, DEFAULT_TTL as PROBE_CACHE_TTL
+    PROBE_CACHE_AVAILABLE = True
+except ImportError:
+    PROBE_CACHE_AVAILABLE = False
+
+# 验证器支持的直播源URL协议
+STREAM_URL_PREFIXES = ('http://', 'https://', 'rtsp://', 'rtmp://', 'udp://', 'rtp://')
 
 # 验证时间戳跟踪器 - 参考BlackBird-Player的result.txt格式
 class ValidationTimestamp:
@@ -81,70 +113,65 @@ class ValidationTimestamp:
         cls._timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def _resolution_from_hls_playlist(playlist):
+    """从已解析的HLS主播放列表中取分辨率最高的码率，没有带RESOLUTION的码率时返回None"""
+    best = playlist.best_variant()
+    if best is None:
+        return None
+    width, height = best.resolution
+    return f"{width}*{height}", 'hls', {
+        'source': 'hls_playlist',
+        'bandwidth': best.bandwidth,
+        'codecs': best.codecs
+    }
+
+
+def _first_media_segment(playlist, timeout, headers=None, session=None):
+    """返回可用于解析分片头的TS分片URL，没有时返回None
+
+    媒体播放列表直接取分片（直播取最新的分片，点播取第一个）；主播放列表下载BANDWIDTH最高的码率的播放列表再取分片；
+    fMP4分片（#EXT-X-MAP）不是TS，返回None
+    """
+    if not playlist.segments and playlist.variants:
+        variant = max(playlist.variants, key=lambda v: v.bandwidth or 0)
+        playlist = fetch_playlist(variant.uri, timeout, headers, session)
+        if playlist is None:
+            return None
+    if not playlist.segments or '#EXT-X-MAP' in playlist.text:
+        return None
+    return playlist.segments[0] if '#EXT-X-ENDLIST' in playlist.text else playlist.segments[-1]
+
+
+def _sniff_segment_resolution(segment_url, timeout, headers=None, session=None):
+    """下载TS分片开头并从SPS中解析分辨率（不启动ffprobe），失败时返回None"""
+    info = probe_ts_segment(segment_url, timeout, headers, session)
+    if info is None:
+        return None
+    return info.resolution, info.codec, {'source': 'ts_sniff'}
+
+
 def _get_resolution_from_hls(url, timeout, headers=None):
-    """从HLS播放列表中提取分辨率信息 - 优化版本"""
-    import re
-    import requests
+    """从HLS播放列表中提取分辨率信息 - 优化版本
+    
+    主播放列表带RESOLUTION时直接返回，不启动ffprobe；否则先解析TS分片头，失败时再用ffprobe探测第一个码率或分片
+    """
     import subprocess
-    from urllib.parse import urlparse, urljoin
     try:
-        session = requests.Session()
-        response = session.get(url, timeout=min(timeout, 15), headers=headers, allow_redirects=True)
-        if response.status_code != 200:
+        playlist = fetch_playlist(url, timeout, headers)
+        if playlist is None:
             return None
 
-        content = response.text
-        re_resolution = re.compile(r'#EXT-X-STREAM-INF.*?RESOLUTION=(\d+)x(\d+)', re.IGNORECASE | re.DOTALL)
-        matches = re_resolution.findall(content)
-
-        if matches:
-            max_height = 0
-            best_width = 0
-            for width, height in matches:
-                h = int(height)
-                w = int(width)
-                if h > max_height and h > 0 and w > 0:
-                    max_height = h
-                    best_width = w
-            if max_height > 0:
-                return f"{best_width}*{max_height}", 'hls', {'source': 'hls_playlist'}
-            return None, None, {}
-
-        lines = content.splitlines()
-        first_segment_url = None
-        parsed_url = urlparse(url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        resolution = _resolution_from_hls_playlist(playlist)
+        if resolution:
+            return resolution
 
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
+        segment_url = _first_media_segment(playlist, timeout, headers)
+        if segment_url:
+            resolution = _sniff_segment_resolution(segment_url, timeout, headers)
+            if resolution:
+                return resolution
 
-            if line.startswith('http://') or line.startswith('https://'):
-                first_segment_url = line
-                break
-            elif line.startswith('/api/') or line.startswith('/hls/') or line.startswith('/live/'):
-                first_segment_url = f"{parsed_url.scheme}://{parsed_url.netloc}{line}"
-                break
-            elif line.startswith('/'):
-                first_segment_url = urljoin(base_url, line)
-                break
-            else:
-                # 处理相对路径的媒体片段文件
-                # 包括 .ts, .m4s, .m3u8 等媒体文件，以及纯数字文件名
-                if (line.endswith('.ts') or line.endswith('.m4s') or line.endswith('.m3u8') or
-                    line.endswith('.mp4') or line.endswith('.m4v') or
-                    re.match(r'^\d+\.ts$', line) or  # 纯数字.ts文件名
-                    re.match(r'^[a-zA-Z0-9_-]+\.ts$', line)):  # 字母数字下划线中划线.ts文件名
-                    # 使用当前M3U8的base路径来构建完整URL
-                    base_path = url.rsplit('/', 1)[0] + '/'
-                    first_segment_url = urljoin(base_path, line)
-                    break
-                else:
-                    # 其他未知格式，也尝试作为相对路径处理
-                    base_path = url.rsplit('/', 1)[0] + '/'
-                    first_segment_url = urljoin(base_path, line)
-                    break
+        first_segment_url = playlist.first_uri
 
         if first_segment_url:
             # 验证和清理从HLS列表中提取的URL
@@ -163,8 +190,8 @@ def _get_resolution_from_hls(url, timeout, headers=None):
                 '-of', 'json',
                 clean_segment_url
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 1,
-                                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+            result = run_probe(cmd, capture_output=True, text=True, timeout=timeout + 1,
+                               creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
             if result.returncode == 0:
                 import json as json_module
                 try:
@@ -185,93 +212,13 @@ def _get_resolution_from_hls(url, timeout, headers=None):
 
 
 def _extract_first_segment_from_m3u8(m3u8_url, timeout, headers=None):
-    """从m3u8播放列表中提取第一个媒体片段URL - 增强相对路径处理版本"""
-    import re
-    import requests
-    from urllib.parse import urljoin, urlparse
-    try:
-        session = requests.Session()
-        response = session.get(m3u8_url, timeout=min(timeout, 15), headers=headers, allow_redirects=True)
-        if response.status_code != 200:
-            return None
-
-        content = response.text
-        lines = content.splitlines()
-        
-        # 解析基础URL
-        parsed_url = urlparse(m3u8_url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        
-        # 构建更准确的基础路径
-        if parsed_url.path and parsed_url.path != '/':
-            path_parts = parsed_url.path.rstrip('/').split('/')
-            if len(path_parts) > 1:
-                base_url = f"{parsed_url.scheme}://{parsed_url.netloc}/{'/'.join(path_parts[:-1])}/"
-            else:
-                base_url = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            if line.startswith('http://') or line.startswith('https://'):
-                return line
-            elif line.startswith('/api/'):
-                # 特殊处理 /api/ 路径
-                return f"{parsed_url.scheme}://{parsed_url.netloc}{line}"
-            elif line.startswith('/hls/') or line.startswith('/live/'):
-                # 处理 /hls/ 和 /live/ 路径
-                return f"{parsed_url.scheme}://{parsed_url.netloc}{line}"
-            elif line.startswith('/'):
-                # 处理其他以 / 开头的绝对路径
-                return f"{parsed_url.scheme}://{parsed_url.netloc}{line}"
-            elif '=' in line and '&' in line:
-                # 处理查询参数格式的URL，如 api.php?id=j1&t=79
-                # 提取基础路径并组合，只保留目录部分
-                if line.startswith('api.php') or line.startswith('?'):
-                    query_path = parsed_url.path if parsed_url.path else '/'
-                    if query_path.endswith('/'):
-                        query_path = query_path.rstrip('/')
-                    # 只取目录部分，不包含当前文件名
-                    if '/' in query_path:
-                        query_path = '/'.join(query_path.split('/')[:-1])
-                    
-                    # 确保路径正确格式化
-                    if query_path:
-                        if not query_path.startswith('/'):
-                            query_path = '/' + query_path
-                        if not query_path.endswith('/'):
-                            query_path += '/'
-                    else:
-                        query_path = '/'
-                        
-                    return f"{parsed_url.scheme}://{parsed_url.netloc}{query_path}{line}"
-                else:
-                    # 其他包含查询参数的路径
-                    return f"{base_url}{line}"
-            else:
-                # 处理相对路径的媒体片段文件
-                # 包括 .ts, .m4s, .m3u8 等媒体文件，以及纯数字文件名
-                if (line.endswith('.ts') or line.endswith('.m4s') or line.endswith('.m3u8') or
-                    line.endswith('.mp4') or line.endswith('.m4v') or
-                    re.match(r'^\d+\.ts$', line) or  # 纯数字.ts文件名
-                    re.match(r'^[a-zA-Z0-9_-]+\.ts$', line)):  # 字母数字下划线中划线.ts文件名
-                    return urljoin(base_url, line)
-                elif line.startswith('api.php') or line.endswith('.php'):
-                    # 处理PHP文件作为相对路径
-                    return f"{base_url}{line}"
-                else:
-                    # 其他未知格式，也尝试作为相对路径处理
-                    return urljoin(base_url, line)
-
-        return None
-    except Exception:
-        return None
+    """从m3u8播放列表中提取第一个媒体片段URL（相对路径按播放列表URL解析）"""
+    playlist = fetch_playlist(m3u8_url, timeout, headers)
+    return playlist.first_uri if playlist else None
 
 
 def _get_resolution_from_segment(segment_url, timeout, headers=None):
-    """使用ffprobe获取媒体片段的分辨率 - 优化版本"""
+    """获取媒体片段的分辨率 - 优化版本（先解析TS分片头，失败时使用ffprobe）"""
     import subprocess
     import json
     try:
@@ -280,6 +227,10 @@ def _get_resolution_from_segment(segment_url, timeout, headers=None):
         if not clean_url:
             return None
 
+        resolution = _sniff_segment_resolution(clean_url, timeout, headers)
+        if resolution:
+            return resolution
+
         cmd = [
             'ffprobe', '-v', 'error', '-select_streams', 'v:0',
             '-show_entries', 'stream=width,height', '-of', 'json',
@@ -293,7 +244,7 @@ def _get_resolution_from_segment(segment_url, timeout, headers=None):
 
         cmd.append(clean_url)
 
-        result = subprocess.run(
+        result = run_probe(
             cmd, capture_output=True, text=True, timeout=timeout,
             shell=False, encoding='utf-8', errors='ignore',
             creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
@@ -318,16 +269,18 @@ def _get_resolution_from_segment(segment_url, timeout, headers=None):
 
 def _get_resolution_from_m3u8_content(url, timeout, headers=None):
     """基于M3U8内容推断分辨率信息"""
+    playlist = fetch_playlist(url, timeout, headers)
+    if playlist is None:
+        return None
+    return _infer_resolution_from_m3u8_text(url, playlist.text)
+
+
+def _infer_resolution_from_m3u8_text(url, text):
+    """根据已下载的M3U8文本（以及URL中的关键词）推断分辨率信息"""
     import re
-    import requests
     try:
-        session = requests.Session()
-        response = session.get(url, timeout=min(timeout, 15), headers=headers, allow_redirects=True)
-        if response.status_code != 200:
-            return None
-
-        content = response.text.lower()
-        original_content = response.text
+        content = text.lower()
+        original_content = text
         
         # 1. 检查明确的分辨率信息
         resolution_patterns = [
@@ -465,8 +418,12 @@ def _validate_and_sanitize_url(url):
         return None
 
 
-def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
-    """在进程池中执行的ffprobe分辨率检测函数 - 优化版本"""
+def _run_media_probe(url, timeout, headers=None, retry=2):
+    """运行一次ffprobe，同时获取视频流、音频流和格式信息
+
+    返回:
+        tuple: (解析后的JSON, 错误信息)，成功时错误信息为None，失败时JSON为None
+    """
     import subprocess
     import json
     import re
@@ -474,7 +431,7 @@ def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
     # 验证和清理URL
     clean_url = _validate_and_sanitize_url(url)
     if not clean_url:
-        return None, None, {'error': 'invalid_url'}
+        return None, {'error': 'invalid_url'}
 
     url_lower = clean_url.lower()
     is_rtsp = url_lower.startswith('rtsp://')
@@ -511,8 +468,9 @@ def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
                 '-reorder_queue_size', '2048',
                 '-analyzeduration', str(int(timeout * 1000000)),
                 '-probesize', str(5 * 1024 * 1024),
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,codec_name:format=probe_score,duration',
+                # 视频和音频流一起获取，分辨率检测和音频检测共用同一次探测结果
+                '-show_entries',
+                'stream=codec_type,codec_name,width,height,sample_rate,channels,bit_rate:format=probe_score,duration',
                 '-of', 'json'
             ]
 
@@ -541,7 +499,7 @@ def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
 
             cmd.append(clean_url)
 
-            result = subprocess.run(
+            result = run_probe(
                 cmd, capture_output=True, text=True, timeout=timeout,
                 shell=False, encoding='utf-8', errors='ignore',
                 creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
@@ -550,75 +508,151 @@ def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
             if result.returncode == 0:
                 try:
                     data = json.loads(result.stdout)
-                    format_info = data.get('format', {})
-                    probe_score = format_info.get('probe_score', 0)
-                    format_duration = format_info.get('duration', 'unknown')
-
+                    probe_score = data.get('format', {}).get('probe_score', 0)
                     if probe_score <= 0:
                         if attempt < retry:
                             continue
-                        return None, None, {'error': 'format_unrecognizable', 'probe_score': probe_score}
-
-                    width = 0
-                    height = 0
-                    codec = '未知'
-
-                    if 'streams' in data and len(data['streams']) > 0:
-                        stream = data['streams'][0]
-                        width = stream.get('width', 0)
-                        height = stream.get('height', 0)
-                        codec = stream.get('codec_name', '未知')
-
-                    if width and height and width > 0 and height > 0:
-                        return f"{width}*{height}", codec, {
-                            'probe_score': probe_score,
-                            'duration': format_duration,
-                            'codec': codec,
-                            'source': 'streams'
-                        }
-
-                    if 'programs' in data and len(data['programs']) > 0:
-                        for program in data['programs']:
-                            if 'streams' in program and len(program['streams']) > 0:
-                                for stream in program['streams']:
-                                    w = stream.get('width', 0)
-                                    h = stream.get('height', 0)
-                                    if w and h and w > 0 and h > 0:
-                                        c = stream.get('codec_name', codec)
-                                        return f"{w}*{h}", c, {
-                                            'probe_score': probe_score,
-                                            'duration': format_duration,
-                                            'codec': c,
-                                            'source': 'programs'
-                                        }
-
-                    if width == 0 or height == 0:
-                        return None, None, {
-                            'error': 'no_valid_resolution',
-                            'probe_score': probe_score,
-                            'codec': codec,
-                            'suggestion': 'stream_detected_but_no_video_dimensions'
-                        }
-
+                        return None, {'error': 'format_unrecognizable', 'probe_score': probe_score}
+                    return data, None
                 except json.JSONDecodeError:
                     pass
 
             if attempt < retry:
                 continue
 
-            return None, None, {'error': 'probe_failed', 'returncode': result.returncode}
+            return None, {'error': 'probe_failed', 'returncode': result.returncode}
 
         except subprocess.TimeoutExpired:
             if attempt < retry:
                 continue
-            return None, None, {'error': 'timeout'}
+            return None, {'error': 'timeout'}
 
         except Exception as e:
             if attempt < retry:
                 continue
-            return None, None, {'error': str(e)}
+            return None, {'error': str(e)}
+
+    return None, {'error': 'max_retries_exceeded'}
 
-    return None, None, {'error': 'max_retries_exceeded'}
+
+def _first_stream(data, codec_type):
+    """返回探测结果中第一个指定类型（video/audio）的流"""
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
+
+
+class MediaProbe:
+    """一个URL的媒体探测结果
+
+    第一次需要时运行一次ffprobe（视频流、音频流和格式信息一起获取）并缓存解析后的JSON，
+    分辨率、编码和音频检测都从同一次结果中读取，不再各自启动ffprobe进程
+    """
+
+    __slots__ = ('url', 'timeout', 'headers', 'retry', 'from_cache', 'cache_checked', '_data', '_error', '_done')
+
+    def __init__(self, url, timeout, headers=None, retry=2):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers
+        self.retry = retry
+        self.from_cache = False
+        self.cache_checked = False
+        self._data = None
+        self._error = None
+        self._done = False
+
+    @property
+    def done(self):
+        """是否已经有探测结果（运行过ffprobe或已从缓存载入）"""
+        return self._done
+
+    def load_cache_entry(self, entry):
+        """用探测结果缓存（probe_cache.ProbeCache.get的返回值）代替运行ffprobe"""
+        streams = []
+        width, _, height = (entry.get('resolution') or '').partition('*')
+        if width.isdigit() and height.isdigit():
+            streams.append({'codec_type': 'video', 'codec_name': entry.get('codec') or '未知',
+                            'width': int(width), 'height': int(height)})
+        audio = entry.get('audio')
+        if audio:
+            streams.append({'codec_type': 'audio', 'codec_name': audio.get('codec'),
+                            'sample_rate': audio.get('sample_rate'), 'channels': audio.get('channels'),
+                            'bit_rate': audio.get('bit_rate')})
+        self._data = {'streams': streams, 'format': {'probe_score': entry.get('probe_score') or 100}}
+        self._error = None
+        self._done = True
+        self.from_cache = True
+
+    def cache_entry(self):
+        """返回可写入探测结果缓存的字段，没有有效分辨率时返回None"""
+        resolution, codec, info = self.resolution()
+        if not resolution:
+            return None
+        return {
+            'resolution': resolution,
+            'codec': codec,
+            'audio': self.audio_info(),
+            'probe_score': info.get('probe_score'),
+            'source': info.get('source')
+        }
+
+    def result(self):
+        """返回 (解析后的JSON, 错误信息)，只在第一次调用时运行ffprobe"""
+        if not self._done:
+            self._data, self._error = _run_media_probe(self.url, self.timeout, self.headers, self.retry)
+            self._done = True
+        return self._data, self._error
+
+    def resolution(self):
+        """返回 (分辨率, 编码, 附加信息)，与_ffprobe_get_resolution的返回格式一致"""
+        data, error = self.result()
+        if data is None:
+            return None, None, error
+
+        format_info = data.get('format', {})
+        probe_score = format_info.get('probe_score', 0)
+        stream = _first_stream(data, 'video') or {}
+        width = stream.get('width', 0)
+        height = stream.get('height', 0)
+        codec = stream.get('codec_name', '未知')
+
+        if width and height and width > 0 and height > 0:
+            return f"{width}*{height}", codec, {
+                'probe_score': probe_score,
+                'duration': format_info.get('duration', 'unknown'),
+                'codec': codec,
+                'source': 'probe_cache' if self.from_cache else 'streams'
+            }
+        return None, None, {
+            'error': 'no_valid_resolution',
+            'probe_score': probe_score,
+            'codec': codec,
+            'suggestion': 'stream_detected_but_no_video_dimensions'
+        }
+
+    def audio_info(self):
+        """返回音频流信息字典，没有音频流或探测失败时返回None"""
+        data, _ = self.result()
+        stream = _first_stream(data, 'audio') if data else None
+        if not stream:
+            return None
+        return {
+            'codec': stream.get('codec_name', '未知'),
+            'sample_rate': stream.get('sample_rate', '未知'),
+            'channels': stream.get('channels', '未知'),
+            'bit_rate': stream.get('bit_rate', '未知')
+        }
+
+    def has_audio(self):
+        """是否有有效的音频流"""
+        return self.audio_info() is not None
+
+
+def _ffprobe_get_resolution(url, timeout, headers=None, retry=2):
+    """在进程池中执行的ffprobe分辨率检测函数 - 优化版本"""
+    return MediaProbe(url, timeout, headers, retry).resolution()
 
 
 def _test_stream_playback(url, timeout, headers=None):
@@ -629,6 +663,7 @@ def _test_stream_playback(url, timeout, headers=None):
     1. UDP/RTSP/RTMP/RTP: 使用FFmpeg尝试解码一小段数据，确认流可播放
     2. IPv6: 使用FFprobe探测，检查是否能在IPv6环境下正常连接
     3. 成功播放后获取真实分辨率和编码信息
+    4. 试播是这些协议唯一的有效性检查，不使用探测结果缓存（端口可连接不代表流仍可播放）
     """
     import subprocess
     import json
@@ -686,6 +721,8 @@ def _test_stream_playback(url, timeout, headers=None):
             if not _check_socket_connection(parsed.hostname, port, min(timeout, 3)):
                 return None, None, {'error': f'{("RTSP" if is_rtsp else "RTMP")}_unreachable', 'method': 'socket_check'}
         
+        protocol = 'ipv6' if is_ipv6 else ('rtsp' if is_rtsp else ('rtmp' if is_rtmp else ('udp' if is_udp else 'rtp')))
+        
         cmd = [
             'ffprobe', '-v', 'error',
             '-timeout', str(timeout_us),
@@ -715,7 +752,7 @@ def _test_stream_playback(url, timeout, headers=None):
         
         cmd.append(clean_url)
         
-        result = subprocess.run(
+        result = run_probe(
             cmd, capture_output=True, text=True, timeout=timeout + 2,
             shell=False, encoding='utf-8', errors='ignore',
             creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
@@ -743,7 +780,7 @@ def _test_stream_playback(url, timeout, headers=None):
                             'duration': format_duration,
                             'format': format_name,
                             'bitrate': bitrate,
-                            'protocol': 'ipv6' if is_ipv6 else ('rtsp' if is_rtsp else ('rtmp' if is_rtmp else ('udp' if is_udp else 'rtp')))
+                            'protocol': protocol
                         }
                 
                 return None, None, {'error': 'no_video_stream', 'format': format_name}
@@ -770,81 +807,16 @@ def _test_stream_playback(url, timeout, headers=None):
 
 def _ffprobe_get_audio_info(url, timeout, headers=None):
     """使用ffprobe获取音频流信息（编码格式、采样率、声道数、码率等）"""
-    import subprocess
-    import json
     try:
-        # 验证和清理URL
-        clean_url = _validate_and_sanitize_url(url)
-        if not clean_url:
-            return None
-
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-select_streams', 'a:0',
-            '-show_entries', 'stream=codec_name,sample_rate,channels,bit_rate',
-            '-of', 'json'
-        ]
-
-        if headers:
-            cmd.extend([
-                '-headers', f'Referer: {headers.get("Referer", "")}\r\nUser-Agent: {headers.get("User-Agent", "Mozilla/5.0")}\r\n'
-            ])
-
-        cmd.append(clean_url)
-
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=timeout,
-            shell=False, encoding='utf-8', errors='ignore',
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
-
-        if result.returncode != 0:
-            return None
-
-        output = json.loads(result.stdout)
-        if 'streams' in output and len(output['streams']) > 0:
-            stream = output['streams'][0]
-            return {
-                'codec': stream.get('codec_name', '未知'),
-                'sample_rate': stream.get('sample_rate', '未知'),
-                'channels': stream.get('channels', '未知'),
-                'bit_rate': stream.get('bit_rate', '未知')
-            }
-        return None
+        return MediaProbe(url, timeout, headers, retry=0).audio_info()
     except Exception:
         return None
 
 
 def _check_url_has_audio(url, timeout, headers=None):
     """检查URL是否有有效的音频流，返回布尔值"""
-    import subprocess
     try:
-        # 验证和清理URL
-        clean_url = _validate_and_sanitize_url(url)
-        if not clean_url:
-            return False
-
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-select_streams', 'a:0',
-            '-show_entries', 'stream=codec_name',
-            '-of', 'csv=p=0'
-        ]
-
-        if headers:
-            cmd.extend([
-                '-headers', f'Referer: {headers.get("Referer", "")}\r\nUser-Agent: {headers.get("User-Agent", "Mozilla/5.0")}\r\n'
-            ])
-
-        cmd.append(clean_url)
-
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=timeout,
-            shell=False, encoding='utf-8', errors='ignore',
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
-
-        return result.returncode == 0 and result.stdout.strip()
+        return MediaProbe(url, timeout, headers, retry=0).has_audio()
     except Exception:
         return False
 
@@ -853,7 +825,7 @@ def _check_mediainfo_available():
     """检查MediaInfo命令行工具是否可用"""
     import subprocess
     try:
-        result = subprocess.run(
+        result = run_probe(
             ['mediainfo', '--version'],
             capture_output=True, text=True, timeout=5,
             shell=False, encoding='utf-8', errors='ignore',
@@ -905,7 +877,7 @@ def _mediainfo_get_resolution(url, timeout, headers=None):
         else:
             env = None
 
-        result = subprocess.run(
+        result = run_probe(
             cmd, capture_output=True, text=True, timeout=timeout,
             shell=False, encoding='utf-8', errors='ignore',
             creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0,
@@ -924,7 +896,7 @@ def _mediainfo_get_resolution(url, timeout, headers=None):
 
 
 class IPTVValidator:
-    def __init__(self, input_file, output_file=None, max_workers=None, timeout=5, debug=False, original_filename=None, skip_resolution=False, filter_no_audio=False, validation_id=None):
+    def __init__(self, input_file, output_file=None, max_workers=None, timeout=5, debug=False, original_filename=None, skip_resolution=False, filter_no_audio=False, validation_id=None, health_db=None, probe_cache_db=None):
         # 加载配置
         try:
             config_manager = get_config_manager()
@@ -959,7 +931,6 @@ class IPTVValidator:
         # 性能优化：使用更高效的数据结构
         from collections import defaultdict
         self._categorized_results = defaultdict(list)
-        self._original_order_results = {}
         
         # 超时配置
         timeout_multipliers = validation_config.get('timeout_multipliers', {
@@ -984,6 +955,23 @@ class IPTVValidator:
         self.skip_resolution = skip_resolution
         self.filter_no_audio = filter_no_audio
         
+        # 流健康状态库：只重新探测复检时间已到的URL
+        self.health_store = None
+        self.health_reused = 0
+        if health_db and STREAM_HEALTH_AVAILABLE:
+            try:
+                self.health_store = StreamHealthStore(health_db)
+            except Exception as e:
+                print(f"警告: 无法打开健康状态库 {health_db}: {e}")
+        
+        # 探测结果缓存：有效期内的流直接使用上次的分辨率、编码和音频信息，不再启动ffprobe
+        self.probe_cache = None
+        if probe_cache_db and PROBE_CACHE_AVAILABLE:
+            try:
+                self.probe_cache = ProbeCache(probe_cache_db, ttl=validation_config.get('probe_cache_ttl', PROBE_CACHE_TTL))
+            except Exception as e:
+                print(f"警告: 无法打开探测结果缓存 {probe_cache_db}: {e}")
+        
         # 预编译正则表达式，减少重复编译开销
         self._compile_regex_patterns()
         
@@ -1009,20 +997,19 @@ class IPTVValidator:
             else:
                 print("[调试] MediaInfo不可用，仅使用ffprobe")
         
-        # 初始化ffprobe进程池
-        self.ffprobe_pool = None
         self._validation_pool = None  # 用于验证的线程池
-        if self.ffprobe_available and not self.skip_resolution:
-            # 使用ThreadPoolExecutor避免ProcessPoolExecutor的多进程启动问题
-            self.ffprobe_pool = concurrent.futures.ThreadPoolExecutor(max_workers=multiprocessing.cpu_count())
+        
+        # 探测子进程调度器：验证线程直接调用ffprobe/mediainfo，同时运行的探测进程数由调度器统一限制，
+        # 与max_workers无关（同一进程中的多个验证器共用）
+        self.probe_scheduler = configure_probe_scheduler(
+            max_concurrent=validation_config.get('probe_max_concurrent'),
+            max_load=validation_config.get('probe_max_load')
+        )
+        # 本次运行的探测统计（调度器为进程内共用，累计指标包含其他运行）
+        self._probe_session = None
             
     def _compile_regex_patterns(self):
         """预编译所有使用的正则表达式模式，减少重复编译开销"""
-        # M3U文件解析正则表达式
-        self.re_extinf_name = re.compile(r'#EXTINF:.*,(.+)')
-        self.re_tvg_name = re.compile(r'tvg-name="([^"]+)"')
-        self.re_group_title = re.compile(r'group-title="([^"]+)"')
-        
         # 分辨率提取正则表达式
         self.re_resolution = re.compile(r'\[(\d+\*\d+)\]')
         
@@ -1098,31 +1085,6 @@ class IPTVValidator:
             except Exception as e:
                 print(f"[调试] 关闭验证线程池时出错: {str(e)}")
         
-        # 激进关闭ffprobe线程池
-        if hasattr(self, 'ffprobe_pool') and self.ffprobe_pool:
-            try:
-                import threading
-                print(f"[调试] 关闭ffprobe线程池，当前线程数: {len(self.ffprobe_pool._threads)}")
-                
-                # 清除线程引用
-                self.ffprobe_pool._threads = []
-                
-                # 强制停止所有相关的线程
-                for thread in threading.enumerate():
-                    if thread.name.startswith('ThreadPoolExecutor'):
-                        try:
-                            print(f"[调试] 强制停止ffprobe线程: {thread.name}")
-                            thread._stop()
-                        except Exception as e:
-                            print(f"[调试] 停止ffprobe线程时出错: {str(e)}")
-                
-                # 关闭线程池
-                self.ffprobe_pool.shutdown(cancel_futures=True)
-                self.ffprobe_pool = None
-                print("[调试] ffprobe线程池已关闭")
-            except Exception as e:
-                print(f"[调试] 关闭ffprobe线程池时出错: {str(e)}")
-        
         # 立即关闭HTTP会话
         if hasattr(self, 'session') and self.session:
             try:
@@ -1178,10 +1140,10 @@ class IPTVValidator:
             else:
                 # 读取文件内容检测
                 try:
-                    from file_utils import read_file_with_encoding
-                    content, encoding = read_file_with_encoding(self.input_file)
+                    from file_utils import read_text_sample
+                    content = read_text_sample(self.input_file)  # 只读取开头部分
                     if content is not None:
-                        content_sample = content[:1024]  # 只读取开头部分
+                        content_sample = content[:1024]
                         if content_sample.startswith('#EXTM3U'):
                             return 'm3u'
                         elif content_sample and ('#genre#' in content_sample or '\t' in content_sample):
@@ -1198,10 +1160,10 @@ class IPTVValidator:
         else:
             # 尝试读取文件内容检测
             try:
-                from file_utils import read_file_with_encoding
-                content, encoding = read_file_with_encoding(self.input_file)
+                from file_utils import read_text_sample
+                content = read_text_sample(self.input_file)  # 只读取开头部分
                 if content is not None:
-                    content_sample = content[:1024]  # 只读取开头部分
+                    content_sample = content[:1024]
                     if content_sample.startswith('#EXTM3U'):
                         return 'm3u'
                     elif content_sample and ('#genre#' in content_sample or '\t' in content_sample):
@@ -1215,7 +1177,7 @@ class IPTVValidator:
     def _check_ffprobe_availability(self):
         """检查ffprobe是否可用"""
         try:
-            result = subprocess.run(
+            result = run_probe(
                 ['ffprobe', '-version'],
                 capture_output=True, text=True, timeout=5,
                 shell=False
@@ -1334,33 +1296,21 @@ class IPTVValidator:
         content, encoding = read_file_with_encoding(self.input_file)
         if content is None:
             return []
-        lines = content.splitlines()
-            
-        for line in lines:
-            line = line.strip()
-            if not line:
+        name = "未知频道"
+        
+        # 逐行切分M3U内容，#EXTINF行的属性只解析一次；一个#EXTINF之后的多行URL都属于该频道
+        for kind, value in iter_m3u_tokens(content.splitlines()):
+            if kind == TOKEN_EXTINF:
+                name = value.attrs.get('tvg-name') or value.title or "未知频道"
+                if value.attrs.get('group-title'):
+                    current_category = value.attrs['group-title']
                 continue
-            
-            if line.startswith('#EXTINF:'):
-                name_match = self.re_extinf_name.search(line)
-                name = name_match.group(1).strip() if name_match else "未知频道"
-                
-                group_match = self.re_group_title.search(line)
-                if group_match:
-                    current_category = group_match.group(1).strip()
-                
-                tvg_match = self.re_tvg_name.search(line)
-                if tvg_match:
-                    name = tvg_match.group(1).strip()
-                
-            elif line.startswith('#'):
+            if kind != TOKEN_URL:
                 continue
-            elif line.startswith('http://') or line.startswith('https://'):
-                channels.append({
-                    'name': name,
-                    'url': line.strip(),
-                    'category': current_category
-                })
+            
+            line = value
+            if line.startswith(STREAM_URL_PREFIXES):
+                channels.append(ChannelRecord(name, line, current_category))
             # 处理分类行
             elif ',' in line and line.endswith(',#genre#'):
                 current_category = line[:-len(',#genre#')].strip()
@@ -1408,15 +1358,7 @@ class IPTVValidator:
                         # 提取分辨率信息
                         resolution = self._extract_resolution_from_url(url)
                         
-                        channel = {
-                            'name': name,
-                            'url': url,
-                            'category': current_category,
-                            'resolution': resolution if resolution else None
-                        }
-                        channels.append(channel)
-                        # 同时填充到分类结果中
-                        self._categorized_results[current_category].append(channel)
+                        channels.append(ChannelRecord(name, url, current_category, resolution if resolution else None))
             elif '\t' in line:
                 parts = line.split('\t', 1)
                 if len(parts) == 2:
@@ -1426,15 +1368,7 @@ class IPTVValidator:
                         # 提取分辨率信息
                         resolution = self._extract_resolution_from_url(url)
                         
-                        channel = {
-                            'name': name,
-                            'url': url,
-                            'category': current_category,
-                            'resolution': resolution if resolution else None
-                        }
-                        channels.append(channel)
-                        # 同时填充到分类结果中
-                        self._categorized_results[current_category].append(channel)
+                        channels.append(ChannelRecord(name, url, current_category, resolution if resolution else None))
                         
         return channels
 
@@ -1473,33 +1407,23 @@ class IPTVValidator:
         return None, None
 
     def _validate_url(self, channel, original_index=None):
-        """验证单个URL"""
+        """验证单个URL，验证结果直接写入频道记录并返回该记录"""
         if self.stop_requested:
             return None
             
-        name = channel.get('name', '未知频道')
-        url = channel.get('url', '')
-        category = channel.get('category', '未分类')
-        
-        if original_index is None:
-            original_index = channel.get('original_index', 0)
+        if not isinstance(channel, ChannelRecord):
+            channel = ChannelRecord(channel.get('name', '未知频道'), channel.get('url', ''),
+                                    channel.get('category', '未分类'), original_index=channel.get('original_index', 0))
+        url = channel.url
         
         if not url:
             return None
         
-        result = {
-            'name': name,
-            'url': url,
-            'category': category,
-            'original_index': original_index,
-            'valid': False,
-            'resolution': None,
-            'resolution_width': None,
-            'resolution_height': None,
-            'codec': None,
-            'audio': None,
-            'error': None
-        }
+        result = channel
+        result.reset()
+        result.valid = False
+        if original_index is not None:
+            result.original_index = original_index
         
         # 首先检查URL格式
         if not (url.startswith('http://') or url.startswith('https://') or 
@@ -1547,7 +1471,7 @@ class IPTVValidator:
             result['is_special_protocol'] = True
             if self.ffprobe_available and not self.skip_resolution:
                 playback_result = _test_stream_playback(url, self.timeouts['ffprobe'])
-                if playback_result and playback_result[0]:
+                if playback_result and playback_result[0] and playback_result[2].get('verified'):
                     result['valid'] = True
                     result['error'] = None
                     result['resolution'], result['codec'], result['audio'] = playback_result
@@ -1576,7 +1500,7 @@ class IPTVValidator:
         if result.get('is_ipv6'):
             if self.ffprobe_available and not self.skip_resolution:
                 playback_result = _test_stream_playback(url, self.timeouts['ffprobe'])
-                if playback_result and playback_result[0]:
+                if playback_result and playback_result[0] and playback_result[2].get('verified'):
                     result['valid'] = True
                     result['error'] = None
                     result['resolution'], result['codec'], result['audio'] = playback_result
@@ -1608,9 +1532,16 @@ class IPTVValidator:
                     result['resolution'] = f"{width}*{height}"
             return result
         
-        # 如果启用了ffprobe且不是跳过分辨率检测，获取分辨率
-        if self.ffprobe_available and not self.skip_resolution and result['valid']:
-            resolution_info = self._get_resolution_with_fallback(url)
+        # 分辨率检测和音频检测共用同一次ffprobe探测（只检测音频时与原来一样不重试）
+        detect_resolution = self.ffprobe_available and not self.skip_resolution
+        probe = MediaProbe(url, self.timeouts['ffprobe'], retry=2 if detect_resolution else 0)
+        
+        # 获取分辨率：没有ffprobe时只使用不启动子进程的方法（HLS的RESOLUTION和TS分片头）
+        if not self.skip_resolution and result['valid']:
+            if detect_resolution:
+                resolution_info = self._get_resolution_with_fallback(url, probe)
+            else:
+                resolution_info = self._get_resolution_without_ffprobe(url)
             if resolution_info:
                 result['resolution'], result['codec'], result['audio'] = resolution_info
                 if result['resolution']:
@@ -1623,33 +1554,113 @@ class IPTVValidator:
         
         # 如果需要检查音频流
         if self.filter_no_audio and result['valid']:
-            has_audio = _check_url_has_audio(url, self.timeouts['ffprobe'])
+            self._probe_with_cache(url, probe)
+            has_audio = probe.has_audio()
             if not has_audio:
                 result['valid'] = False
                 result['error'] = '无音频流'
         
         return result
 
-    def _get_resolution_with_fallback(self, url):
-        """获取分辨率，支持多种检测方法的fallback"""
+    def _load_cached_probe(self, url, probe, fingerprint=None):
+        """从探测结果缓存载入probe，返回probe是否已有探测结果（每个probe只查询一次缓存）"""
+        if probe.done:
+            return True
+        if not self.probe_cache or probe.cache_checked:
+            return False
+        probe.cache_checked = True
+        entry = self.probe_cache.get(url, fingerprint)
+        if entry:
+            probe.load_cache_entry(entry)
+            return True
+        return False
+
+    def _probe_with_cache(self, url, probe, fingerprint=None):
+        """确保probe有探测结果：优先从探测结果缓存载入，否则运行ffprobe并把有效结果写入缓存"""
+        if self._load_cached_probe(url, probe, fingerprint):
+            return
+        probe.result()
+        if self.probe_cache:
+            entry = probe.cache_entry()
+            if entry:
+                self.probe_cache.put(url, fingerprint=fingerprint, **entry)
+
+    def _resolution_from_playlist_url(self, url):
+        """URL像HLS播放列表时下载一次播放列表，返回 (主播放列表RESOLUTION得到的分辨率或None, 播放列表或None)"""
+        lower_url = url.lower()
+        if not (url.endswith('.m3u8') or url.endswith('.m3u') or '/hls/' in lower_url or '/live/' in lower_url):
+            return None, None
+        playlist = fetch_playlist(url, self.timeouts['ffprobe'], session=self.session)
+        if playlist is None:
+            return None, None
+        return _resolution_from_hls_playlist(playlist), playlist
+
+    def _sniff_ts_resolution(self, url, playlist=None):
+        """解析TS分片头获取分辨率（不启动ffprobe）：HLS播放列表取其中的分片，.ts地址直接解析"""
+        timeout = self.timeouts['ffprobe']
+        if playlist is not None:
+            segment_url = _first_media_segment(playlist, timeout, session=self.session)
+        elif urlparse(url).path.lower().endswith('.ts'):
+            segment_url = url
+        else:
+            return None
+        if not segment_url:
+            return None
+        return _sniff_segment_resolution(segment_url, timeout, session=self.session)
+
+    def _get_resolution_without_ffprobe(self, url):
+        """没有ffprobe时获取分辨率：HLS主播放列表的RESOLUTION，其次解析TS分片头"""
+        resolution, playlist = self._resolution_from_playlist_url(url)
+        if resolution:
+            return resolution
+        if self.stop_requested:
+            return None
+        return self._sniff_ts_resolution(url, playlist)
+
+    def _get_resolution_with_fallback(self, url, probe=None):
+        """获取分辨率，支持多种检测方法的fallback
+        
+        播放列表只下载一次（方法1、2和4共用），ffprobe只运行一次（方法3，结果缓存在probe中，
+        音频检测也复用同一次结果）
+        """
         # 检查停止标志
         if self.stop_requested:
             return None
         
         timeout = self.timeouts['ffprobe']
+        if probe is None:
+            probe = MediaProbe(url, timeout)
+        is_playlist_url = url.endswith('.m3u8') or url.endswith('.m3u')
         
-        # 方法1: 尝试从HLS播放列表提取分辨率
-        if url.endswith('.m3u8') or url.endswith('.m3u') or '/hls/' in url.lower() or '/live/' in url.lower():
-            resolution = _get_resolution_from_hls(url, timeout)
+        # 方法1: 尝试从HLS主播放列表的RESOLUTION提取分辨率（不启动ffprobe）
+        resolution, playlist = self._resolution_from_playlist_url(url)
+        if resolution:
+            return resolution
+        
+        # 检查停止标志
+        if self.stop_requested:
+            return None
+        
+        # 探测结果缓存有效时直接使用缓存，主播放列表的码率列表变化时缓存失效
+        fingerprint = playlist_fingerprint(playlist.text) if self.probe_cache and playlist else None
+        if self._load_cached_probe(url, probe, fingerprint):
+            resolution = probe.resolution()
             if resolution and resolution[0]:
                 return resolution
+        elif not self.filter_no_audio:
+            # 方法2: 缓存未命中时下载TS分片开头，从H.264/H.265 SPS解析分辨率（不启动ffprobe）；
+            # 需要检查音频时无论如何都要运行ffprobe，不再额外下载分片
+            resolution = self._sniff_ts_resolution(url, playlist)
+            if resolution:
+                return resolution
         
         # 检查停止标志
         if self.stop_requested:
             return None
         
-        # 方法2: 尝试使用ffprobe直接检测
-        resolution = _ffprobe_get_resolution(url, timeout)
+        # 方法3: 使用ffprobe直接检测（HLS媒体播放列表由ffprobe按-f hls读取第一个分片，不再单独探测分片）
+        self._probe_with_cache(url, probe, fingerprint)
+        resolution = probe.resolution()
         if resolution and resolution[0]:
             return resolution
         
@@ -1657,9 +1668,9 @@ class IPTVValidator:
         if self.stop_requested:
             return None
         
-        # 方法3: 如果是M3U8文件且ffprobe失败，尝试基于内容的检测
-        if url.endswith('.m3u8') or url.endswith('.m3u'):
-            resolution = _get_resolution_from_m3u8_content(url, timeout)
+        # 方法4: 如果是M3U8文件且ffprobe失败，基于方法1已下载的内容推断
+        if is_playlist_url and playlist:
+            resolution = _infer_resolution_from_m3u8_text(url, playlist.text)
             if resolution and resolution[0]:
                 return resolution
         
@@ -1667,7 +1678,7 @@ class IPTVValidator:
         if self.stop_requested:
             return None
         
-        # 方法4: 使用VLC检测（更强的协议支持）
+        # 方法5: 使用VLC检测（更强的协议支持）
         try:
             # 安全的VLC导入，支持模块化运行
             try:
@@ -1677,7 +1688,7 @@ class IPTVValidator:
                 
             resolution, codec, info = detect_with_vlc(url, timeout)
             if resolution:
-                return resolution, codec, {**info, 'fallback_level': 4}
+                return resolution, codec, {**info, 'fallback_level': 5}
         except ImportError:
             pass
         except Exception as e:
@@ -1688,7 +1699,7 @@ class IPTVValidator:
         if self.stop_requested:
             return None
         
-        # 方法5: 如果有MediaInfo作为备选
+        # 方法6: 如果有MediaInfo作为备选
         if self.mediainfo_available:
             resolution = _mediainfo_get_resolution(url, timeout)
             if resolution:
@@ -1696,12 +1707,58 @@ class IPTVValidator:
         
         return None
 
+    def _can_reuse_health_record(self, record):
+        """判断健康记录能否代替本次探测（本次需要的信息记录中都已具备）"""
+        if not record['last_status']:
+            return True
+        if self.filter_no_audio:
+            return False
+        return bool(record['resolution']) or self.skip_resolution or not self.ffprobe_available
+
+    def _result_from_health_record(self, channel, record):
+        """根据健康记录填写频道记录的验证结果"""
+        result = channel
+        result.reset()
+        result.valid = bool(record['last_status'])
+        result.resolution = record['resolution'] if record['last_status'] else None
+        result.codec = record['codec']
+        result.error = record['error']
+        result.latency = record['latency']
+        result.from_health_db = True
+        if result['resolution']:
+            res_parts = result['resolution'].split('*')
+            if len(res_parts) == 2:
+                result['resolution_width'] = res_parts[0]
+                result['resolution_height'] = res_parts[1]
+        return result
+
+    def _validate_url_timed(self, channel):
+        """验证单个URL并记录耗时（供健康状态库使用）"""
+        start_time = time.time()
+        result = self._validate_url(channel)
+        if result is not None:
+            result['latency'] = round(time.time() - start_time, 3)
+        return result
+
+    def _record_health_results(self, results):
+        """将本次探测的结果写入健康状态库"""
+        if not self.health_store:
+            return
+        self.health_store.record_many(
+            (r['url'], r['valid'], r.get('latency'), r.get('resolution'),
+             r.get('codec') if isinstance(r.get('codec'), str) else None, r.get('error'))
+            for r in results if not r.get('from_health_db')
+        )
+        self.health_store.flush()
+
     def _run_validation(self, progress_callback=None):
         """运行验证过程"""
         print(f"开始验证: {self.input_file}")
+        self._probe_session = self.probe_scheduler.start_session()
         
         # 清除之前的验证结果缓存
         self.all_results = []
+        self._categorized_results.clear()
         
         # 解析输入文件
         if self.file_type == 'm3u':
@@ -1722,6 +1779,13 @@ class IPTVValidator:
                 'stage': 'parsing_completed'
             })
         
+        # 健康状态库中未到复检时间的URL直接沿用上次的结论
+        fresh_records = {}
+        if self.health_store:
+            fresh_records, _ = self.health_store.split_due([channel.get('url', '') for channel in self.channels])
+        validate_func = self._validate_url_timed if self.health_store else self._validate_url
+        processed_count = 0
+        
         # 创建验证线程池并保存到实例变量
         self._validation_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
         
@@ -1731,12 +1795,22 @@ class IPTVValidator:
                 if self.stop_requested:
                     break
                 channel['original_index'] = idx
-                future = self._validation_pool.submit(self._validate_url, channel)
+                record = fresh_records.get(channel.get('url', ''))
+                if record is not None and self._can_reuse_health_record(record):
+                    result = self._result_from_health_record(channel, record)
+                    if result['valid']:
+                        self._categorized_results[result['category'] or '未分类'].append(result)
+                    self.health_reused += 1
+                    processed_count += 1
+                    continue
+                future = self._validation_pool.submit(validate_func, channel)
                 futures.append(future)
                 self._active_futures.add(future)
             
+            if self.health_store:
+                print(f"健康状态库: 沿用 {self.health_reused} 个频道的结论，重新探测 {len(futures)} 个频道")
+            
             # 收集结果并发送进度更新
-            processed_count = 0
             for future in concurrent.futures.as_completed(futures):
                 self._active_futures.discard(future)
                 if self.stop_requested:
@@ -1745,10 +1819,6 @@ class IPTVValidator:
                 try:
                     result = future.result()
                     if result:
-                        # 性能优化：在验证过程中维护有序结果，避免后期排序
-                        idx = result.get('original_index', 0)
-                        self._original_order_results[idx] = result
-                        
                         # 性能优化：即时分类，避免后期双重循环
                         if result['valid']:
                             category = result['category'] or '未分类'
@@ -1764,7 +1834,7 @@ class IPTVValidator:
                                 'processed': processed_count,
                                 'message': f'验证中: {result.get("name", "未知频道")} - {result.get("status", "")}',
                                 'stage': 'validation',
-                                'channel': result
+                                'channel': result.to_dict()
                             })
                 except Exception as e:
                     if self.debug:
@@ -1785,12 +1855,27 @@ class IPTVValidator:
                 self._validation_pool.shutdown(wait=False)
                 self._validation_pool = None
         
-        # 性能优化：转换为有序列表而非排序
-        self.all_results = [self._original_order_results[i] for i in sorted(self._original_order_results.keys())]
+        # 验证结果已原地写入频道记录，按解析顺序收集已验证的记录（valid为None的是未验证的频道）
+        self.all_results = [channel for channel in self.channels if channel.valid is not None]
+        
+        # 记录本次探测结果，供下次运行跳过未到期的URL
+        self._record_health_results(self.all_results)
+        if self.probe_cache:
+            self.probe_cache.flush()
         
         # 添加性能监控信息
         print(f"验证完成，有效频道: {sum(1 for r in self.all_results if r['valid'])}/{len(self.all_results)}")
         print(f"分类统计: {dict(self._categorized_results)}")
+        self.probe_scheduler.stop_session(self._probe_session)
+        probe_stats = self.probe_scheduler.stats(self._probe_session)
+        if probe_stats['started']:
+            print(f"探测进程: 共 {probe_stats['started']} 个（最多同时 {probe_stats['max_active']}/{probe_stats['max_concurrent']} 个，"
+                  f"超时 {probe_stats['timeouts']} 个），平均排队 {probe_stats['queue_time_avg']} 秒，"
+                  f"平均运行 {probe_stats['run_time_avg']} 秒，因负载过高等待 {probe_stats['load_waits']} 次")
+        if self.probe_cache:
+            cache_stats = self.probe_cache.stats()
+            print(f"探测结果缓存: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次，"
+                  f"过期或播放列表变化 {cache_stats['stale']} 次，命中率 {cache_stats['hit_rate']}")
 
     def _generate_m3u_output(self):
         """生成M3U格式输出文件"""
@@ -1804,8 +1889,11 @@ class IPTVValidator:
                 
                 # 检查分辨率是否有效（不是None且不是(None, None)）
                 if resolution and resolution != (None, None):
-                    # 将元组格式化为字符串 "宽度x高度"
-                    resolution_str = f"{resolution[0]}x{resolution[1]}"
+                    # 格式化为字符串 "宽度x高度"（探测结果为"宽*高"字符串，宽高另存在resolution_width/height中）
+                    if channel.get('resolution_width') and channel.get('resolution_height'):
+                        resolution_str = f"{channel['resolution_width']}x{channel['resolution_height']}"
+                    else:
+                        resolution_str = f"{resolution[0]}x{resolution[1]}"
                     extinf += f' tvg-shift=1,{channel["name"]}[{resolution_str}]'
                 else:
                     extinf += f',{channel["name"]}'
@@ -1911,19 +1999,11 @@ class IPTVValidator:
             if isinstance(data, list):
                 for item in data:
                     if isinstance(item, dict) and 'url' in item:
-                        channels.append({
-                            'name': item.get('name', '未知频道'),
-                            'url': item['url'],
-                            'category': item.get('category', '未分类')
-                        })
+                        channels.append(ChannelRecord(item.get('name', '未知频道'), item['url'], item.get('category', '未分类')))
             elif isinstance(data, dict):
                 for name, url in data.items():
                     if isinstance(url, str):
-                        channels.append({
-                            'name': name,
-                            'url': url,
-                            'category': '未分类'
-                        })
+                        channels.append(ChannelRecord(name, url))
         except Exception as e:
             print(f"[错误] 解析JSON文件失败: {str(e)}")
         return channels
@@ -1966,7 +2046,10 @@ class IPTVValidator:
             'valid': valid,
             'invalid': invalid,
             'valid_rate': f"{valid/total*100:.1f}%" if total > 0 else "0%",
-            'resolution_stats': resolution_stats
+            'resolution_stats': resolution_stats,
+            'health_reused': self.health_reused,
+            'probe_stats': self.probe_scheduler.stats(self._probe_session),
+            'probe_cache': self.probe_cache.stats() if self.probe_cache else None
         }
 
     def get_results_by_category(self):
@@ -1975,7 +2058,7 @@ class IPTVValidator:
         return dict(self._categorized_results)
 
 
-def validate_ipTV(input_file, output_file=None, max_workers=None, timeout=5, debug=False, original_filename=None, skip_resolution=False, filter_no_audio=False):
+def validate_ipTV(input_file, output_file=None, max_workers=None, timeout=5, debug=False, original_filename=None, skip_resolution=False, filter_no_audio=False, health_db=None, probe_cache_db=None):
     """
     验证IPTV直播源
     
@@ -1988,6 +2071,8 @@ def validate_ipTV(input_file, output_file=None, max_workers=None, timeout=5, deb
         original_filename: 原始文件名（用于生成输出文件名）
         skip_resolution: 是否跳过分辨率检测
         filter_no_audio: 是否过滤无音频流的频道
+        health_db: 流健康状态库文件路径（可选，启用后只重新探测复检时间已到的URL）
+        probe_cache_db: 探测结果缓存文件路径（可选，启用后有效期内的流不再重新运行ffprobe）
     
     返回:
         验证结果摘要字典
@@ -2011,7 +2096,9 @@ def validate_ipTV(input_file, output_file=None, max_workers=None, timeout=5, deb
         debug=debug,
         original_filename=original_filename,
         skip_resolution=skip_resolution,
-        filter_no_audio=filter_no_audio
+        filter_no_audio=filter_no_audio,
+        health_db=health_db,
+        probe_cache_db=probe_cache_db
     )
     
     output_path = validator.run()
@@ -2025,6 +2112,9 @@ def validate_ipTV(input_file, output_file=None, max_workers=None, timeout=5, deb
         print(f"  无效频道: {summary['invalid']}")
         print(f"  有效率: {summary['valid_rate']}")
         
+        if summary['probe_cache']:
+            print(f"  探测结果缓存命中率: {summary['probe_cache']['hit_rate']}")
+        
         if summary['resolution_stats']:
             print(f"  分辨率分布:")
             for res, count in sorted(summary['resolution_stats'].items(), key=lambda x: int(x[0].split('*')[1]), reverse=True):
@@ -2044,6 +2134,8 @@ if __name__ == "__main__":
     parser.add_argument('-d', '--debug', action='store_true', help='开启调试模式')
     parser.add_argument('-s', '--skip-resolution', action='store_true', help='跳过分辨率检测')
     parser.add_argument('--no-audio-filter', action='store_true', help='过滤无音频流的频道')
+    parser.add_argument('--health-db', help='流健康状态库文件路径，启用后只重新探测复检时间已到的URL')
+    parser.add_argument('--probe-cache', help='探测结果缓存文件路径，启用后有效期内的流不再重新运行ffprobe')
     
     args = parser.parse_args()
     
@@ -2054,5 +2146,7 @@ if __name__ == "__main__":
         timeout=args.timeout,
         debug=args.debug,
         skip_resolution=args.skip_resolution,
-        filter_no_audio=args.no_audio_filter
+        filter_no_audio=args.no_audio_filter,
+        health_db=args.health_db,
+        probe_cache_db=args.probe_cache
     )
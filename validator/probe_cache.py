@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ffprobe探测结果缓存
+功能：以规范化后的流URL为键，持久化保存探测得到的分辨率、编码、音频信息、probe_score和来源，
+在有效期内再次验证同一个流时直接使用缓存结果，不再启动ffprobe
+- 可选的播放列表指纹：HLS主播放列表中各码率的#EXT-X-STREAM-INF行变化时缓存失效
+- 记录命中、未命中和因过期/指纹变化失效的次数，用于计算命中率
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 添加项目根目录到Python路径，以支持模块导入
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from stream_health import normalize_stream_url
+
+# 默认数据库文件
+DEFAULT_DB_FILE = "probe_cache.db"
+
+# 默认有效期（秒）：分辨率和编码很少变化
+DEFAULT_TTL = 3 * 86400
+
+# 累积多少条未提交的记录后自动提交
+COMMIT_BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probe_cache (
+    url TEXT PRIMARY KEY,
+    probed_time REAL NOT NULL,
+    fingerprint TEXT,
+    resolution TEXT,
+    codec TEXT,
+    audio TEXT,
+    probe_score INTEGER,
+    source TEXT
+)
+"""
+
+COLUMNS = ('url', 'probed_time', 'fingerprint', 'resolution', 'codec', 'audio', 'probe_score', 'source')
+
+
+def playlist_fingerprint(content):
+    """计算HLS主播放列表的指纹（各#EXT-X-STREAM-INF行的哈希），不是主播放列表时返回None
+
+    媒体播放列表的分片列表随直播不断变化，不适合作为指纹
+    """
+    if not content:
+        return None
+    variants = [line.strip() for line in content.splitlines()
+                if line.strip().upper().startswith('#EXT-X-STREAM-INF')]
+    if not variants:
+        return None
+    return hashlib.sha1('\n'.join(variants).encode('utf-8')).hexdigest()
+
+
+class ProbeCache:
+    """基于SQLite的探测结果缓存（线程安全）"""
+
+    def __init__(self, db_file=DEFAULT_DB_FILE, ttl=DEFAULT_TTL):
+        """
+        参数:
+            db_file: SQLite数据库文件路径
+            ttl: 缓存有效期（秒）
+        """
+        self.db_file = db_file
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+        db_dir = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def get(self, url, fingerprint=None, now=None):
+        """获取有效的缓存结果，没有、已过期或指纹不一致时返回None
+
+        参数:
+            url: 流URL
+            fingerprint: 本次的播放列表指纹，为None时不检查指纹
+
+        返回:
+            dict: {'resolution', 'codec', 'audio', 'probe_score', 'source', 'probed_time'}
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM probe_cache WHERE url = ?",
+                (normalize_stream_url(url),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            record = dict(zip(COLUMNS, row))
+            if (now - record['probed_time'] > self.ttl or
+                    (fingerprint is not None and record['fingerprint'] not in (None, fingerprint))):
+                self.stale += 1
+                return None
+            self.hits += 1
+
+        record['audio'] = json.loads(record['audio']) if record['audio'] else None
+        del record['url'], record['fingerprint']
+        return record
+
+    def put(self, url, resolution, codec, audio=None, probe_score=None, source=None, fingerprint=None,
+            probed_time=None):
+        """保存一次探测结果"""
+        now = time.time() if probed_time is None else probed_time
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probe_cache "
+                f"({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                (normalize_stream_url(url), now, fingerprint, resolution, codec,
+                 json.dumps(audio, ensure_ascii=False) if audio else None, probe_score, source)
+            )
+            self._pending_writes += 1
+            if self._pending_writes >= COMMIT_BATCH_SIZE:
+                self._conn.commit()
+                self._pending_writes = 0
+
+    def flush(self):
+        """提交尚未写入的记录"""
+        with self._lock:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        """提交并关闭数据库"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def stats(self):
+        """返回本次运行的命中统计和缓存条目数"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM probe_cache").fetchone()[0]
+            hits, misses, stale = self.hits, self.misses, self.stale
+        lookups = hits + misses + stale
+        return {
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'stale': stale,
+            'hit_rate': f"{hits / lookups * 100:.1f}%" if lookups else "0%"
+        }
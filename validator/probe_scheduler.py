@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+探测子进程调度器
+功能：验证器中所有ffprobe/mediainfo子进程都通过同一个调度器启动
+- 全局信号量限制同时运行的探测进程数（与验证线程数无关），避免几十个验证线程同时启动ffprobe
+- 按系统平均负载准入：负载超过上限时，已有探测在运行的情况下新的探测先等待，最长等待max_admission_wait秒
+  （不支持os.getloadavg的系统上不做负载检查）
+- 记录排队时间、运行时间、超时次数等指标；除进程内累计的指标外，可以为每次验证运行单独开始一段统计
+- 进程内只有一个调度器，重新配置时原地修改并发上限（正在运行的验证器也按新的上限执行），
+  同时运行的探测进程数始终不超过当前上限
+"""
+
+import os
+import time
+import threading
+import subprocess
+
+# 默认每个CPU核心允许的探测进程数（探测进程大部分时间在等待网络）
+DEFAULT_PROBES_PER_CPU = 2
+
+# 默认平均负载上限 = CPU核心数 × 该系数
+DEFAULT_LOAD_FACTOR = 1.5
+
+# 负载过高时的检查间隔（秒）
+ADMISSION_POLL_INTERVAL = 0.2
+
+# 负载过高时最长等待时间（秒），超过后仍然放行，避免持续高负载时探测全部停滞
+DEFAULT_MAX_ADMISSION_WAIT = 5.0
+
+
+def _new_stats():
+    return {
+        'started': 0,
+        'completed': 0,
+        'timeouts': 0,
+        'errors': 0,
+        'load_waits': 0,
+        'max_active': 0,
+        'queue_time_total': 0.0,
+        'queue_time_max': 0.0,
+        'run_time_total': 0.0,
+        'run_time_max': 0.0,
+    }
+
+
+def _load_average():
+    """返回1分钟平均负载，不支持时返回None"""
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+class ProbeScheduler:
+    """有界的探测子进程调度器"""
+
+    def __init__(self, max_concurrent=None, max_load=None, max_admission_wait=DEFAULT_MAX_ADMISSION_WAIT):
+        """
+        参数:
+            max_concurrent: 同时运行的探测进程数上限，默认为CPU核心数 × DEFAULT_PROBES_PER_CPU
+            max_load: 平均负载上限，默认为CPU核心数 × DEFAULT_LOAD_FACTOR，0表示不检查负载
+            max_admission_wait: 负载过高时单个探测最长等待时间（秒）
+        """
+        self.max_admission_wait = max_admission_wait
+        self._lock = threading.Lock()
+        # 占用并发名额的探测数（包括负载准入等待中的），名额释放或上限变化时通知等待者
+        self._slot_available = threading.Condition(self._lock)
+        self._slots_used = 0
+        self._active = 0
+        self._stats = _new_stats()
+        self._sessions = []
+        self.configure(max_concurrent, max_load)
+
+    def configure(self, max_concurrent=None, max_load=None):
+        """原地修改并发上限和负载上限（参数含义与构造函数相同）
+
+        上限调低时已在运行的探测不受影响，新的探测等运行数降到新上限以下后才开始
+        """
+        cpu_count = os.cpu_count() or 1
+        with self._slot_available:
+            self.max_concurrent = max_concurrent or max(2, cpu_count * DEFAULT_PROBES_PER_CPU)
+            self.max_load = cpu_count * DEFAULT_LOAD_FACTOR if max_load is None else max_load
+            self._slot_available.notify_all()
+
+    def reset_stats(self):
+        """清空进程内累计的统计指标"""
+        with self._lock:
+            self._stats = _new_stats()
+
+    def start_session(self):
+        """开始一段单独的统计（如验证器的一次运行），返回统计句柄，供stats(session)使用
+
+        同一进程中的多个验证器各自开始统计，互不清空对方的指标
+        """
+        session = _new_stats()
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def stop_session(self, session):
+        """结束一段统计，之后的探测不再记入该统计（已有的指标仍可通过stats(session)读取）"""
+        with self._lock:
+            self._sessions = [other for other in self._sessions if other is not session]
+
+    def _wait_for_admission(self):
+        """负载过高且已有探测在运行时等待，返回是否等待过"""
+        if not self.max_load:
+            return False
+        waited = False
+        deadline = time.monotonic() + self.max_admission_wait
+        while self._active > 0 and time.monotonic() < deadline:
+            load = _load_average()
+            if load is None or load <= self.max_load:
+                break
+            waited = True
+            time.sleep(ADMISSION_POLL_INTERVAL)
+        return waited
+
+    def run(self, cmd, **kwargs):
+        """在调度器的并发限制下执行subprocess.run(cmd, **kwargs)，异常与subprocess.run一致"""
+        queued_at = time.monotonic()
+        with self._slot_available:
+            while self._slots_used >= self.max_concurrent:
+                self._slot_available.wait()
+            self._slots_used += 1
+        try:
+            waited = self._wait_for_admission()
+            started_at = time.monotonic()
+            queue_time = started_at - queued_at
+            with self._lock:
+                self._active += 1
+                for stats in (self._stats, *self._sessions):
+                    stats['started'] += 1
+                    stats['load_waits'] += waited
+                    stats['max_active'] = max(stats['max_active'], self._active)
+                    stats['queue_time_total'] += queue_time
+                    stats['queue_time_max'] = max(stats['queue_time_max'], queue_time)
+
+            outcome = 'errors'
+            try:
+                result = subprocess.run(cmd, **kwargs)
+                outcome = 'completed'
+                return result
+            except subprocess.TimeoutExpired:
+                outcome = 'timeouts'
+                raise
+            finally:
+                run_time = time.monotonic() - started_at
+                with self._lock:
+                    self._active -= 1
+                    for stats in (self._stats, *self._sessions):
+                        stats[outcome] += 1
+                        stats['run_time_total'] += run_time
+                        stats['run_time_max'] = max(stats['run_time_max'], run_time)
+        finally:
+            with self._slot_available:
+                self._slots_used -= 1
+                self._slot_available.notify()
+
+    def stats(self, session=None):
+        """返回统计指标（时间单位为秒）
+
+        参数:
+            session: start_session()返回的统计句柄，为None时返回进程内累计的指标
+        """
+        with self._lock:
+            stats = dict(self._stats if session is None else session)
+            active = self._active
+        started = stats['started']
+        finished = stats['completed'] + stats['timeouts'] + stats['errors']
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_load': self.max_load,
+            'active': active,
+            'max_active': stats['max_active'],
+            'started': started,
+            'completed': stats['completed'],
+            'timeouts': stats['timeouts'],
+            'errors': stats['errors'],
+            'load_waits': stats['load_waits'],
+            'queue_time_avg': round(stats['queue_time_total'] / started, 3) if started else 0.0,
+            'queue_time_max': round(stats['queue_time_max'], 3),
+            'run_time_avg': round(stats['run_time_total'] / finished, 3) if finished else 0.0,
+            'run_time_max': round(stats['run_time_max'], 3),
+        }
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_probe_scheduler():
+    """返回进程内共用的调度器（第一次调用时按默认参数创建）"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ProbeScheduler()
+        return _default_scheduler
+
+
+def configure_probe_scheduler(max_concurrent=None, max_load=None):
+    """按参数配置进程内共用的调度器并返回它；已存在时原地修改上限（以最后一次配置为准），
+    同一进程中的多个验证器始终共用同一个并发上限"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = ProbeScheduler(max_concurrent, max_load)
+        else:
+            _default_scheduler.configure(max_concurrent, max_load)
+        return _default_scheduler
+
+
+def run_probe(cmd, **kwargs):
+    """通过共用的调度器执行探测子进程"""
+    return get_probe_scheduler().run(cmd, **kwargs)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+MPEG-TS分片头解析
+功能：只下载TS分片开头的一段数据（Range请求，默认200KB），在进程内解析PAT/PMT找到视频流，
+从视频基本流的H.264/H.265 SPS（MPEG-2为序列头）中读出宽高，不需要启动ffprobe
+- 没有ffprobe的环境中也能得到真实分辨率
+- 有ffprobe时可以省去大量探测进程
+- 数据不是TS、找不到视频流或SPS时返回None，由调用方回退到ffprobe
+"""
+
+import requests
+
+# 默认下载的字节数
+DEFAULT_MAX_BYTES = 200 * 1024
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+
+# PMT中的视频流类型 -> 编码名称（与ffprobe的codec_name一致）
+VIDEO_STREAM_TYPES = {
+    0x01: 'mpeg1video',
+    0x02: 'mpeg2video',
+    0x1B: 'h264',
+    0x24: 'hevc',
+}
+
+# 需要解析SPS的H.264 profile（SPS中带chroma_format_idc等字段）
+H264_HIGH_PROFILES = {100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+
+class TSInfo:
+    """TS分片中视频流的信息"""
+
+    __slots__ = ('width', 'height', 'codec')
+
+    def __init__(self, width, height, codec):
+        self.width = width
+        self.height = height
+        self.codec = codec
+
+    @property
+    def resolution(self):
+        return f"{self.width}*{self.height}"
+
+    def __repr__(self):
+        return f"TSInfo(width={self.width!r}, height={self.height!r}, codec={self.codec!r})"
+
+
+class _BitReader:
+    """按位读取RBSP（大端序），支持指数哥伦布编码"""
+
+    __slots__ = ('data', 'pos', 'length')
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.length = len(data) * 8
+
+    def bits(self, count):
+        if self.pos + count > self.length:
+            raise ValueError('SPS数据不完整')
+        value = 0
+        for _ in range(count):
+            byte = self.data[self.pos >> 3]
+            value = (value << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return value
+
+    def skip(self, count):
+        if self.pos + count > self.length:
+            raise ValueError('SPS数据不完整')
+        self.pos += count
+
+    def ue(self):
+        zeros = 0
+        while self.bits(1) == 0:
+            zeros += 1
+            if zeros > 31:
+                raise ValueError('指数哥伦布编码无效')
+        return (1 << zeros) - 1 + self.bits(zeros) if zeros else 0
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+def _remove_emulation_prevention(data):
+    """去掉NAL单元中的防竞争字节（00 00 03 -> 00 00）"""
+    if b'\x00\x00\x03' not in data:
+        return data
+    out = bytearray()
+    zeros = 0
+    for byte in data:
+        if zeros >= 2 and byte == 3:
+            zeros = 0
+            continue
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return bytes(out)
+
+
+def _iter_nal_units(es):
+    """按起始码（00 00 01）切分基本流，产出NAL单元（不含起始码）"""
+    start = es.find(b'\x00\x00\x01')
+    while start != -1:
+        start += 3
+        end = es.find(b'\x00\x00\x01', start)
+        nal = es[start:] if end == -1 else es[start:end]
+        # 4字节起始码前面多出的0属于下一个起始码
+        yield nal.rstrip(b'\x00') if end != -1 else nal
+        start = end
+
+
+def _skip_scaling_list(reader, size):
+    last_scale = 8
+    next_scale = 8
+    for _ in range(size):
+        if next_scale != 0:
+            next_scale = (last_scale + reader.se() + 256) % 256
+        last_scale = next_scale if next_scale != 0 else last_scale
+
+
+def parse_h264_sps(nal):
+    """解析H.264 SPS（含1字节NAL头），返回 (宽, 高)"""
+    reader = _BitReader(_remove_emulation_prevention(nal[1:]))
+    profile_idc = reader.bits(8)
+    reader.skip(16)  # constraint_set标志和level_idc
+    reader.ue()  # seq_parameter_set_id
+
+    chroma_format_idc = 1
+    separate_colour_plane = 0
+    if profile_idc in H264_HIGH_PROFILES:
+        chroma_format_idc = reader.ue()
+        if chroma_format_idc == 3:
+            separate_colour_plane = reader.bits(1)
+        reader.ue()  # bit_depth_luma_minus8
+        reader.ue()  # bit_depth_chroma_minus8
+        reader.skip(1)  # qpprime_y_zero_transform_bypass_flag
+        if reader.bits(1):  # seq_scaling_matrix_present_flag
+            for i in range(8 if chroma_format_idc != 3 else 12):
+                if reader.bits(1):
+                    _skip_scaling_list(reader, 16 if i < 6 else 64)
+
+    reader.ue()  # log2_max_frame_num_minus4
+    pic_order_cnt_type = reader.ue()
+    if pic_order_cnt_type == 0:
+        reader.ue()  # log2_max_pic_order_cnt_lsb_minus4
+    elif pic_order_cnt_type == 1:
+        reader.skip(1)
+        reader.se()
+        reader.se()
+        for _ in range(reader.ue()):
+            reader.se()
+    reader.ue()  # max_num_ref_frames
+    reader.skip(1)  # gaps_in_frame_num_value_allowed_flag
+    width_in_mbs = reader.ue() + 1
+    height_in_map_units = reader.ue() + 1
+    frame_mbs_only = reader.bits(1)
+    if not frame_mbs_only:
+        reader.skip(1)  # mb_adaptive_frame_field_flag
+    reader.skip(1)  # direct_8x8_inference_flag
+
+    width = width_in_mbs * 16
+    height = (2 - frame_mbs_only) * height_in_map_units * 16
+    if reader.bits(1):  # frame_cropping_flag
+        left, right, top, bottom = reader.ue(), reader.ue(), reader.ue(), reader.ue()
+        if chroma_format_idc == 0 or separate_colour_plane:
+            crop_x, crop_y = 1, 2 - frame_mbs_only
+        else:
+            sub_width = 1 if chroma_format_idc == 3 else 2
+            sub_height = 2 if chroma_format_idc == 1 else 1
+            crop_x, crop_y = sub_width, sub_height * (2 - frame_mbs_only)
+        width -= crop_x * (left + right)
+        height -= crop_y * (top + bottom)
+    return width, height
+
+
+def parse_hevc_sps(nal):
+    """解析H.265 SPS（含2字节NAL头），返回 (宽, 高)"""
+    reader = _BitReader(_remove_emulation_prevention(nal[2:]))
+    reader.skip(4)  # sps_video_parameter_set_id
+    max_sub_layers_minus1 = reader.bits(3)
+    reader.skip(1)  # sps_temporal_id_nesting_flag
+
+    # profile_tier_level
+    reader.skip(96)  # general_profile_space ... general_level_idc
+    sub_layer_flags = [(reader.bits(1), reader.bits(1)) for _ in range(max_sub_layers_minus1)]
+    if max_sub_layers_minus1 > 0:
+        reader.skip(2 * (8 - max_sub_layers_minus1))
+    for profile_present, level_present in sub_layer_flags:
+        if profile_present:
+            reader.skip(88)
+        if level_present:
+            reader.skip(8)
+
+    reader.ue()  # sps_seq_parameter_set_id
+    chroma_format_idc = reader.ue()
+    separate_colour_plane = 0
+    if chroma_format_idc == 3:
+        separate_colour_plane = reader.bits(1)
+    width = reader.ue()
+    height = reader.ue()
+    if reader.bits(1):  # conformance_window_flag
+        left, right, top, bottom = reader.ue(), reader.ue(), reader.ue(), reader.ue()
+        if chroma_format_idc in (1, 2) and not separate_colour_plane:
+            sub_width = 2
+            sub_height = 2 if chroma_format_idc == 1 else 1
+        else:
+            sub_width = sub_height = 1
+        width -= sub_width * (left + right)
+        height -= sub_height * (top + bottom)
+    return width, height
+
+
+def parse_mpeg2_sequence_header(es):
+    """从MPEG-1/2视频基本流的序列头（00 00 01 B3）中读出 (宽, 高)，没有时返回None"""
+    pos = es.find(b'\x00\x00\x01\xb3')
+    if pos == -1 or pos + 7 > len(es):
+        return None
+    b1, b2, b3 = es[pos + 4], es[pos + 5], es[pos + 6]
+    return (b1 << 4) | (b2 >> 4), ((b2 & 0x0F) << 8) | b3
+
+
+def _find_sync(data):
+    """查找第一个连续两个包都以同步字节开头的位置，没有时返回-1"""
+    limit = min(len(data) - TS_PACKET_SIZE, TS_PACKET_SIZE)
+    for offset in range(max(limit, 0)):
+        if data[offset] == TS_SYNC_BYTE and data[offset + TS_PACKET_SIZE] == TS_SYNC_BYTE:
+            return offset
+    return -1
+
+
+def _iter_packets(data):
+    """逐个产出 (PID, 是否为PES/section起点, 负载)"""
+    offset = _find_sync(data)
+    if offset == -1:
+        return
+    end = len(data) - TS_PACKET_SIZE
+    while offset <= end:
+        if data[offset] != TS_SYNC_BYTE:
+            # 失去同步，重新查找
+            next_sync = _find_sync(data[offset:])
+            if next_sync <= 0:
+                return
+            offset += next_sync
+            continue
+        header = data[offset + 1:offset + 4]
+        pusi = header[0] & 0x40
+        pid = ((header[0] & 0x1F) << 8) | header[1]
+        adaptation = (header[2] >> 4) & 0x03
+        payload_start = offset + 4
+        if adaptation in (2, 3):
+            payload_start += 1 + data[offset + 4]
+        packet_end = offset + TS_PACKET_SIZE
+        if adaptation in (1, 3) and payload_start < packet_end:
+            yield pid, pusi, data[payload_start:packet_end]
+        offset = packet_end
+
+
+def _section(payload):
+    """去掉pointer_field，返回section数据（截到section_length）"""
+    start = 1 + payload[0]
+    if start + 3 > len(payload):
+        return None
+    section_length = ((payload[start + 1] & 0x0F) << 8) | payload[start + 2]
+    return payload[start:start + 3 + section_length]
+
+
+def _parse_pat(section):
+    """返回第一个节目的PMT PID"""
+    # 表头8字节，末尾4字节CRC
+    for pos in range(8, len(section) - 4 - 3, 4):
+        program_number = (section[pos] << 8) | section[pos + 1]
+        if program_number != 0:
+            return ((section[pos + 2] & 0x1F) << 8) | section[pos + 3]
+    return None
+
+
+def _parse_pmt(section):
+    """返回第一个视频流的 (PID, 编码名称)"""
+    if len(section) < 12:
+        return None
+    program_info_length = ((section[10] & 0x0F) << 8) | section[11]
+    pos = 12 + program_info_length
+    end = len(section) - 4
+    while pos + 5 <= end:
+        stream_type = section[pos]
+        pid = ((section[pos + 1] & 0x1F) << 8) | section[pos + 2]
+        es_info_length = ((section[pos + 3] & 0x0F) << 8) | section[pos + 4]
+        if stream_type in VIDEO_STREAM_TYPES:
+            return pid, VIDEO_STREAM_TYPES[stream_type]
+        pos += 5 + es_info_length
+    return None
+
+
+def _video_elementary_stream(data):
+    """解析PAT/PMT，返回 (编码名称, 视频基本流数据)，找不到视频流时返回None"""
+    pmt_pid = None
+    video = None
+    chunks = []
+    for pid, pusi, payload in _iter_packets(data):
+        if video is None:
+            if pid == 0 and pusi and pmt_pid is None:
+                section = _section(payload)
+                if section and section[0] == 0x00:
+                    pmt_pid = _parse_pat(section)
+            elif pid == pmt_pid and pusi:
+                section = _section(payload)
+                if section and section[0] == 0x02:
+                    video = _parse_pmt(section)
+            continue
+        if pid != video[0]:
+            continue
+        if pusi and payload[:3] == b'\x00\x00\x01' and len(payload) >= 9:
+            # 跳过PES头
+            payload = payload[9 + payload[8]:]
+        chunks.append(payload)
+    if video is None:
+        return None
+    return video[1], b''.join(chunks)
+
+
+def sniff_ts_resolution(data):
+    """从TS数据中解析视频分辨率
+
+    参数:
+        data: TS分片开头的字节
+
+    返回:
+        TSInfo，无法解析时返回None
+    """
+    stream = _video_elementary_stream(data)
+    if stream is None:
+        return None
+    codec, es = stream
+
+    try:
+        if codec in ('mpeg1video', 'mpeg2video'):
+            size = parse_mpeg2_sequence_header(es)
+        else:
+            size = None
+            for nal in _iter_nal_units(es):
+                if not nal:
+                    continue
+                if codec == 'h264' and nal[0] & 0x1F == 7:
+                    size = parse_h264_sps(nal)
+                    break
+                if codec == 'hevc' and (nal[0] >> 1) & 0x3F == 33:
+                    size = parse_hevc_sps(nal)
+                    break
+    except (ValueError, IndexError):
+        return None
+
+    if not size or size[0] <= 0 or size[1] <= 0:
+        return None
+    return TSInfo(size[0], size[1], codec)
+
+
+def fetch_ts_head(url, timeout, headers=None, session=None, max_bytes=DEFAULT_MAX_BYTES):
+    """用Range请求下载分片开头的max_bytes字节（服务器忽略Range时只读取前max_bytes字节），失败时返回None"""
+    request_headers = dict(headers) if headers else {}
+    request_headers['Range'] = f'bytes=0-{max_bytes - 1}'
+    session = session or requests
+    try:
+        with session.get(url, timeout=timeout, headers=request_headers, stream=True, allow_redirects=True) as response:
+            if response.status_code not in (200, 206):
+                return None
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= max_bytes:
+                    break
+            return b''.join(chunks)[:max_bytes]
+    except Exception:
+        return None
+
+
+def probe_ts_segment(url, timeout, headers=None, session=None, max_bytes=DEFAULT_MAX_BYTES):
+    """下载TS分片开头并解析视频分辨率，返回TSInfo，失败时返回None"""
+    data = fetch_ts_head(url, timeout, headers, session, max_bytes)
+    if not data:
+        return None
+    return sniff_ts_resolution(data)